@@ -17,6 +17,13 @@ class Config:
     DB_INSTANCE: str = os.getenv('DB_INSTANCE')
     DB_REGION: str = os.getenv('DB_REGION', 'us-central1')
     DB_NAME: str = os.getenv('DB_NAME', 'postgres')
+    # Connection pool sizing and health checks
+    DB_POOL_MIN_SIZE: int = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+    DB_POOL_MAX_SIZE: int = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+    DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30'))      # seconds before acquire() gives up
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))         # recycle connections older than this
+    DB_POOL_IDLE_CHECK_AFTER: float = float(os.getenv('DB_POOL_IDLE_CHECK_AFTER', '30'))   # ping only connections idle longer than this
+    DB_POOL_MAX_IDLE_TIME: float = float(os.getenv('DB_POOL_MAX_IDLE_TIME', '300'))        # close idle connections above min size
     USE_IAM_AUTH: bool = False
 
     
@@ -40,6 +47,38 @@ class Config:
     GEMINI_FILE_API_LIMIT_BYTES = 50 * 1024 * 1024
     GEMINI_MAX_RESOLUTION = 3072         # Max image resolution
     
+    # Vertex AI client throttle (shared by Gemini and embedding calls in this process)
+    VERTEX_RATE_LIMITS = json.loads(os.getenv('VERTEX_RATE_LIMITS', '{}'))  # {"model": {"rpm": .., "tpm": ..}}
+    VERTEX_DEFAULT_RPM = 300
+    VERTEX_DEFAULT_TPM = 4_000_000
+    VERTEX_INITIAL_CONCURRENCY = 8       # AIMD start; grows on fast successes, halves on 429
+    VERTEX_MIN_CONCURRENCY = 1
+    VERTEX_MAX_CONCURRENCY = 32
+    VERTEX_MAX_RETRIES = 5               # 429 retries with full-jitter exponential backoff
+    VERTEX_EMBEDDING_TEXTS_PER_REQUEST = 250
+
+    # Query embedding cache for /api/search and /api/chat (per process)
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = os.getenv('QUERY_EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv('QUERY_EMBEDDING_CACHE_MAX_ENTRIES', '1000'))
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = float(os.getenv('QUERY_EMBEDDING_CACHE_TTL_SECONDS', '3600'))  # embeddings only change with the model
+
+    # Vector search: recall/latency knob for /api/search and /api/chat
+    SEARCH_DEFAULT_RECALL: str = os.getenv('SEARCH_DEFAULT_RECALL', 'balanced')
+    SEARCH_RECALL_PROFILES = {           # 'exact' always scans the whole project
+        'fast': {'ef_search': 40, 'max_scan_tuples': 10000},
+        'balanced': {'ef_search': 100, 'max_scan_tuples': 20000},
+        'high': {'ef_search': 400, 'max_scan_tuples': 100000},
+    }
+    SEARCH_EXACT_MAX_ROWS: int = int(os.getenv('SEARCH_EXACT_MAX_ROWS', '20000'))  # smaller projects skip HNSW
+    SEARCH_ITERATIVE_SCAN: str = os.getenv('SEARCH_ITERATIVE_SCAN', 'relaxed_order')  # pgvector >= 0.8; '' disables
+    SEARCH_PROJECT_STATS_TTL = 300       # seconds a project's row count is reused for planning
+    SEARCH_DEFAULT_MODE: str = os.getenv('SEARCH_DEFAULT_MODE', 'vector')  # 'vector' or 'hybrid'
+    SEARCH_HYBRID_CANDIDATES = 4         # hybrid: each list fetches k * this many candidates
+    SEARCH_HYBRID_MAX_CANDIDATES = 200
+    SEARCH_RRF_K = 60                    # reciprocal rank fusion constant
+    SEARCH_FILTER_COUNT_LIMIT = 100000   # filtered searches: matching rows counted up to this for planning
+    SEARCH_FILTER_STATS_MAX_ENTRIES = 10000  # cached (project, filter) row counts
+    
     # File API Settings
     FILE_API_TTL_HOURS = 48              # Files stored for 48 hours
     FILE_API_AUTO_CLEANUP = True         # Auto-delete after processing
@@ -53,6 +92,11 @@ class Config:
     
     # Vector Store
     VECTOR_TABLE_NAME: str = os.getenv('VECTOR_TABLE_NAME', 'document_vectors')
+    VECTOR_BULK_INSERT = True            # COPY + staging merge instead of row-by-row INSERTs
+    # New vector tables are LIST-partitioned by project_id, one HNSW graph per project
+    # (existing tables: tools/migrate_vector_partitions.py)
+    VECTOR_PARTITION_BY_PROJECT: bool = os.getenv('VECTOR_PARTITION_BY_PROJECT', 'true').lower() == 'true'
+    FULLTEXT_CONFIG: str = os.getenv('FULLTEXT_CONFIG', 'simple')  # no stemming: part numbers, codes, names stay intact
     
     # Processing Settings
     MAX_RETRIES: int = 3
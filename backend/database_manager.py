@@ -289,15 +289,78 @@
 
 import asyncpg
 import asyncio
+import bisect
 import logging
 import os
-from typing import Optional, List, Any
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
 from google.cloud.sql.connector import Connector
 from pgvector.asyncpg import register_vector
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# SET LOCAL for any number of settings in one round trip, with bound values
+SET_LOCAL_SQL = "SELECT set_config(name, value, true) FROM unnest($1::text[], $2::text[]) AS s(name, value)"
+
+
+def partition_name(table_name: str, project_id) -> str:
+    """The partition holding one project's vectors: <table>_p_<project uuid hex>"""
+    # Parsing as a UUID also makes the value safe to interpolate into DDL
+    return f"{table_name}_p_{uuid.UUID(str(project_id)).hex}"
+
+
+def partition_index_ddl(partition: str, indexes: List[tuple]) -> List[str]:
+    """
+    Statements creating the parent's indexes on a standalone table about to
+    be attached, from (pg_get_indexdef, pg_get_constraintdef) per parent
+    index, so ATTACH links them instead of building them under its locks.
+    Constraint-backed indexes are recreated as constraints: ATTACH only
+    links a primary key index that backs a primary key.
+    """
+    statements = []
+    for indexdef, constraintdef in indexes:
+        if constraintdef:
+            statements.append(f"ALTER TABLE {partition} ADD {constraintdef}")
+            continue
+        # CREATE INDEX <name> ON ONLY <parent> USING ... -> unnamed index on the partition
+        match = re.match(r"CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ (USING .+)$", indexdef)
+        if match is None:
+            raise ValueError(f"Unexpected index definition: {indexdef}")
+        statements.append(f"CREATE {match.group(1) or ''}INDEX ON {partition} {match.group(2)}")
+    return statements
+
+
+def vector_table_ddl(table_name: str, dimension: int, partitioned: bool) -> str:
+    """
+    CREATE TABLE for the vector table. Partitioned by LIST (project_id), the
+    primary key must include the partition key; ids are still unique uuids.
+    """
+    if partitioned:
+        id_column = "id UUID NOT NULL DEFAULT gen_random_uuid()"
+        key = "PRIMARY KEY (id, project_id),"
+        partition_by = "PARTITION BY LIST (project_id)"
+    else:
+        id_column, key, partition_by = "id UUID PRIMARY KEY DEFAULT gen_random_uuid()", "", ""
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {id_column},
+            document_id UUID NOT NULL,
+            project_id UUID NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector({dimension}),
+            metadata JSONB DEFAULT '{{}}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            {key}
+            FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE,
+            FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+        ) {partition_by}
+    """
+
 
 class DatabaseManager:
     """
@@ -314,6 +377,12 @@ class DatabaseManager:
         self._lock = None
         self._lock_loop = None  # Track which loop owns the lock
         self._initialized = False
+        # Named hot-path queries, and their prepared statements per connection
+        self._statements: Dict[str, str] = {}
+        self._prepared: Dict[Any, Dict[str, Any]] = {}
+        # Per-project partitions of the vector table known to exist
+        self._partitioned: Optional[bool] = None
+        self._partitions: set = set()
 
     async def _ensure_lock(self):
         """Ensure lock exists for current event loop"""
@@ -426,6 +495,8 @@ class DatabaseManager:
                         logger.debug("✅ Registered pgvector on connection")
                     except Exception as e:
                         logger.warning(f"⚠️ register_vector failed: {e}")
+
+                    await self._prepare_statements(conn)
                     
                     return conn
                 except Exception as e:
@@ -435,11 +506,11 @@ class DatabaseManager:
             # Create initial connections
             logger.info("Creating initial connections...")
             connections = []
-            for i in range(2):  # min_size=2
+            for i in range(config.DB_POOL_MIN_SIZE):
                 try:
                     conn = await get_connection()
                     connections.append(conn)
-                    logger.info(f"✅ Created connection {i+1}/2")
+                    logger.info(f"✅ Created connection {i+1}/{config.DB_POOL_MIN_SIZE}")
                 except Exception as e:
                     logger.error(f"❌ Failed to create connection {i+1}: {e}")
                     # Clean up any successful connections
@@ -454,7 +525,12 @@ class DatabaseManager:
             self._pool = SimpleConnectionPool(
                 get_connection_func=get_connection,
                 initial_connections=connections,
-                max_size=10
+                max_size=config.DB_POOL_MAX_SIZE,
+                min_size=config.DB_POOL_MIN_SIZE,
+                acquire_timeout=config.DB_POOL_ACQUIRE_TIMEOUT,
+                max_lifetime=config.DB_POOL_MAX_LIFETIME,
+                idle_check_after=config.DB_POOL_IDLE_CHECK_AFTER,
+                max_idle_time=config.DB_POOL_MAX_IDLE_TIME
             )
 
             logger.info(f"✅ Database pool initialized with {len(connections)} connections")
@@ -480,22 +556,22 @@ class DatabaseManager:
             pool = await self._get_pool()
             async with pool.acquire() as conn:
                 # Create the table with vector column (dimension from config)
-                await conn.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {config.VECTOR_TABLE_NAME} (
-                        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                        document_id UUID NOT NULL,
-                        project_id UUID NOT NULL,
-                        chunk_index INTEGER NOT NULL,
-                        content TEXT NOT NULL,
-                        embedding vector({config.EMBEDDING_DIMENSION}),
-                        metadata JSONB DEFAULT '{{}}',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE,
-                        FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
-                    )
-                """)
-
-                # Create index for vector similarity search using HNSW (cosine)
+                await conn.execute(vector_table_ddl(
+                    config.VECTOR_TABLE_NAME, config.EMBEDDING_DIMENSION, config.VECTOR_PARTITION_BY_PROJECT
+                ))
+                partitioned = await conn.fetchval(
+                    "SELECT relkind = 'p' FROM pg_class WHERE oid = $1::regclass", config.VECTOR_TABLE_NAME
+                )
+                self._partitioned = partitioned
+                if partitioned:
+                    # Catches rows of projects whose partition is not there yet
+                    await conn.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {config.VECTOR_TABLE_NAME}_default
+                        PARTITION OF {config.VECTOR_TABLE_NAME} DEFAULT
+                    """)
+
+                # Create index for vector similarity search using HNSW (cosine);
+                # on a partitioned table every partition gets its own graph
                 await conn.execute(f"""
                     CREATE INDEX IF NOT EXISTS {config.VECTOR_TABLE_NAME}_embedding_idx 
                     ON {config.VECTOR_TABLE_NAME} 
@@ -507,6 +583,24 @@ class DatabaseManager:
                     CREATE INDEX IF NOT EXISTS {config.VECTOR_TABLE_NAME}_project_idx 
                     ON {config.VECTOR_TABLE_NAME} (project_id)
                 """)
+
+                # Full-text search column for hybrid retrieval; generated, so
+                # every insert path fills it. FULLTEXT_CONFIG is fixed at creation.
+                await conn.execute(f"""
+                    ALTER TABLE {config.VECTOR_TABLE_NAME}
+                    ADD COLUMN IF NOT EXISTS content_tsv tsvector
+                    GENERATED ALWAYS AS (to_tsvector('{config.FULLTEXT_CONFIG}'::regconfig, content)) STORED
+                """)
+                await conn.execute(f"""
+                    CREATE INDEX IF NOT EXISTS {config.VECTOR_TABLE_NAME}_content_tsv_idx
+                    ON {config.VECTOR_TABLE_NAME} USING GIN (content_tsv)
+                """)
+
+                # Search filters: metadata @> containment (filename, file_type, ...)
+                await conn.execute(f"""
+                    CREATE INDEX IF NOT EXISTS {config.VECTOR_TABLE_NAME}_metadata_idx
+                    ON {config.VECTOR_TABLE_NAME} USING GIN (metadata jsonb_path_ops)
+                """)
             logger.info(f"✅ Vector table '{config.VECTOR_TABLE_NAME}' initialized")
         except Exception as e:
             if "already exists" in str(e).lower():
@@ -515,6 +609,151 @@ class DatabaseManager:
                 logger.error(f"❌ Failed to init vector table: {e}")
                 raise
 
+    # ------------------------------------------------------------------
+    # Per-project partitions of the vector table
+    # ------------------------------------------------------------------
+
+    async def vector_table_partitioned(self) -> bool:
+        """Whether the vector table is partitioned by project (cached once known)"""
+        if self._partitioned is None:
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                partitioned = await conn.fetchval(
+                    "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass($1)", Config.VECTOR_TABLE_NAME
+                )
+            if partitioned is None:
+                return False  # not created yet; ask again later
+            self._partitioned = partitioned
+        return self._partitioned
+
+    async def ensure_project_partition(self, project_id, source_table: str = None, settings: Dict[str, Any] = None) -> bool:
+        """
+        Create the project's partition of the vector table if it is missing.
+
+        The partition is built as a plain table, filled with the project's
+        rows from `source_table` (default: the default partition), indexed
+        like the parent (so its HNSW graph is built once in bulk) and then
+        attached. Returns False when the table is not partitioned.
+
+        Locks: ATTACH takes ACCESS EXCLUSIVE on the default partition,
+        blocking searches and inserts for every project still in it, and
+        would otherwise scan it and build the partition's indexes while
+        holding it. So:
+
+        1. the default partition gets a NOT VALID CHECK (project_id <> key)
+           (a brief lock; new rows of the project can't land there from now on)
+        2. the standalone table is created, filled and indexed in its own
+           transaction, which only reads the default partition
+        3. the project's rows leave the default partition, the CHECK is
+           validated (SHARE UPDATE EXCLUSIVE) and ATTACH, which then neither
+           scans the default partition nor builds indexes, only links them
+        """
+        key = str(uuid.UUID(str(project_id)))
+        if key in self._partitions:
+            return True
+        if not await self.vector_table_partitioned():
+            return False
+
+        table = Config.VECTOR_TABLE_NAME
+        name = partition_name(table, key)
+        default = f"{table}_default"
+        excluded = f"{name}_excluded"
+        source = source_table or default
+        settings = {'lock_timeout': '5s', **(settings or {})}
+        setting_values = (list(settings), [str(value) for value in settings.values()])
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            # Serialise instances racing to create the same partition; held across the transactions below
+            await conn.execute("SELECT pg_advisory_lock(hashtext($1))", name)
+            try:
+                if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name):
+                    self._partitions.add(key)
+                    return True
+
+                async with conn.transaction():
+                    await conn.execute(SET_LOCAL_SQL, *setting_values)
+                    await conn.execute(
+                        f"ALTER TABLE {default} ADD CONSTRAINT {excluded} CHECK (project_id <> '{key}') NOT VALID"
+                    )
+                try:
+                    async with conn.transaction():
+                        await conn.execute(SET_LOCAL_SQL, *setting_values)
+                        columns = await conn.fetchval("""
+                            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+                            FROM pg_attribute
+                            WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+                              AND attgenerated = ''
+                        """, table)
+                        indexes = await conn.fetch("""
+                            SELECT pg_get_indexdef(i.indexrelid) AS indexdef, pg_get_constraintdef(c.oid) AS constraintdef
+                            FROM pg_index i
+                            LEFT JOIN pg_constraint c
+                              ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid AND c.contype IN ('p', 'u', 'x')
+                            WHERE i.indrelid = $1::regclass
+                        """, table)
+                        await conn.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING GENERATED)")
+                        # Lets ATTACH skip re-validating the new partition's rows
+                        await conn.execute(f"ALTER TABLE {name} ADD CONSTRAINT {name}_project CHECK (project_id = '{key}')")
+                        moved = await conn.execute(
+                            f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {source} WHERE project_id = $1",
+                            key
+                        )
+                        definitions = [(row['indexdef'], row['constraintdef']) for row in indexes]
+                        # Built here, on the standalone table, so ATTACH only links them
+                        for statement in partition_index_ddl(name, definitions):
+                            await conn.execute(statement)
+
+                    async with conn.transaction():
+                        await conn.execute(SET_LOCAL_SQL, *setting_values)
+                        if source_table is None:
+                            # Rows deleted from the default partition (e.g. a deleted document) since the copy
+                            await conn.execute(f"""
+                                DELETE FROM {name} p WHERE NOT EXISTS (
+                                    SELECT 1 FROM {default} d WHERE d.project_id = $1 AND d.id = p.id
+                                )
+                            """, key)
+                            await conn.execute(f"DELETE FROM {default} WHERE project_id = $1", key)
+                        # Scans the default partition without blocking searches or inserts
+                        await conn.execute(f"ALTER TABLE {default} VALIDATE CONSTRAINT {excluded}")
+                        await conn.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES IN ('{key}')")
+                        await conn.execute(f"ALTER TABLE {name} DROP CONSTRAINT {name}_project")
+                        await conn.execute(f"ALTER TABLE {default} DROP CONSTRAINT {excluded}")
+                except Exception:
+                    # Don't leave the project's rows locked out of the default partition,
+                    # nor a half-built standalone table in the way of the next attempt
+                    async with conn.transaction():
+                        await conn.execute(SET_LOCAL_SQL, *setting_values)
+                        await conn.execute(f"ALTER TABLE {default} DROP CONSTRAINT IF EXISTS {excluded}")
+                        await conn.execute(f"DROP TABLE IF EXISTS {name}")
+                    raise
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", name)
+
+        self._partitions.add(key)
+        logger.info(f"✅ Vector partition {name} ready ({moved.split()[-1]} rows moved)")
+        return True
+
+    async def drop_project_partition(self, project_id) -> bool:
+        """
+        Drop the project's partition with all its vectors and its HNSW graph
+        in one metadata operation. Returns False when the table is not
+        partitioned (the caller deletes rows instead).
+        """
+        if not await self.vector_table_partitioned():
+            return False
+
+        name = partition_name(Config.VECTOR_TABLE_NAME, project_id)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # DROP locks the parent table; don't queue searches behind a long wait
+                await conn.execute("SET LOCAL lock_timeout = '5s'")
+                await conn.execute(f"DROP TABLE IF EXISTS {name}")
+        self._partitions.discard(str(uuid.UUID(str(project_id))))
+        logger.info(f"🧹 Dropped vector partition {name}")
+        return True
+
     async def execute_query(self, query: str, params: tuple = None):
         """Execute a single query"""
         pool = await self._get_pool()
@@ -544,6 +783,82 @@ class DatabaseManager:
             rows = await conn.fetch(query, *(params or ()))
             return rows
 
+    # ------------------------------------------------------------------
+    # Prepared statements
+    # ------------------------------------------------------------------
+
+    def register_statement(self, name: str, query: str):
+        """
+        Register a hot-path query under `name`. Registered queries are
+        prepared on each pooled connection when it is opened, so running
+        them by name skips parse and plan on every call.
+        """
+        if self._statements.get(name, query) != query:
+            for statements in self._prepared.values():
+                statements.pop(name, None)
+        self._statements[name] = query
+
+    async def _prepare_statements(self, conn):
+        """Prepare every registered statement on a new connection"""
+        # Forget connections the pool has closed since
+        for stale in [c for c in self._prepared if c.is_closed()]:
+            del self._prepared[stale]
+
+        statements = self._prepared.setdefault(conn, {})
+        for name, query in self._statements.items():
+            try:
+                statements[name] = await conn.prepare(query)
+            except Exception as e:
+                # e.g. its table is created after the pool on a cold start; prepared on first use instead
+                logger.debug(f"Deferred preparing '{name}': {e}")
+
+    async def prepared(self, conn, name: str):
+        """`conn`'s prepared statement for a registered query (prepared now if missing)"""
+        statements = self._prepared.setdefault(conn, {})
+        statement = statements.get(name)
+        if statement is None:
+            statement = statements[name] = await conn.prepare(self._statements[name])
+        return statement
+
+    async def _run_prepared(self, method: str, name: str, args: tuple, settings: Dict[str, Any] = None):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            try:
+                return await self._call_prepared(conn, method, name, args, settings)
+            except (asyncpg.exceptions.InvalidCachedStatementError, asyncpg.exceptions.OutdatedSchemaCacheError):
+                # The schema changed under the statement: re-prepare once
+                self._prepared[conn].pop(name, None)
+                return await self._call_prepared(conn, method, name, args, settings)
+
+    async def _call_prepared(self, conn, method: str, name: str, args: tuple, settings: Dict[str, Any] = None):
+        statement = await self.prepared(conn, name)
+        if not settings:
+            return await getattr(statement, method)(*args)
+        # SET LOCAL semantics: the settings end with this transaction, so the
+        # pooled connection goes back with its defaults
+        async with conn.transaction():
+            await conn.execute(SET_LOCAL_SQL, list(settings), [str(value) for value in settings.values()])
+            return await getattr(statement, method)(*args)
+
+    async def execute_prepared(self, name: str, *args):
+        """Execute a registered statement"""
+        await self._run_prepared('fetchval', name, args)
+
+    async def fetch_one_prepared(self, name: str, *args) -> Optional[Any]:
+        """Fetch a single row with a registered statement"""
+        return await self._run_prepared('fetchrow', name, args)
+
+    async def fetch_all_prepared(self, name: str, *args, settings: Dict[str, Any] = None) -> List[Any]:
+        """
+        Fetch all rows with a registered statement. `settings` (e.g.
+        {'hnsw.ef_search': 200}) apply to this query only.
+        """
+        return await self._run_prepared('fetch', name, args, settings)
+
+    async def fetch_value_prepared(self, name: str, *args) -> Any:
+        """Fetch the first column of the first row with a registered statement"""
+        return await self._run_prepared('fetchval', name, args)
+
     async def close(self):
         """Close pool and connector"""
         if self._pool:
@@ -564,77 +879,286 @@ class DatabaseManager:
         self._connector = None
         self._connector_loop = None
         self._lock = None
+        self._prepared.clear()
+
+
+class PoolAcquireTimeout(asyncio.TimeoutError):
+    """No connection became available within the pool's acquire timeout"""
 
 
 class SimpleConnectionPool:
     """
-    Simple connection pool for Cloud SQL Connector.
+    Connection pool for the Cloud SQL Connector.
+
+    - waiters queue FIFO on a Condition: a released connection goes to the
+      task that has waited longest instead of whoever polls first
+    - idle connections are pinged only after sitting unused for
+      `idle_check_after` seconds; recently used ones are handed out as-is
+    - connections older than `max_lifetime` are closed on release and
+      replaced on demand, so connector/server-side state never goes stale
+    - idle connections beyond `min_size` are closed after `max_idle_time`
+    - acquire() raises PoolAcquireTimeout after `acquire_timeout` seconds
+    - stats() reports sizes, counters and a wait-time histogram
     """
 
-    def __init__(self, get_connection_func, initial_connections, max_size=10):
+    WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(
+        self,
+        get_connection_func,
+        initial_connections,
+        max_size=10,
+        min_size=None,
+        acquire_timeout=30.0,
+        max_lifetime=1800.0,
+        idle_check_after=30.0,
+        max_idle_time=300.0
+    ):
         self._get_connection_func = get_connection_func
-        self._available = list(initial_connections)
-        self._in_use = set()
         self._max_size = max_size
-        self._lock = asyncio.Lock()
+        self._min_size = len(initial_connections) if min_size is None else min_size
+        self._acquire_timeout = acquire_timeout
+        self._max_lifetime = max_lifetime
+        self._idle_check_after = idle_check_after
+        self._max_idle_time = max_idle_time
+
+        now = time.monotonic()
+        self._created_at = {conn: now for conn in initial_connections}
+        # Idle stack of (conn, last_used): most recently used on the right
+        self._available = deque((conn, now) for conn in initial_connections)
+        self._in_use = set()
+        self._opening = 0
+        self._waiters = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+        self._wait_histogram = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+        self._counters = {
+            'acquired': 0, 'waited': 0, 'timeouts': 0, 'created': 0,
+            'pinged': 0, 'discarded': 0, 'recycled': 0, 'idle_closed': 0
+        }
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        logger.info(f"SimpleConnectionPool initialized with {len(self._available)} connections (max {max_size}).")
 
     class _ConnectionContextManager:
         """Context manager for acquiring/releasing connections"""
 
-        def __init__(self, pool):
+        def __init__(self, pool, timeout=None):
             self._pool = pool
+            self._timeout = timeout
             self._conn = None
 
         async def __aenter__(self):
-            self._conn = await self._pool._acquire()
+            self._conn = await self._pool._acquire(self._timeout)
             return self._conn
 
         async def __aexit__(self, exc_type, exc_val, exc_tb):
             await self._pool._release(self._conn)
 
-    def acquire(self):
+    def acquire(self, timeout=None):
         """Get a connection from the pool"""
-        return self._ConnectionContextManager(self)
+        return self._ConnectionContextManager(self, timeout)
 
-    async def _acquire(self):
-        """Internal acquire method"""
-        async with self._lock:
-            # Try to get an available connection
-            if self._available:
-                conn = self._available.pop()
-                self._in_use.add(conn)
-                return conn
+    @property
+    def size(self) -> int:
+        return len(self._available) + len(self._in_use) + self._opening
 
-            # Create new connection if under max_size
-            total = len(self._available) + len(self._in_use)
-            if total < self._max_size:
-                conn = await self._get_connection_func()
-                self._in_use.add(conn)
-                return conn
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
 
-        # Wait for a connection to become available
-        await asyncio.sleep(0.1)
-        return await self._acquire()
+    async def _acquire(self, timeout=None):
+        """Wait (FIFO) for a connection, then make sure it is usable"""
+        timeout = self._acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            conn = await asyncio.wait_for(self._acquire_ready(), timeout)
+        except asyncio.TimeoutError:
+            self._counters['timeouts'] += 1
+            raise PoolAcquireTimeout(
+                f"Timed out after {timeout}s waiting for a database connection "
+                f"({len(self._in_use)} in use, {len(self._waiters)} waiting, max {self._max_size})"
+            ) from None
+        self._record_wait((time.monotonic() - started) * 1000)
+        return conn
+
+    async def _acquire_ready(self):
+        while True:
+            conn, last_used = await self._checkout()
+            if conn is None:
+                return await self._open_reserved()
+            try:
+                usable = await self._is_usable(conn, last_used)
+            except asyncio.CancelledError:
+                # Timed out mid-ping: give the slot back rather than leak it
+                asyncio.ensure_future(self._discard(conn))
+                raise
+            if usable:
+                return conn
+            await self._discard(conn)
+
+    async def _checkout(self):
+        """
+        Take the next idle connection, or reserve a slot for a new one.
+        Returns (conn, last_used) or (None, None) for a reserved slot.
+        No I/O happens while the condition lock is held.
+        """
+        async with self._cond:
+            ticket = object()
+            self._waiters.append(ticket)
+            try:
+                if not self._ready(ticket):
+                    self._counters['waited'] += 1
+                    await self._cond.wait_for(lambda: self._ready(ticket))
+            finally:
+                self._waiters.remove(ticket)
+                # The next waiter may now be at the head of the queue
+                self._cond.notify_all()
+
+            if self._closed:
+                raise asyncpg.exceptions.InterfaceError("connection pool is closed")
+            if self._available:
+                conn, last_used = self._available.pop()
+                self._in_use.add(conn)
+                return conn, last_used
+            self._opening += 1
+            return None, None
+
+    def _ready(self, ticket) -> bool:
+        if self._closed:
+            return True
+        return self._waiters[0] is ticket and (bool(self._available) or self.size < self._max_size)
+
+    async def _open_reserved(self):
+        """Open a connection in a slot reserved by _checkout"""
+        conn = None
+        try:
+            conn = await self._get_connection_func()
+        except Exception as e:
+            logger.error(f"❌ Failed to create new connection: {e}")
+            raise
+        finally:
+            async with self._cond:
+                self._opening -= 1
+                if conn is not None:
+                    self._created_at[conn] = time.monotonic()
+                    self._in_use.add(conn)
+                    self._counters['created'] += 1
+                self._cond.notify_all()
+        logger.info(f"Created new pooled connection ({self.size}/{self._max_size}).")
+        return conn
+
+    async def _is_usable(self, conn, last_used) -> bool:
+        if conn.is_closed():
+            logger.info("♻️ Found stale (closed) connection in pool, discarding.")
+            return False
+        if time.monotonic() - self._created_at.get(conn, 0) > self._max_lifetime:
+            self._counters['recycled'] += 1
+            logger.debug("♻️ Pooled connection reached its max lifetime, replacing.")
+            return False
+        if time.monotonic() - last_used < self._idle_check_after:
+            return True
+        # Only connections that have sat idle long enough to be dropped get pinged
+        self._counters['pinged'] += 1
+        try:
+            await conn.fetchval("SELECT 1")
+            return True
+        except (asyncpg.exceptions.InterfaceError, asyncpg.exceptions.PostgresError, OSError) as e:
+            logger.warning(f"♻️ Connection ping failed ('{e}'), discarding.")
+            return False
+
+    async def _discard(self, conn):
+        """Drop a checked-out connection and free its slot"""
+        async with self._cond:
+            self._in_use.discard(conn)
+            self._created_at.pop(conn, None)
+            self._counters['discarded'] += 1
+            self._cond.notify_all()
+        await self._close_quietly(conn)
 
     async def _release(self, conn):
-        """Internal release method"""
-        async with self._lock:
-            if conn in self._in_use:
-                self._in_use.remove(conn)
-                self._available.append(conn)
+        """Return a connection; closed, expired or surplus ones are dropped"""
+        if conn is None:
+            return
+        now = time.monotonic()
+        to_close = []
+        async with self._cond:
+            if conn not in self._in_use:
+                # Already released or discarded
+                return
+            self._in_use.remove(conn)
+
+            if conn.is_closed():
+                logger.warning("♻️ Released connection was closed, discarding.")
+                self._created_at.pop(conn, None)
+                self._counters['discarded'] += 1
+            elif self._closed or now - self._created_at.get(conn, 0) > self._max_lifetime:
+                self._created_at.pop(conn, None)
+                self._counters['recycled'] += 1
+                to_close.append(conn)
+            else:
+                self._available.append((conn, now))
+
+            # Idle trim: the oldest idle connections sit on the left
+            while (
+                len(self._available) + len(self._in_use) > self._min_size
+                and self._available
+                and now - self._available[0][1] > self._max_idle_time
+            ):
+                idle_conn, _ = self._available.popleft()
+                self._created_at.pop(idle_conn, None)
+                self._counters['idle_closed'] += 1
+                to_close.append(idle_conn)
+
+            self._cond.notify_all()
+
+        for stale in to_close:
+            await self._close_quietly(stale)
+
+    @staticmethod
+    async def _close_quietly(conn):
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _record_wait(self, wait_ms: float):
+        self._counters['acquired'] += 1
+        self._wait_total_ms += wait_ms
+        self._wait_max_ms = max(self._wait_max_ms, wait_ms)
+        self._wait_histogram[bisect.bisect_left(self.WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def stats(self) -> dict:
+        """Pool sizes, counters and the acquire wait-time histogram"""
+        labels = [f"le_{bound}ms" for bound in self.WAIT_BUCKETS_MS] + ['inf']
+        acquired = self._counters['acquired']
+        return {
+            'size': self.size,
+            'idle': len(self._available),
+            'in_use': len(self._in_use),
+            'waiting': len(self._waiters),
+            'min_size': self._min_size,
+            'max_size': self._max_size,
+            'wait_ms_avg': round(self._wait_total_ms / acquired, 2) if acquired else 0.0,
+            'wait_ms_max': round(self._wait_max_ms, 2),
+            'wait_histogram': dict(zip(labels, self._wait_histogram)),
+            **self._counters,
+        }
 
     async def close(self):
-        """Close all connections"""
-        async with self._lock:
-            for conn in self._available:
-                try:
-                    await conn.close()
-                except Exception:
-                    pass
-            for conn in list(self._in_use):
-                try:
-                    await conn.close()
-                except Exception:
-                    pass
+        """Close all connections and fail any waiters"""
+        async with self._cond:
+            logger.info(f"Closing all {len(self._available)} available and {len(self._in_use)} in-use connections.")
+            self._closed = True
+            connections = [conn for conn, _ in self._available] + list(self._in_use)
             self._available.clear()
-            self._in_use.clear()
\ No newline at end of file
+            self._in_use.clear()
+            self._created_at.clear()
+            self._cond.notify_all()
+        for conn in connections:
+            await self._close_quietly(conn)
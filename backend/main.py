@@ -1,6 +1,6 @@
 
 
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Dict, Any
@@ -187,7 +187,10 @@ class SearchRequest(BaseModel):
     project_id: str
     user_id: str
     k: int = Field(default=10, ge=1, le=100)
-    filters: Optional[Dict[str, Any]] = None
+    filters: Optional[Dict[str, Any]] = None  # metadata filters, see search_filters.compile_filters
+    min_similarity: float = Field(default=0.0, ge=0, le=1)
+    recall: Optional[str] = Field(default=None, pattern="^(fast|balanced|high|exact)$")  # latency vs recall
+    mode: Optional[str] = Field(default=None, pattern="^(vector|hybrid)$")  # hybrid adds full-text matches
 
 class SignedUrlRequest(BaseModel):
     filename: str
@@ -204,6 +207,8 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     k: int = Field(default=5, ge=1, le=20)  # Number of chunks to retrieve
     temperature: float = Field(default=0.7, ge=0, le=1)
+    recall: Optional[str] = Field(default=None, pattern="^(fast|balanced|high|exact)$")  # latency vs recall
+    mode: Optional[str] = Field(default=None, pattern="^(vector|hybrid)$")  # hybrid adds full-text matches
 
 class ChatMessage(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -239,13 +244,14 @@ class DocumentTag(BaseModel):
 # HELPER FUNCTIONS
 # ============================================================================
 
+db_manager.register_statement('verify_project_access', """
+    SELECT 1 FROM members 
+    WHERE project_id = $1 AND user_id = $2
+""")
+
 async def verify_project_access(project_id: str, user_id: str) -> bool:
     """Verify user has access to project"""
-    query = """
-        SELECT 1 FROM members 
-        WHERE project_id = $1 AND user_id = $2
-    """
-    result = await db_manager.fetch_one(query, (project_id, user_id))
+    result = await db_manager.fetch_one_prepared('verify_project_access', project_id, user_id)
     return result is not None
 
 async def get_project_or_404(project_id: str, user_id: str):
@@ -265,6 +271,15 @@ async def get_project_or_404(project_id: str, user_id: str):
 
     return project
 
+async def verify_metrics_access(project_id: str = Query(...), user_id: str = Query(...)):
+    """Metrics are process-wide, so only owners/admins of a project may read them"""
+    await get_project_or_404(project_id, user_id)
+    result = await db_manager.fetch_one(
+        "SELECT role FROM members WHERE project_id = $1 AND user_id = $2", (project_id, user_id)
+    )
+    if not result or result[0] not in ['owner', 'admin']:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
 # ============================================================================
 # ROOT & HEALTH ENDPOINTS
 # ============================================================================
@@ -298,6 +313,41 @@ async def health_check():
         "vector_store": "healthy" if vector_manager else "not initialized"
     }
 
+@app.get("/api/metrics/vertex", dependencies=[Depends(verify_metrics_access)])
+async def vertex_metrics():
+    """Vertex AI throttle state per model: limits, in-flight calls, queue depth, 429 counters"""
+    from vertex_throttle import throttle_metrics
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "models": throttle_metrics()
+    }
+
+@app.get("/api/metrics/db", dependencies=[Depends(verify_metrics_access)])
+async def db_pool_metrics():
+    """Connection pool sizes, acquire timeouts and wait-time histogram"""
+    pool = db_manager._pool
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "pool": pool.stats() if pool is not None else None
+    }
+
+@app.get("/api/metrics/query-cache", dependencies=[Depends(verify_metrics_access)])
+async def query_cache_metrics():
+    """Query embedding cache size, hit ratio and coalesced lookups for search/chat"""
+    cache = vector_manager.query_cache
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "cache": cache.stats() if cache is not None else None
+    }
+
+@app.get("/api/metrics/search", dependencies=[Depends(verify_metrics_access)])
+async def search_metrics():
+    """Searches run as exact scans vs HNSW, and whether iterative scans are in use"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        **vector_manager.search_engine.stats()
+    }
+
 @app.middleware("http")
 async def _log_options_requests(request: Request, call_next):
     """Log incoming OPTIONS preflight requests for debugging and let CORSMiddleware handle them."""
@@ -383,6 +433,13 @@ async def create_project(project: ProjectCreate):
             (project_id, project.user_id, project.user_email, 'owner')
         )
 
+        # The project's own vector partition (and HNSW graph); ingestion
+        # creates it on first write if this fails
+        try:
+            await db_manager.ensure_project_partition(project_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Vector partition for project {project_id} not created yet: {e}")
+
         bucket = storage_client.bucket(Config.BUCKET_NAME)
         blob = bucket.blob(f"{storage_path}/.placeholder")
         blob.upload_from_string("")
@@ -1551,11 +1608,14 @@ async def search_documents(request: SearchRequest):
     try:
         await get_project_or_404(request.project_id, request.user_id)
 
-        results = await vector_manager.search_similar(
+        results = await vector_manager.search_with_filters(
             query=request.query,
             project_id=request.project_id,
             k=request.k,
-            filter_dict=request.filters
+            min_similarity=request.min_similarity,
+            filter_dict=request.filters,
+            recall=request.recall,
+            mode=request.mode
         )
 
         formatted_results = [
@@ -1567,6 +1627,7 @@ async def search_documents(request: SearchRequest):
                 'chunk_index': doc.metadata.get('chunk_index'),
                 'page': doc.metadata.get('page'),
                 'similarity': doc.metadata.get('similarity'),
+                'rrf_score': doc.metadata.get('rrf_score'),
                 'processing_method': doc.metadata.get('processing_method')
             }
             for doc in results
@@ -1582,6 +1643,9 @@ async def search_documents(request: SearchRequest):
 
     except HTTPException:
         raise
+    except ValueError as e:
+        # Invalid filters (unknown key, malformed range or id)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1600,7 +1664,9 @@ async def chat_with_documents(request: ChatRequest):
         search_results = await vector_manager.search_similar(
             query=request.query,
             project_id=request.project_id,
-            k=request.k
+            k=request.k,
+            recall=request.recall,
+            mode=request.mode
         )
 
         if not search_results:
@@ -1800,11 +1866,17 @@ async def test_broadcast(
     message: Dict[str, Any],
     user_id: str = Query(...)
 ):
-    """Test endpoint to broadcast messages"""
+    """
+    Broadcast messages to a project's WebSocket clients.
+    The pipeline's event bus posts {"type": "batch", "messages": [...]};
+    each message is relayed individually.
+    """
     try:
         await get_project_or_404(project_id, user_id)
-        await manager.broadcast_to_project(project_id, message)
-        return {"status": "success", "message": "Broadcast sent"}
+        messages = message.get("messages", []) if message.get("type") == "batch" else [message]
+        for item in messages:
+            await manager.broadcast_to_project(project_id, item)
+        return {"status": "success", "message": "Broadcast sent", "count": len(messages)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
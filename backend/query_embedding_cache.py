@@ -0,0 +1,116 @@
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """NFKC + collapsed whitespace; case is kept since it can change the embedding"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', query)).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    In-process TTL + LRU cache of search query embeddings, keyed on
+    (embedding model, normalized query text).
+
+    Concurrent lookups of the same key are coalesced: the first caller
+    starts the embedding call and everyone else awaits that same call,
+    so at most one Vertex AI request is in flight per key. Failures are
+    not cached; every waiter sees the error and the next lookup retries.
+
+    Entries are float32 arrays (~3KB each at 768 dims).
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, array]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'expired': 0, 'evictions': 0, 'errors': 0}
+
+    def _get(self, key: Tuple[str, str]):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, embedding = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.counters['expired'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return embedding.tolist()
+
+    def _put(self, key: Tuple[str, str], embedding: List[float]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, array('f', embedding))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    async def get_or_compute(
+        self,
+        model: str,
+        query: str,
+        compute: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """
+        Return the cached embedding for `query`, or run `compute(normalized_query)`
+        (joining an identical call already in flight).
+        """
+        text = normalize_query(query)
+        key = (model, text)
+
+        embedding = self._get(key)
+        if embedding is not None:
+            self.counters['hits'] += 1
+            return embedding
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.counters['coalesced'] += 1
+        else:
+            self.counters['misses'] += 1
+            task = asyncio.ensure_future(compute(text))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._on_computed(key, done))
+
+        # shield: a cancelled caller must not cancel the call others are waiting on
+        return list(await asyncio.shield(task))
+
+    def _on_computed(self, key: Tuple[str, str], task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.counters['errors'] += 1
+            logger.warning(f"⚠️ Query embedding failed, not cached: {error}")
+            return
+        self._put(key, task.result())
+
+    def clear(self):
+        """Drop every cached embedding (in-flight calls are left to finish)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus hit ratio; coalesced lookups also skip a Vertex call"""
+        lookups = self.counters['hits'] + self.counters['misses'] + self.counters['coalesced']
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'in_flight': len(self._in_flight),
+            'lookups': lookups,
+            **self.counters,
+            'hit_ratio': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+            'vertex_calls_saved': self.counters['hits'] + self.counters['coalesced'],
+        }
@@ -0,0 +1,388 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import math
+import time
+
+from search_filters import MetadataFilter, compile_filters
+
+logger = logging.getLogger(__name__)
+
+# pgvector caps hnsw.ef_search here
+MAX_EF_SEARCH = 1000
+
+
+def ann_search_sql(table_name: str, filter_sql: str = '') -> str:
+    """
+    HNSW top-k within one project: $1 query embedding, $2 project_id, $3 k,
+    then any filter parameters. Filters sit inside the index scan, so with
+    iterative scans HNSW keeps walking until k rows pass them. Iterative
+    scans in relaxed_order may return neighbours slightly out of order, so
+    the candidates are re-sorted by distance outside the CTE.
+    """
+    return f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT id, document_id, project_id, chunk_index, content, metadata,
+                   embedding <=> $1::vector AS distance
+            FROM {table_name}
+            WHERE project_id = $2{filter_sql}
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        )
+        SELECT id, document_id, project_id, chunk_index, content, metadata,
+               1 - distance AS similarity
+        FROM candidates
+        ORDER BY distance;
+    """
+
+
+def exact_search_sql(table_name: str, filter_sql: str = '') -> str:
+    """
+    Exact top-k within one project (same parameters). Distances are computed
+    in a materialized CTE with no ORDER BY, which the HNSW index cannot serve,
+    so the planner reads the project's rows via the project_id index and
+    keeps a top-k heap. Filters narrow that read (GIN on metadata).
+    """
+    return f"""
+        WITH scored AS MATERIALIZED (
+            SELECT id, embedding <=> $1::vector AS distance
+            FROM {table_name}
+            WHERE project_id = $2{filter_sql}
+        ), top_k AS (
+            SELECT id, distance FROM scored ORDER BY distance LIMIT $3
+        )
+        SELECT v.id, v.document_id, v.project_id, v.chunk_index, v.content, v.metadata,
+               1 - top_k.distance AS similarity
+        FROM top_k
+        JOIN {table_name} v ON v.id = top_k.id AND v.project_id = $2
+        ORDER BY top_k.distance;
+    """
+
+
+def text_search_sql(table_name: str, text_config: str, filter_sql: str = '') -> str:
+    """
+    Full-text top-k within one project: $1 query embedding (for the reported
+    similarity), $2 query text, $3 project_id, $4 k, then any filter
+    parameters. websearch_to_tsquery accepts free user input ("quoted
+    phrases", -exclusions, or).
+    """
+    return f"""
+        SELECT id, document_id, project_id, chunk_index, content, metadata,
+               1 - (embedding <=> $1::vector) AS similarity
+        FROM {table_name}, websearch_to_tsquery('{text_config}'::regconfig, $2) AS query
+        WHERE project_id = $3 AND content_tsv @@ query{filter_sql}
+        ORDER BY ts_rank_cd(content_tsv, query) DESC
+        LIMIT $4;
+    """
+
+
+def reciprocal_rank_fusion(ranked_lists: Dict[str, List[Any]], k: int, rrf_k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merge ranked row lists (name -> rows, best first) by reciprocal rank
+    fusion: score = sum over lists of 1 / (rrf_k + rank). Rows are matched on
+    'id'; each result is the row as a dict plus 'rrf_score' and
+    '<name>_rank' for every list it appeared in.
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for name, rows in ranked_lists.items():
+        for rank, row in enumerate(rows, 1):
+            entry = fused.get(row['id'])
+            if entry is None:
+                entry = fused[row['id']] = {**dict(row), 'rrf_score': 0.0}
+            entry['rrf_score'] += 1.0 / (rrf_k + rank)
+            entry[f'{name}_rank'] = rank
+    return sorted(fused.values(), key=lambda entry: entry['rrf_score'], reverse=True)[:k]
+
+
+def filtered_rows_sql(table_name: str, filter_sql: str) -> str:
+    """$1 project_id, $2 limit, then filter parameters -> matching rows, counted up to the limit"""
+    return f"""
+        SELECT count(*) FROM (
+            SELECT 1 FROM {table_name} WHERE project_id = $1{filter_sql} LIMIT $2
+        ) AS matching;
+    """
+
+
+def project_stats_sql(table_name: str) -> str:
+    """$1 project_id -> the project's row count and the table's estimated total"""
+    return f"""
+        SELECT
+            (SELECT count(*) FROM {table_name} WHERE project_id = $1) AS project_rows,
+            (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class
+             WHERE oid = '{table_name}'::regclass) AS total_rows;
+    """
+
+
+@dataclass
+class SearchPlan:
+    """How one query is executed"""
+    method: str                            # 'exact' or 'hnsw'
+    recall: str
+    ef_search: Optional[int] = None
+    iterative_scan: Optional[str] = None
+    max_scan_tuples: Optional[int] = None
+    reason: str = ''
+
+    def settings(self) -> Dict[str, Any]:
+        """SET LOCAL values for this plan"""
+        if self.method != 'hnsw':
+            return {}
+        settings = {'hnsw.ef_search': self.ef_search}
+        if self.iterative_scan:
+            settings['hnsw.iterative_scan'] = self.iterative_scan
+            settings['hnsw.max_scan_tuples'] = self.max_scan_tuples
+        return settings
+
+
+def plan_search(
+    recall: str,
+    k: int,
+    project_rows: int,
+    total_rows: int,
+    profiles: Dict[str, Dict[str, int]],
+    exact_max_rows: int,
+    iterative_scan: Optional[str]
+) -> SearchPlan:
+    """
+    Choose exact scan or HNSW for one query.
+
+    - recall='exact', or a project small enough to scan: exact
+    - pgvector >= 0.8 (`iterative_scan` set): HNSW with the profile's
+      ef_search; the scan keeps going until k rows pass the project filter
+      or max_scan_tuples is reached
+    - older pgvector: HNSW only returns ef_search candidates before the
+      project filter, so ef_search is raised to k / (project's share of the
+      table); when that exceeds pgvector's cap, exact scan instead
+    """
+    if recall == 'exact':
+        return SearchPlan('exact', recall, reason='requested')
+    if project_rows <= exact_max_rows:
+        return SearchPlan('exact', recall, reason=f'project has {project_rows} rows')
+
+    profile = profiles[recall]
+    ef_search = max(profile['ef_search'], k)
+    if iterative_scan:
+        return SearchPlan(
+            'hnsw', recall, ef_search=ef_search, iterative_scan=iterative_scan,
+            max_scan_tuples=profile['max_scan_tuples'], reason='iterative scan'
+        )
+
+    share = project_rows / max(total_rows, project_rows)
+    needed = math.ceil(ef_search / share)
+    if needed > MAX_EF_SEARCH:
+        return SearchPlan('exact', recall, reason=f'project is {share:.1%} of the table')
+    return SearchPlan('hnsw', recall, ef_search=needed, reason=f'project is {share:.1%} of the table')
+
+
+class VectorSearchEngine:
+    """
+    Project-scoped vector search with a recall/latency knob.
+
+    Each query gets a SearchPlan from the project's size (cached for
+    SEARCH_PROJECT_STATS_TTL seconds) and the server's pgvector version,
+    and runs as a prepared statement with its hnsw.* settings applied via
+    SET LOCAL, so they never leak to other users of the pooled connection.
+
+    Metadata filters (see search_filters.compile_filters) are planned on the
+    number of rows they match instead of the project's size, and each
+    filter shape gets its own prepared statement.
+    """
+
+    def __init__(self, db_manager):
+        from config import Config
+
+        self.db_manager = db_manager
+        self.config = Config
+        self._project_stats: Dict[str, tuple] = {}
+        self._iterative_scan: Optional[str] = None
+        self._features_checked = False
+        self._partitioned = False
+        self._filtered_rows: Dict[tuple, tuple] = {}
+        self._filtered_statements = set()
+        self.counters = {'exact': 0, 'hnsw': 0, 'hybrid': 0, 'filtered': 0, 'filter_fallback': 0}
+
+        table = Config.VECTOR_TABLE_NAME
+        # Statement builders taking the filter SQL, and where their filter parameters start
+        self._builders = {
+            'vector_search': (lambda filter_sql: ann_search_sql(table, filter_sql), 4),
+            'vector_search_exact': (lambda filter_sql: exact_search_sql(table, filter_sql), 4),
+            'text_search': (lambda filter_sql: text_search_sql(table, Config.FULLTEXT_CONFIG, filter_sql), 5),
+            'filtered_vector_rows': (lambda filter_sql: filtered_rows_sql(table, filter_sql), 3),
+        }
+        for name in ('vector_search', 'vector_search_exact', 'text_search'):
+            db_manager.register_statement(name, self._builders[name][0](''))
+        db_manager.register_statement('project_vector_stats', project_stats_sql(table))
+
+    def _statement(self, name: str, metadata_filter: Optional[MetadataFilter]) -> str:
+        """`name`, or its variant for this filter's shape (registered on first use)"""
+        if metadata_filter is None:
+            return name
+        filtered = f"{name}:{metadata_filter.key}"
+        if filtered not in self._filtered_statements:
+            builder, first_param = self._builders[name]
+            self.db_manager.register_statement(filtered, builder(metadata_filter.sql(first_param)))
+            self._filtered_statements.add(filtered)
+        return filtered
+
+    async def _check_features(self):
+        """Iterative index scans need pgvector 0.8.0+; partitioning changes the table share"""
+        if self._features_checked:
+            return
+        try:
+            self._partitioned = await self.db_manager.vector_table_partitioned()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not check vector table partitioning: {e}")
+        try:
+            version = await self.db_manager.fetch_one(
+                "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+            )
+            parts = tuple(int(part) for part in version['extversion'].split('.')[:3] if part.isdigit())
+            if parts >= (0, 8, 0):
+                self._iterative_scan = self.config.SEARCH_ITERATIVE_SCAN or None
+            logger.info(f"✅ pgvector {version['extversion']} (iterative scan: {self._iterative_scan or 'off'})")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read pgvector version, iterative scans disabled: {e}")
+        self._features_checked = True
+
+    async def project_stats(self, project_id: str) -> tuple:
+        """(project_rows, total_rows), cached per project"""
+        cached = self._project_stats.get(project_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        row = await self.db_manager.fetch_one_prepared('project_vector_stats', project_id)
+        project_rows, total_rows = int(row['project_rows']), int(row['total_rows'] or 0)
+        self._project_stats[project_id] = (
+            time.monotonic() + self.config.SEARCH_PROJECT_STATS_TTL, project_rows, total_rows
+        )
+        return project_rows, total_rows
+
+    async def filtered_rows(self, project_id: str, metadata_filter: MetadataFilter) -> int:
+        """
+        Rows of the project matching the filter, counted up to
+        SEARCH_FILTER_COUNT_LIMIT (index-assisted, so the count stays cheap
+        for broad filters) and cached like the project stats
+        """
+        key = (project_id, metadata_filter.cache_key)
+        cached = self._filtered_rows.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        matching = int(await self.db_manager.fetch_value_prepared(
+            self._statement('filtered_vector_rows', metadata_filter),
+            project_id, self.config.SEARCH_FILTER_COUNT_LIMIT, *metadata_filter.values
+        ))
+        now = time.monotonic()
+        if len(self._filtered_rows) >= self.config.SEARCH_FILTER_STATS_MAX_ENTRIES:
+            self._filtered_rows = {k: v for k, v in self._filtered_rows.items() if v[0] > now}
+        if len(self._filtered_rows) < self.config.SEARCH_FILTER_STATS_MAX_ENTRIES:
+            self._filtered_rows[key] = (now + self.config.SEARCH_PROJECT_STATS_TTL, matching)
+        return matching
+
+    async def plan(
+        self,
+        project_id: str,
+        k: int,
+        recall: Optional[str] = None,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> SearchPlan:
+        recall = recall or self.config.SEARCH_DEFAULT_RECALL
+        if recall != 'exact' and recall not in self.config.SEARCH_RECALL_PROFILES:
+            raise ValueError(f"Unknown recall setting '{recall}'")
+
+        await self._check_features()
+        project_rows, total_rows = await self.project_stats(project_id)
+        if self._partitioned:
+            # Partition pruning leaves only the project's own HNSW graph
+            total_rows = project_rows
+        if metadata_filter is not None and recall != 'exact':
+            # Only matching rows count: a selective filter is scanned exactly
+            # through its index, a broad one narrows the HNSW walk
+            project_rows = await self.filtered_rows(project_id, metadata_filter)
+        return plan_search(
+            recall, k, project_rows, total_rows,
+            profiles=self.config.SEARCH_RECALL_PROFILES,
+            exact_max_rows=self.config.SEARCH_EXACT_MAX_ROWS,
+            iterative_scan=self._iterative_scan
+        )
+
+    async def search(
+        self,
+        query_emb: List[float],
+        project_id: str,
+        k: int,
+        recall: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Any]:
+        """
+        Top-k rows (id, document_id, project_id, chunk_index, content,
+        metadata, similarity). `filters` is a filter dict or a compiled
+        MetadataFilter; invalid filters raise ValueError.
+        """
+        metadata_filter = filters if isinstance(filters, MetadataFilter) else compile_filters(filters)
+        plan = await self.plan(project_id, k, recall, metadata_filter)
+        self.counters[plan.method] += 1
+        if metadata_filter is not None:
+            self.counters['filtered'] += 1
+        logger.info(
+            f"⚡ {plan.method} search (recall={plan.recall}, ef_search={plan.ef_search}, "
+            f"iterative={plan.iterative_scan or 'off'}, filtered={metadata_filter is not None}): {plan.reason}"
+        )
+
+        args = (query_emb, project_id, k, *(metadata_filter.values if metadata_filter else ()))
+        statement = 'vector_search_exact' if plan.method == 'exact' else 'vector_search'
+        rows = await self.db_manager.fetch_all_prepared(
+            self._statement(statement, metadata_filter), *args, settings=plan.settings()
+        )
+        if metadata_filter is not None and plan.method == 'hnsw' and len(rows) < k:
+            # The HNSW walk ran out (ef_search or max_scan_tuples) before k
+            # rows passed the filter; more than k match, so scan exactly
+            self.counters['filter_fallback'] += 1
+            logger.info(f"⚡ Filtered HNSW search returned {len(rows)}/{k} rows, rescanning exactly")
+            rows = await self.db_manager.fetch_all_prepared(
+                self._statement('vector_search_exact', metadata_filter), *args
+            )
+        return rows
+
+    async def hybrid_search(
+        self,
+        query_emb: List[float],
+        query_text: str,
+        project_id: str,
+        k: int,
+        recall: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Vector and full-text candidates, fetched concurrently on two pooled
+        connections and merged with reciprocal rank fusion. Exact matches on
+        part numbers, error codes and names rank high through the text list
+        even when their embeddings are not the nearest.
+        """
+        metadata_filter = compile_filters(filters)
+        candidates = min(k * self.config.SEARCH_HYBRID_CANDIDATES, self.config.SEARCH_HYBRID_MAX_CANDIDATES)
+        self.counters['hybrid'] += 1
+
+        vector_rows, text_rows = await asyncio.gather(
+            self.search(query_emb, project_id, candidates, recall, metadata_filter),
+            self.db_manager.fetch_all_prepared(
+                self._statement('text_search', metadata_filter),
+                query_emb, query_text, project_id, candidates,
+                *(metadata_filter.values if metadata_filter else ())
+            )
+        )
+        logger.info(f"⚡ hybrid search: {len(vector_rows)} vector + {len(text_rows)} text candidates")
+        return reciprocal_rank_fusion(
+            {'vector': vector_rows, 'text': text_rows}, k, rrf_k=self.config.SEARCH_RRF_K
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Searches per method and the pgvector features in use"""
+        return {
+            'methods': dict(self.counters),
+            'iterative_scan': self._iterative_scan,
+            'partitioned': self._partitioned,
+            'default_recall': self.config.SEARCH_DEFAULT_RECALL,
+            'default_mode': self.config.SEARCH_DEFAULT_MODE,
+        }
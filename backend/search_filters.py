@@ -0,0 +1,155 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import uuid
+
+# Chunk metadata keys matched by equality (a value or a list of values)
+EQUALITY_KEYS = ('filename', 'file_type', 'processing_method', 'chunk_method', 'uploaded_by')
+BOOLEAN_KEYS = ('has_tables', 'has_images')
+# Numeric chunk metadata keys that accept a number or a range
+NUMERIC_KEYS = ('page_count',)
+RANGE_OPERATORS = {'gte': '>=', 'gt': '>', 'lte': '<=', 'lt': '<'}
+
+
+@dataclass
+class MetadataFilter:
+    """
+    A compiled search filter: SQL clauses with numbered placeholders ({0},
+    {1}, ...) and their values, so the same filter can be rendered into
+    statements whose own parameters end at different positions.
+
+    Scalar equality conditions are merged into one `metadata @> $n`
+    containment, which the GIN (jsonb_path_ops) index on metadata serves.
+    """
+    clauses: List[str] = field(default_factory=list)
+    values: List[Any] = field(default_factory=list)
+
+    def sql(self, first_param: int) -> str:
+        """' AND ...' clauses with placeholders numbered from `first_param`"""
+        if not self.clauses:
+            return ''
+        numbers = [f"${first_param + i}" for i in range(len(self.values))]
+        return ''.join(f" AND {clause.format(*numbers)}" for clause in self.clauses)
+
+    @property
+    def key(self) -> str:
+        """Identifies the SQL shape; filters with equal keys share a prepared statement"""
+        return hashlib.sha1(' AND '.join(self.clauses).encode()).hexdigest()[:12]
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies shape and values"""
+        return f"{self.key}:{json.dumps(self.values, default=str, sort_keys=True)}"
+
+
+def _parse_datetime(value: Any, name: str) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Filter '{name}' expects an ISO date or datetime, got {value!r}")
+
+
+def _parse_uuid(value: Any, name: str) -> str:
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"Filter '{name}' expects document UUIDs, got {value!r}")
+
+
+def _range(name: str, value: Any, column: str, convert) -> tuple:
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f"Filter '{name}' expects a value or a range like {{'gte': ..., 'lte': ...}}")
+    clauses, values = [], []
+    for op, bound in value.items():
+        if op not in RANGE_OPERATORS:
+            raise ValueError(f"Unknown range operator '{op}' in filter '{name}'")
+        clauses.append(f"{column} {RANGE_OPERATORS[op]} {{}}")
+        values.append(convert(bound))
+    return clauses, values
+
+
+def compile_filters(filters: Optional[Dict[str, Any]]) -> Optional[MetadataFilter]:
+    """
+    Turn a search request's filter dict into a MetadataFilter (None when
+    there is nothing to filter). Supported keys:
+
+    - filename, file_type, processing_method, chunk_method, uploaded_by:
+      a value, or a list of accepted values
+    - has_tables, has_images: true/false
+    - page_count: a number, or a range {'gte': 3, 'lte': 10}
+    - document_ids: list of document UUIDs
+    - tags: tag or list of tags the document must all carry (document tags)
+    - created_at: range of ISO dates/datetimes, e.g. {'gte': '2026-01-01'}
+
+    Values are always bound as parameters. Unknown keys and malformed values
+    raise ValueError.
+    """
+    if not filters:
+        return None
+
+    containment: Dict[str, Any] = {}
+    clauses: List[str] = []
+    values: List[Any] = []
+
+    def add(clause: str, value: Any):
+        # Each '{}' in a clause is one parameter slot, numbered at render time
+        clauses.append(clause.replace('{}', f'{{{len(values)}}}'))
+        values.append(value)
+
+    for name in sorted(filters):
+        value = filters[name]
+        if value is None:
+            continue
+        if name in EQUALITY_KEYS:
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    raise ValueError(f"Filter '{name}' has an empty list")
+                add(f"metadata->>'{name}' = ANY({{}}::text[])", [str(item) for item in value])
+            else:
+                containment[name] = str(value)
+        elif name in BOOLEAN_KEYS:
+            if not isinstance(value, bool):
+                raise ValueError(f"Filter '{name}' expects true or false")
+            containment[name] = value
+        elif name in NUMERIC_KEYS:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                containment[name] = value
+            else:
+                range_clauses, range_values = _range(name, value, f"(metadata->>'{name}')::numeric", float)
+                for clause, bound in zip(range_clauses, range_values):
+                    add(clause, bound)
+        elif name == 'page':
+            # Chunks span pages of the joined document text and carry no page number
+            raise ValueError("Filter 'page' is not supported: chunks have no page number (use 'page_count')")
+        elif name == 'document_ids':
+            ids = [value] if isinstance(value, str) else value
+            if not isinstance(ids, (list, tuple)) or not ids:
+                raise ValueError("Filter 'document_ids' expects a document UUID or a non-empty list of them")
+            add("document_id = ANY({}::uuid[])", [_parse_uuid(item, name) for item in ids])
+        elif name == 'tags':
+            tags = [value] if isinstance(value, str) else value
+            if not isinstance(tags, (list, tuple)) or not tags or not all(isinstance(tag, str) for tag in tags):
+                raise ValueError("Filter 'tags' expects a tag or a non-empty list of tags")
+            # Tags live on the document, not on its chunks
+            add(
+                "document_id IN (SELECT id FROM documents WHERE metadata @> {}::jsonb)",
+                json.dumps({'tags': tags})
+            )
+        elif name == 'created_at':
+            range_clauses, range_values = _range(name, value, 'created_at', lambda v: _parse_datetime(v, name))
+            for clause, bound in zip(range_clauses, range_values):
+                add(clause, bound)
+        else:
+            raise ValueError(f"Unknown search filter '{name}'")
+
+    if containment:
+        add("metadata @> {}::jsonb", json.dumps(containment, sort_keys=True))
+    if not clauses:
+        return None
+    return MetadataFilter(clauses, values)
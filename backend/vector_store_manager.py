@@ -479,6 +479,10 @@ import uuid
 import json
 import logging
 
+from vertex_throttle import estimate_text_tokens, get_throttle
+from query_embedding_cache import QueryEmbeddingCache
+from search_engine import VectorSearchEngine
+
 logger = logging.getLogger(__name__)
 
 
@@ -492,10 +496,43 @@ class VectorStoreManager:
         self.embeddings = VertexAIEmbeddings(
             model_name=Config.EMBEDDING_MODEL,
             project=Config.PROJECT_ID,
+            max_retries=0,  # 429s are retried by the Vertex throttle, which adapts to them
         )
         self.vector_store = None
         self._initialized = False
         self.config = Config
+        self.query_cache = QueryEmbeddingCache(
+            max_entries=Config.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=Config.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        ) if Config.QUERY_EMBEDDING_CACHE_ENABLED else None
+        self.search_engine = VectorSearchEngine(db_manager)
+
+        # Hot-path queries, prepared on each pooled connection
+        db_manager.register_statement('vector_insert', vector_insert_sql(Config.VECTOR_TABLE_NAME))
+        db_manager.register_statement('chunk_upsert', CHUNK_UPSERT_SQL)
+
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """aembed_documents through the shared Vertex AI throttle"""
+        return await get_throttle(self.config.EMBEDDING_MODEL).call(
+            lambda: self.embeddings.aembed_documents(texts),
+            tokens=estimate_text_tokens(texts),
+            requests=-(-len(texts) // self.config.VERTEX_EMBEDDING_TEXTS_PER_REQUEST)
+        )
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """Query embedding from the query cache, else Vertex AI (coalesced per query)"""
+        if self.query_cache is None:
+            return await self._embed_query_uncached(query)
+        return await self.query_cache.get_or_compute(
+            self.config.EMBEDDING_MODEL, query, self._embed_query_uncached
+        )
+
+    async def _embed_query_uncached(self, query: str) -> List[float]:
+        """aembed_query through the shared Vertex AI throttle"""
+        return await get_throttle(self.config.EMBEDDING_MODEL).call(
+            lambda: self.embeddings.aembed_query(query),
+            tokens=estimate_text_tokens(query)
+        )
 
     async def initialize(self):
         """Initialize vector store and tables (loop-safe)."""
@@ -585,41 +622,26 @@ class VectorStoreManager:
 
             # Get embeddings from Vertex AI (async)
             logger.info("🔮 Generating embeddings...")
-            embeddings = await self.embeddings.aembed_documents(contents)
+            embeddings = await self._embed_texts(contents)
             logger.info(f"✅ Generated {len(embeddings)} embeddings")
 
             # Generate unique IDs for chunks
             ids = [str(uuid.uuid4()) for _ in documents]
 
-            # Insert into vector table
-            insert_query = f"""
-                INSERT INTO {self.config.VECTOR_TABLE_NAME}
-                (id, document_id, project_id, chunk_index, content, embedding, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (id) DO NOTHING;
-            """
+            vector_records = [
+                (
+                    ids[idx],
+                    document_id,
+                    project_id,
+                    idx,
+                    doc.page_content,
+                    embeddings[idx],  # encoded by pgvector's registered codec
+                    json.dumps(doc.metadata)
+                )
+                for idx, doc in enumerate(documents)
+            ]
 
-            pool = await self.db_manager._get_pool()
-            async with pool.acquire() as conn:
-                async with conn.transaction():
-                    for idx, doc in enumerate(documents):
-                        meta_json = json.dumps(doc.metadata)
-                        emb = embeddings[idx]
-                        
-                        await conn.execute(
-                            insert_query,
-                            ids[idx],
-                            document_id,
-                            project_id,
-                            idx,
-                            doc.page_content,
-                            emb,  # asyncpg accepts Python list for vector column
-                            meta_json
-                        )
-
-            logger.info(f"✅ Inserted {len(documents)} vectors into database")
-
-            # Save chunk metadata in document_chunks table
+            # Chunk metadata for the document_chunks table
             chunk_records = [
                 (
                     ids[idx],
@@ -633,7 +655,9 @@ class VectorStoreManager:
                 )
                 for idx, doc in enumerate(documents)
             ]
-            await self._save_chunk_metadata(chunk_records)
+
+            await self._ensure_partition(project_id)
+            await self._store_records(vector_records, chunk_records)
 
             logger.info(f"✅ Successfully added {len(documents)} document chunks for project {project_id}")
             return ids
@@ -642,27 +666,29 @@ class VectorStoreManager:
             logger.error(f"❌ Failed to add documents: {e}", exc_info=True)
             raise
 
-    async def _save_chunk_metadata(self, chunk_records: List[tuple]):
-        """Save chunk metadata to document_chunks table"""
-        query = """
-            INSERT INTO document_chunks 
-            (id, document_id, project_id, chunk_index, chunk_method, 
-             content_preview, token_count, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            ON CONFLICT (document_id, chunk_index) DO UPDATE
-            SET chunk_method = EXCLUDED.chunk_method,
-                content_preview = EXCLUDED.content_preview,
-                token_count = EXCLUDED.token_count,
-                metadata = EXCLUDED.metadata;
-        """
-        
+    async def _ensure_partition(self, project_id: str):
+        """Make sure the project's vector partition exists before writing to it"""
+        try:
+            await self.db_manager.ensure_project_partition(project_id)
+        except Exception as e:
+            # Rows still land in the default partition and stay searchable
+            logger.warning(f"⚠️ Could not create vector partition for project {project_id}: {e}")
+
+    async def _store_records(self, vector_records: List[tuple], chunk_records: List[tuple]):
+        """Write vector rows and chunk metadata in a single transaction"""
         pool = await self.db_manager._get_pool()
         async with pool.acquire() as conn:
             async with conn.transaction():
-                for record in chunk_records:
-                    await conn.execute(query, *record)
-        
-        logger.info(f"✅ Saved metadata for {len(chunk_records)} chunks")
+                if self.config.VECTOR_BULK_INSERT:
+                    await copy_vector_records(conn, self.config.VECTOR_TABLE_NAME, vector_records)
+                    await copy_chunk_records(conn, chunk_records)
+                else:
+                    vector_insert = await self.db_manager.prepared(conn, 'vector_insert')
+                    chunk_upsert = await self.db_manager.prepared(conn, 'chunk_upsert')
+                    await vector_insert.executemany(vector_records)
+                    await chunk_upsert.executemany(chunk_records)
+
+        logger.info(f"✅ Inserted {len(vector_records)} vectors and {len(chunk_records)} chunk records")
 
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count (rough approximation: 1 token ≈ 4 chars)"""
@@ -673,7 +699,9 @@ class VectorStoreManager:
         query: str,
         project_id: str,
         k: int = 5,
-        filter_dict: Optional[dict] = None
+        filter_dict: Optional[dict] = None,
+        recall: Optional[str] = None,
+        mode: Optional[str] = None
     ) -> List[Document]:
         """
         Search with project isolation using cosine similarity.
@@ -682,7 +710,9 @@ class VectorStoreManager:
             query: Search query text
             project_id: Project UUID to search within
             k: Number of results to return
-            filter_dict: Additional filters (optional)
+            filter_dict: Metadata filters (see search_filters.compile_filters)
+            recall: 'fast', 'balanced', 'high' or 'exact' (default SEARCH_DEFAULT_RECALL)
+            mode: 'vector' or 'hybrid' (vector + full-text, fused by rank; default SEARCH_DEFAULT_MODE)
             
         Returns:
             List of Document objects with similarity scores
@@ -691,29 +721,15 @@ class VectorStoreManager:
             logger.info(f"🔍 Searching for '{query[:50]}...' in project {project_id}")
 
             # Compute query embedding
-            query_emb = await self.embeddings.aembed_query(query)
+            query_emb = await self._embed_query(query)
             
-            # Build SQL with cosine distance operator (<=>)
-            # Lower distance = more similar
-            # We calculate similarity as 1 - distance for easier interpretation
-            search_sql = f"""
-                SELECT 
-                    id,
-                    document_id,
-                    project_id,
-                    chunk_index,
-                    content,
-                    metadata,
-                    1 - (embedding <=> $1::vector) AS similarity
-                FROM {self.config.VECTOR_TABLE_NAME}
-                WHERE project_id = $2
-                ORDER BY embedding <=> $1::vector
-                LIMIT $3;
-            """
-
-            pool = await self.db_manager._get_pool()
-            async with pool.acquire() as conn:
-                rows = await conn.fetch(search_sql, query_emb, project_id, k)
+            # Cosine distance (<=>) search, exact or HNSW depending on the
+            # project's size and the recall setting; similarity is 1 - distance
+            mode = mode or self.config.SEARCH_DEFAULT_MODE
+            if mode == 'hybrid':
+                rows = await self.search_engine.hybrid_search(query_emb, query, project_id, k, recall, filter_dict)
+            else:
+                rows = await self.search_engine.search(query_emb, project_id, k, recall, filter_dict)
 
             # Format results as LangChain Documents
             results = []
@@ -737,6 +753,12 @@ class VectorStoreManager:
                         'similarity': float(row['similarity']),
                     }
                 )
+                if 'rrf_score' in row:
+                    # Hybrid results: fused score and the rank in each list
+                    doc.metadata['rrf_score'] = float(row['rrf_score'])
+                    for name in ('vector_rank', 'text_rank'):
+                        if name in row:
+                            doc.metadata[name] = row[name]
                 results.append(doc)
 
             logger.info(f"✅ Found {len(results)} similar chunks (top result: {results[0].metadata['similarity']:.3f})" if results else "✅ No results found")
@@ -752,7 +774,10 @@ class VectorStoreManager:
         project_id: str,
         k: int = 5,
         document_ids: Optional[List[str]] = None,
-        min_similarity: float = 0.0
+        min_similarity: float = 0.0,
+        filter_dict: Optional[dict] = None,
+        recall: Optional[str] = None,
+        mode: Optional[str] = None
     ) -> List[Document]:
         """
         Advanced search with additional filters.
@@ -762,74 +787,25 @@ class VectorStoreManager:
             project_id: Project UUID
             k: Number of results
             document_ids: Filter by specific document IDs
-            min_similarity: Minimum similarity threshold (0.0 to 1.0)
-        """
-        try:
-            logger.info(f"🔍 Advanced search in project {project_id}")
-
-            # Compute query embedding
-            query_emb = await self.embeddings.aembed_query(query)
-            
-            # Build dynamic SQL with filters
-            where_clauses = ["project_id = $2"]
-            params = [query_emb, project_id]
-            param_count = 2
-            
-            if document_ids:
-                param_count += 1
-                where_clauses.append(f"document_id = ANY(${param_count})")
-                params.append(document_ids)
-            
-            if min_similarity > 0.0:
-                param_count += 1
-                where_clauses.append(f"(1 - (embedding <=> $1::vector)) >= ${param_count}")
-                params.append(min_similarity)
-            
-            where_clause = " AND ".join(where_clauses)
-            
-            search_sql = f"""
-                SELECT 
-                    id, document_id, project_id, chunk_index,
-                    content, metadata,
-                    1 - (embedding <=> $1::vector) AS similarity
-                FROM {self.config.VECTOR_TABLE_NAME}
-                WHERE {where_clause}
-                ORDER BY embedding <=> $1::vector
-                LIMIT {k};
-            """
+            min_similarity: Minimum similarity threshold (0.0 to 1.0), vector mode only
+            filter_dict: Metadata filters (see search_filters.compile_filters)
+            recall, mode: as for search_similar
 
-            pool = await self.db_manager._get_pool()
-            async with pool.acquire() as conn:
-                rows = await conn.fetch(search_sql, *params)
-
-            # Format results
-            results = []
-            for row in rows:
-                meta = row['metadata']
-                if isinstance(meta, str):
-                    meta = json.loads(meta)
-                elif meta is None:
-                    meta = {}
-                
-                doc = Document(
-                    page_content=row['content'],
-                    metadata={
-                        **meta,
-                        'id': str(row['id']),
-                        'document_id': str(row['document_id']),
-                        'project_id': str(row['project_id']),
-                        'chunk_index': int(row['chunk_index']),
-                        'similarity': float(row['similarity']),
-                    }
-                )
-                results.append(doc)
+        Raises ValueError for min_similarity in hybrid mode: full-text matches
+        are ranked by text, and a similarity cut would drop them.
+        """
+        mode = mode or self.config.SEARCH_DEFAULT_MODE
+        if min_similarity > 0.0 and mode == 'hybrid':
+            raise ValueError("min_similarity is only supported in vector mode")
 
-            logger.info(f"✅ Advanced search returned {len(results)} results")
-            return results
+        filters = dict(filter_dict or {})
+        if document_ids:
+            filters['document_ids'] = document_ids
 
-        except Exception as e:
-            logger.error(f"❌ Advanced search error: {e}", exc_info=True)
-            raise
+        results = await self.search_similar(query, project_id, k, filters, recall=recall, mode=mode)
+        if min_similarity > 0.0:
+            results = [doc for doc in results if doc.metadata['similarity'] >= min_similarity]
+        return results
 
     async def get_document_chunks(
         self,
@@ -926,7 +902,10 @@ class VectorStoreManager:
         try:
             logger.warning(f"⚠️ BULK DELETE: Removing all vectors for project {project_id}")
 
-            # Delete from vector table
+            # Dropping the project's partition removes its rows and HNSW graph
+            # at once; the DELETE catches rows in the default partition (or
+            # everything, when the table is not partitioned)
+            await self.db_manager.drop_project_partition(project_id)
             delete_vectors = f"""
                 DELETE FROM {self.config.VECTOR_TABLE_NAME} 
                 WHERE project_id = $1;
@@ -944,4 +923,95 @@ class VectorStoreManager:
             
         except Exception as e:
             logger.error(f"❌ Error in bulk delete: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+
+# ============================================================================
+# BULK WRITE HELPERS
+# ============================================================================
+# Rows are streamed with COPY (binary protocol, so pgvector's registered codec
+# encodes embeddings) into a per-session temp table and merged with a single
+# INSERT ... SELECT. This keeps the ON CONFLICT semantics of the row-by-row
+# path while replacing one round trip per row with a handful per batch.
+# The row-by-row variants are kept for VECTOR_BULK_INSERT=False and for
+# benchmarking (tools/bench_vector_inserts.py).
+
+VECTOR_COLUMNS = ['id', 'document_id', 'project_id', 'chunk_index', 'content', 'embedding', 'metadata']
+CHUNK_COLUMNS = [
+    'id', 'document_id', 'project_id', 'chunk_index', 'chunk_method',
+    'content_preview', 'token_count', 'metadata'
+]
+
+
+async def _copy_via_staging(conn, table_name: str, columns: List[str], records: List[tuple], on_conflict: str):
+    """COPY records into a temp staging table, then merge into table_name."""
+    staging = f"_staging_{table_name}"
+    column_list = ", ".join(columns)
+
+    # ON COMMIT DELETE ROWS keeps the temp table alive on pooled connections
+    await conn.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging}
+        (LIKE {table_name} INCLUDING DEFAULTS)
+        ON COMMIT DELETE ROWS
+    """)
+    await conn.copy_records_to_table(staging, records=records, columns=columns)
+    await conn.execute(f"""
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list} FROM {staging}
+        {on_conflict};
+    """)
+
+
+async def copy_vector_records(conn, table_name: str, records: List[tuple]):
+    """Bulk write (id, document_id, project_id, chunk_index, content, embedding, metadata) rows"""
+    if not records:
+        return
+    await _copy_via_staging(conn, table_name, VECTOR_COLUMNS, records, "ON CONFLICT DO NOTHING")
+
+
+async def copy_chunk_records(conn, records: List[tuple]):
+    """Bulk upsert rows into document_chunks"""
+    if not records:
+        return
+    await _copy_via_staging(conn, 'document_chunks', CHUNK_COLUMNS, records, """
+        ON CONFLICT (document_id, chunk_index) DO UPDATE
+        SET chunk_method = EXCLUDED.chunk_method,
+            content_preview = EXCLUDED.content_preview,
+            token_count = EXCLUDED.token_count,
+            metadata = EXCLUDED.metadata""")
+
+
+def vector_insert_sql(table_name: str) -> str:
+    return f"""
+        INSERT INTO {table_name}
+        (id, document_id, project_id, chunk_index, content, embedding, metadata)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT DO NOTHING;
+    """
+
+
+CHUNK_UPSERT_SQL = """
+    INSERT INTO document_chunks 
+    (id, document_id, project_id, chunk_index, chunk_method, 
+     content_preview, token_count, metadata)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (document_id, chunk_index) DO UPDATE
+    SET chunk_method = EXCLUDED.chunk_method,
+        content_preview = EXCLUDED.content_preview,
+        token_count = EXCLUDED.token_count,
+        metadata = EXCLUDED.metadata;
+"""
+
+
+
+async def insert_vector_records(conn, table_name: str, records: List[tuple]):
+    """Row-by-row insert into the vector table (one round trip per row)"""
+    query = vector_insert_sql(table_name)
+    for record in records:
+        await conn.execute(query, *record)
+
+
+async def insert_chunk_records(conn, records: List[tuple]):
+    """Row-by-row upsert into document_chunks (one round trip per row)"""
+    for record in records:
+        await conn.execute(CHUNK_UPSERT_SQL, *record)
@@ -0,0 +1,236 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for Vertex AI quota errors (HTTP 429 / RESOURCE_EXHAUSTED) from any client library"""
+    for attr in ('code', 'status_code'):
+        code = getattr(error, attr, None)
+        if code == 429 or (callable(code) and _safe_call(code) == 429):
+            return True
+    if type(error).__name__ in ('ResourceExhausted', 'TooManyRequests'):
+        return True
+    message = str(error)
+    return bool(re.search(r'\b429\b', message)) or 'RESOURCE_EXHAUSTED' in message or 'Quota exceeded' in message
+
+
+def _safe_call(fn):
+    try:
+        return fn()
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    """
+    Continuous-refill token bucket: `rate_per_minute` tokens per minute,
+    bursting up to one minute's worth.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_minute / 60.0)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        # A single request larger than the bucket would wait forever; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * 60.0 / self.rate_per_minute)
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+
+class ModelThrottle:
+    """
+    Client-side throttle for one Vertex AI model.
+
+    - RPM and TPM token buckets pace request starts
+    - an AIMD concurrency limit caps requests in flight: +1/limit per fast
+      success, x0.5 on a 429 and x0.9 when latency runs well above its
+      moving baseline; 429s from requests started before the last x0.5 are
+      the same overload event and do not halve again
+    - 429s are retried with full-jitter exponential backoff instead of
+      surfacing to the caller
+    """
+
+    def __init__(
+        self,
+        model: str,
+        rpm: float,
+        tpm: float,
+        initial_concurrency: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 32.0,
+        latency_factor: float = 2.0
+    ):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.latency_factor = latency_factor
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency_baseline_ms: Optional[float] = None
+        self._last_decrease = float('-inf')
+        self.counters = {'calls': 0, 'rate_limited': 0, 'retries': 0, 'failures': 0}
+        self._slots = asyncio.Condition()
+
+    # ------------------------------------------------------------------
+    # Concurrency slots
+    # ------------------------------------------------------------------
+
+    async def _acquire_slot(self) -> None:
+        async with self._slots:
+            self.waiting += 1
+            try:
+                await self._slots.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def _release_slot(self) -> None:
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    def _on_success(self, latency_ms: float) -> None:
+        if self.latency_baseline_ms is None:
+            self.latency_baseline_ms = latency_ms
+        if latency_ms > self.latency_factor * self.latency_baseline_ms:
+            self.limit = max(self.min_concurrency, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        # Slow-moving baseline so a gradual slowdown still registers
+        self.latency_baseline_ms += 0.05 * (latency_ms - self.latency_baseline_ms)
+
+    def _on_rate_limited(self, started: float) -> None:
+        self.counters['rate_limited'] += 1
+        # Requests already in flight at the last decrease were sent at the old limit
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.min_concurrency, self.limit * 0.5)
+        self._last_decrease = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], tokens: int = 0, requests: int = 1) -> Any:
+        """
+        Run `fn()` (a coroutine factory, so retries get a fresh coroutine)
+        once the buckets and the concurrency limit allow it.
+
+        Args:
+            tokens: estimated tokens the call consumes (input + output)
+            requests: API requests the call makes (e.g. batched embeddings)
+        """
+        attempt = 0
+        while True:
+            await self.requests.acquire(requests)
+            if tokens:
+                await self.tokens.acquire(tokens)
+            await self._acquire_slot()
+            started = time.monotonic()
+            self.counters['calls'] += 1
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self.counters['failures'] += 1
+                    raise
+                self._on_rate_limited(started)
+                if attempt >= self.max_retries:
+                    self.counters['failures'] += 1
+                    logger.error(f"❌ {self.model}: still rate limited after {attempt} retries")
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                self.counters['retries'] += 1
+                logger.warning(
+                    f"⚠️ {self.model} rate limited; concurrency limit now {int(self.limit)}, "
+                    f"retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+            else:
+                self._on_success((time.monotonic() - started) * 1000)
+                return result
+            finally:
+                await self._release_slot()
+            await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'concurrency_limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'queue_depth': self.waiting,
+            'rpm_limit': self.requests.rate_per_minute,
+            'tpm_limit': self.tokens.rate_per_minute,
+            'rpm_available': int(self.requests.available()),
+            'tpm_available': int(self.tokens.available()),
+            'latency_baseline_ms': round(self.latency_baseline_ms, 1) if self.latency_baseline_ms else None,
+            **self.counters,
+        }
+
+
+_throttles: Dict[str, ModelThrottle] = {}
+
+
+def get_throttle(model: str) -> ModelThrottle:
+    """Process-wide throttle for a model, created on first use from Config"""
+    throttle = _throttles.get(model)
+    if throttle is None:
+        from config import Config
+
+        limits = Config.VERTEX_RATE_LIMITS.get(model, {})
+        throttle = ModelThrottle(
+            model,
+            rpm=limits.get('rpm', Config.VERTEX_DEFAULT_RPM),
+            tpm=limits.get('tpm', Config.VERTEX_DEFAULT_TPM),
+            initial_concurrency=Config.VERTEX_INITIAL_CONCURRENCY,
+            min_concurrency=Config.VERTEX_MIN_CONCURRENCY,
+            max_concurrency=Config.VERTEX_MAX_CONCURRENCY,
+            max_retries=Config.VERTEX_MAX_RETRIES
+        )
+        _throttles[model] = throttle
+    return throttle
+
+
+def throttle_metrics() -> Dict[str, Dict[str, Any]]:
+    """Current limits, queue depth and counters for every model seen so far"""
+    return {model: throttle.metrics() for model, throttle in _throttles.items()}
+
+
+def estimate_text_tokens(texts) -> int:
+    """Rough token count for TPM accounting (~4 characters per token)"""
+    if isinstance(texts, str):
+        texts = [texts]
+    return max(1, sum(len(text) for text in texts) // 4)
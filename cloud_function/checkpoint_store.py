@@ -0,0 +1,96 @@
+from typing import Any, Dict
+import gzip
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Durable per-stage pipeline checkpoints.
+
+    One row per (document, stage) holding the stage output as gzip'd JSON:
+    - 'extraction': the serialized ProcessedDocument
+    - 'chunking':   the chunk list (content + metadata) and chunk method
+
+    Checkpoints are tied to the file's sha256, so a changed upload never
+    resumes from stale output. Embeddings need no checkpoint of their own:
+    every batch is committed to document_vectors as it completes, and the
+    retry diffs against those rows by content hash, embedding only what is
+    missing.
+    """
+
+    STAGES = ('extraction', 'chunking')
+
+    def __init__(self, db_manager):
+        from config import Config
+
+        self.db_manager = db_manager
+        self.table = Config.CHECKPOINT_TABLE
+
+    async def initialize(self):
+        """Create the checkpoint table if needed"""
+        await self.db_manager.execute_query(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                stage TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                payload BYTEA NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (document_id, stage)
+            )
+        """)
+        logger.info(f"✅ Checkpoint table '{self.table}' ready")
+
+    async def load(self, document_id: str, file_hash: str) -> Dict[str, Any]:
+        """
+        Return {stage: payload} for checkpoints written for these exact bytes.
+
+        Checkpoints left by a different version of the file are deleted.
+        Failures are logged and treated as "no checkpoints".
+        """
+        try:
+            rows = await self.db_manager.fetch_all(
+                f"SELECT stage, file_hash, payload FROM {self.table} WHERE document_id = $1",
+                (document_id,)
+            )
+            if any(row['file_hash'] != file_hash for row in rows):
+                await self.clear(document_id)
+                logger.info(f"🧹 Discarded checkpoints for {document_id}: file changed")
+                return {}
+            return {
+                row['stage']: json.loads(gzip.decompress(bytes(row['payload'])).decode('utf-8'))
+                for row in rows
+            }
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load checkpoints for {document_id}: {e}")
+            return {}
+
+    async def save(self, document_id: str, stage: str, file_hash: str, payload: Dict[str, Any]) -> None:
+        """Write (or replace) one stage checkpoint"""
+        try:
+            data = gzip.compress(json.dumps(payload, default=str).encode('utf-8'), compresslevel=5)
+            await self.db_manager.execute_query(
+                f"""
+                    INSERT INTO {self.table} (document_id, stage, file_hash, payload)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (document_id, stage)
+                    DO UPDATE SET file_hash = EXCLUDED.file_hash,
+                                  payload = EXCLUDED.payload,
+                                  created_at = CURRENT_TIMESTAMP
+                """,
+                (document_id, stage, file_hash, data)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save {stage} checkpoint for {document_id}: {e}")
+
+    async def clear(self, document_id: str) -> None:
+        """Drop all checkpoints for a document (after it completes)"""
+        try:
+            await self.db_manager.execute_query(
+                f"DELETE FROM {self.table} WHERE document_id = $1",
+                (document_id,)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clear checkpoints for {document_id}: {e}")
@@ -67,9 +67,11 @@ class SemanticChunker(ChunkingStrategy):
         # FIXED: Create Config instance
         config = Config()
        
+        self.config = config
         self.embeddings = VertexAIEmbeddings(
             model_name=config.EMBEDDING_MODEL,
-            project=config.PROJECT_ID
+            project=config.PROJECT_ID,
+            max_retries=0  # 429s are retried by the Vertex throttle, which adapts to them
         )
         self.splitter = LCSemanticChunker(
             embeddings=self.embeddings,
@@ -77,11 +79,20 @@ class SemanticChunker(ChunkingStrategy):
         )
    
     async def chunk(self, text: str, metadata: Dict = None) -> List[Document]:
+        from vertex_throttle import estimate_text_tokens, get_throttle
+        
         def _sync_chunk():
             return self.splitter.create_documents([text])
        
         loop = asyncio.get_event_loop()
-        docs = await loop.run_in_executor(None, _sync_chunk)
+        # The splitter embeds every sentence (synchronously, in batches); account
+        # for it as one throttled call sized by sentence count and text length
+        sentences = max(1, text.count('. ') + text.count('\n'))
+        docs = await get_throttle(self.config.EMBEDDING_MODEL).call(
+            lambda: loop.run_in_executor(None, _sync_chunk),
+            tokens=estimate_text_tokens(text),
+            requests=-(-sentences // self.config.VERTEX_EMBEDDING_TEXTS_PER_REQUEST)
+        )
        
         for idx, doc in enumerate(docs):
             doc.metadata.update({
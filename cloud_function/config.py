@@ -11,11 +11,23 @@ class Config:
     
     # Backend API URL for websocket updates
     API_URL: str = os.getenv('API_URL', 'https://rag-pipeline-backend-141241159430.europe-west1.run.app')  # Default to prod URL
+    # Stage logs and WebSocket updates are buffered and delivered in batches
+    EVENT_BUS_FLUSH_INTERVAL = 0.5        # seconds between background flushes
+    EVENT_BUS_MAX_BATCH = 50              # flush early once this many events are waiting
+    EVENT_BUS_MAX_BUFFER = 5000           # drop oldest WebSocket updates beyond this
+    EVENT_BUS_DRAIN_ON_COMPLETE = True    # flush before process_document returns (CPU may be throttled after)
     
     # Cloud SQL (Password Authentication)
     DB_INSTANCE: str = os.getenv('DB_INSTANCE')
     DB_REGION: str = os.getenv('DB_REGION', 'us-central1')
     DB_NAME: str = os.getenv('DB_NAME', 'vectordb')
+    # Connection pool sizing and health checks
+    DB_POOL_MIN_SIZE: int = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+    DB_POOL_MAX_SIZE: int = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+    DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30'))      # seconds before acquire() gives up
+    DB_POOL_MAX_LIFETIME: float = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))         # recycle connections older than this
+    DB_POOL_IDLE_CHECK_AFTER: float = float(os.getenv('DB_POOL_IDLE_CHECK_AFTER', '30'))   # ping only connections idle longer than this
+    DB_POOL_MAX_IDLE_TIME: float = float(os.getenv('DB_POOL_MAX_IDLE_TIME', '300'))        # close idle connections above min size
     # Note: DB_PASSWORD is read from environment variable in database_manager.py
     
     # GCS
@@ -24,10 +36,22 @@ class Config:
     
     # Pub/Sub
     PUBSUB_TOPIC: str = os.getenv('PUBSUB_TOPIC', 'document-processing')
+    PUBSUB_BATCH_MAX_MESSAGES = 100
+    PUBSUB_BATCH_MAX_BYTES = 1024 * 1024
+    PUBSUB_BATCH_MAX_LATENCY = 0.05      # seconds a batch may wait before it is sent
+    PUBSUB_FIRE_AND_FORGET = True        # don't wait for the server ack; failures are logged by callback
+    PUBSUB_PUBLISH_TIMEOUT = 5.0         # ack wait when PUBSUB_FIRE_AND_FORGET is off
     
     # Embeddings
     EMBEDDING_MODEL: str = os.getenv('EMBEDDING_MODEL', 'text-embedding-005')
     EMBEDDING_DIMENSION: int = 768
+    EMBEDDING_BATCH_SIZE = 250           # Chunks per embed -> store batch
+    EMBEDDING_MAX_INFLIGHT_BATCHES = 2   # Embedded batches allowed to wait for the writer
+
+    # Embedding cache keyed on (model, sha256(chunk text)): in-process LRU + Postgres table
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_TABLE: str = os.getenv('EMBEDDING_CACHE_TABLE', 'embedding_cache')
+    EMBEDDING_CACHE_MEMORY_ENTRIES = 10000
 
     # Gemini Document Understanding Limits
     GEMINI_MAX_PAGES = 1000              # Max pages Gemini can process
@@ -38,6 +62,32 @@ class Config:
     GEMINI_FILE_API_LIMIT_BYTES = 50 * 1024 * 1024
     GEMINI_MAX_RESOLUTION = 3072         # Max image resolution
     
+    # Sharded extraction: large PDFs are split into page ranges processed concurrently
+    GEMINI_SHARDING_ENABLED = True       # False -> old behaviour (truncate / skip Gemini)
+    GEMINI_SHARD_PAGES = 50              # Pages per shard (shards over the File API limit are split further)
+    PDF_INSPECTION_SAMPLE_PAGES = 5      # Pages probed for text layer / image density when routing
+    GEMINI_BYTES_PER_PAGE_ESTIMATE = 100 * 1024  # Page guess for TPM accounting when the count is unknown
+    
+    # Born-digital PDFs (real text layer, few images) skip Gemini and go to PyMuPDF
+    ROUTE_BORN_DIGITAL_TO_PYMUPDF = True
+    BORN_DIGITAL_MIN_CHARS_PER_PAGE = 200    # Avg non-whitespace glyphs per sampled page
+    BORN_DIGITAL_MIN_TEXT_PAGE_RATIO = 0.8   # Share of sampled pages that must have text
+    BORN_DIGITAL_MAX_IMAGES_PER_PAGE = 1.0   # More images than this suggests scans/figures worth Gemini
+    
+    # Hybrid extraction: PyMuPDF for pages with text, Gemini only for scanned pages
+    HYBRID_EXTRACTION_ENABLED = True
+    HYBRID_MIN_PAGE_CHARS = 50               # Pages with fewer glyphs than this are treated as scanned
+    
+    # Vertex AI client throttle (shared by Gemini and embedding calls in this process)
+    VERTEX_RATE_LIMITS = json.loads(os.getenv('VERTEX_RATE_LIMITS', '{}'))  # {"model": {"rpm": .., "tpm": ..}}
+    VERTEX_DEFAULT_RPM = 300
+    VERTEX_DEFAULT_TPM = 4_000_000
+    VERTEX_INITIAL_CONCURRENCY = 8       # AIMD start; grows on fast successes, halves on 429
+    VERTEX_MIN_CONCURRENCY = 1
+    VERTEX_MAX_CONCURRENCY = 32
+    VERTEX_MAX_RETRIES = 5               # 429 retries with full-jitter exponential backoff
+    VERTEX_EMBEDDING_TEXTS_PER_REQUEST = 250
+    
     # File API Settings
     FILE_API_TTL_HOURS = 48              # Files stored for 48 hours
     FILE_API_AUTO_CLEANUP = True         # Auto-delete after processing
@@ -51,10 +101,20 @@ class Config:
     
     # Vector Store
     VECTOR_TABLE_NAME: str = os.getenv('VECTOR_TABLE_NAME', 'document_vectors')
+    VECTOR_BULK_INSERT = True            # COPY + staging merge instead of row-by-row INSERTs
+    # New vector tables are LIST-partitioned by project_id, one HNSW graph per project
+    # (existing tables: tools/migrate_vector_partitions.py)
+    VECTOR_PARTITION_BY_PROJECT: bool = os.getenv('VECTOR_PARTITION_BY_PROJECT', 'true').lower() == 'true'
+    FULLTEXT_CONFIG: str = os.getenv('FULLTEXT_CONFIG', 'simple')  # no stemming: part numbers, codes, names stay intact
+    INCREMENTAL_REINGESTION = True       # Diff chunks by content hash on re-upload instead of wiping
+    PIPELINE_CHECKPOINTS_ENABLED = True  # Persist extraction/chunking output so retries resume
+    CHECKPOINT_TABLE: str = os.getenv('CHECKPOINT_TABLE', 'pipeline_checkpoints')
     
     # Processing Settings
     MAX_RETRIES: int = 3
     MAX_FILE_SIZE_MB: int = 200
+    DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # GCS read size while streaming + hashing downloads
+    DOWNLOAD_TMP_DIR = os.getenv('DOWNLOAD_TMP_DIR') or None  # None -> system temp dir (tmpfs on Cloud Functions)
     TIMEOUT_SECONDS: int = 540
     
     # Chunking Strategies
@@ -103,7 +163,24 @@ class Config:
     # Cache settings for repeated processing
     ENABLE_PROCESSING_CACHE = True
     CACHE_TTL_HOURS = 24
-    
+    EXTRACTION_CACHE_TABLE: str = os.getenv('EXTRACTION_CACHE_TABLE', 'extraction_cache')
+    EXTRACTION_CACHE_DIR = os.getenv('EXTRACTION_CACHE_DIR') or None  # None -> <tmp>/extraction_cache
+    EXTRACTION_CACHE_DISK_MAX_MB = 512
+    EXTRACTION_CACHE_DB_MAX_MB = 4096
+    EXTRACTION_PROMPT_VERSION = 'v1'      # Bump when extraction prompts change to invalidate cached results
+    
+    # Cold start: structured stdout logging unless the Cloud Logging client is requested
+    USE_CLOUD_LOGGING_CLIENT = os.getenv('USE_CLOUD_LOGGING_CLIENT', 'false').lower() == 'true'
+    PREWARM_EMBEDDINGS_CLIENT = True      # build VertexAIEmbeddings in the background on the first document
+
+    # Documents processed side by side on one instance (match the function's --concurrency)
+    PIPELINE_MAX_CONCURRENT_DOCUMENTS = int(os.getenv('PIPELINE_MAX_CONCURRENT_DOCUMENTS', '4'))
+    STAGE_LIMIT_DOWNLOAD = int(os.getenv('STAGE_LIMIT_DOWNLOAD', '4'))
+    STAGE_LIMIT_EXTRACTION = int(os.getenv('STAGE_LIMIT_EXTRACTION', '2'))   # CPU / Gemini heavy
+    STAGE_LIMIT_EMBEDDING = int(os.getenv('STAGE_LIMIT_EMBEDDING', '4'))
+    STAGE_LIMIT_DB = int(os.getenv('STAGE_LIMIT_DB', '4'))                   # record creation and dedup
+
     # Parallel processing limits
     MAX_CONCURRENT_GEMINI_CALLS = 10
-    MAX_CONCURRENT_PYMUPDF_CALLS = 20
\ No newline at end of file
+    MAX_CONCURRENT_PYMUPDF_CALLS = 20
+    PYMUPDF_PARALLEL_MIN_PAGES = 200  # below this, process-pool startup outweighs the speedup
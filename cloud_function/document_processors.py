@@ -1,11 +1,42 @@
 from abc import ABC, abstractmethod
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Dict, List, Any, Optional
 import io
+import os
 import logging
  
 logger = logging.getLogger(__name__)
  
+def open_source(file_bytes: Optional[bytes], file_path: Optional[str] = None):
+    """Input for libraries that take a path or file object; avoids copying on-disk files into memory"""
+    return file_path if file_path else io.BytesIO(file_bytes)
+ 
+@contextmanager
+def open_pdf(file_bytes: Optional[bytes], file_path: Optional[str] = None):
+    """
+    PdfReader over an open file handle, closed on exit. Given a path, pypdf
+    reads the whole file into memory first; given a handle it seeks and
+    reads objects as they are needed.
+    """
+    from pypdf import PdfReader
+    with (open(file_path, 'rb') if file_path else io.BytesIO(file_bytes)) as stream:
+        yield PdfReader(stream)
+ 
+def read_source(file_bytes: Optional[bytes], file_path: Optional[str] = None) -> bytes:
+    """Raw bytes for APIs that need them (inline Gemini parts, text decoding)"""
+    if file_bytes is not None:
+        return file_bytes
+    with open(file_path, 'rb') as f:
+        return f.read()
+ 
+def source_size(file_bytes: Optional[bytes], file_path: Optional[str] = None) -> int:
+    """Size in bytes of a processor input"""
+    if file_bytes is not None:
+        return len(file_bytes)
+    return os.path.getsize(file_path)
+ 
 @dataclass
 class ProcessedDocument:
     """Standardized document processing result"""
@@ -18,11 +49,140 @@ class ProcessedDocument:
     processing_method: str = ""
     error: Optional[str] = None
  
+@dataclass
+class PdfInspection:
+    """
+    Facts about a PDF gathered by one pypdf parse, shared by routing and processors.
+ 
+    The parsed PdfReader is not kept: most files go on to PyMuPDF or Gemini
+    and never need it, so the pypdf-based steps (splitting, the pypdf
+    fallback) parse again on their own. `parse_timings` collects the duration in ms of every parse of this file
+    and is reported in the extraction stage metadata.
+    """
+    page_count: int
+    is_encrypted: bool
+    has_text_layer: bool
+    image_density: float                 # images per sampled page
+    page_offsets: List[int] = field(default_factory=list)  # byte offset of each page object
+    sampled_pages: int = 0
+    text_page_ratio: float = 0.0         # share of sampled pages with extractable text
+    chars_per_page: float = 0.0          # non-whitespace glyphs per sampled page
+    glyph_image_ratio: Optional[float] = None  # glyphs per image; None when no images
+    parse_timings: Dict[str, float] = field(default_factory=dict)
+ 
+    def record_parse(self, name: str, started: float) -> None:
+        """Record a parse that began at time.perf_counter() value `started`"""
+        import time
+        self.parse_timings[name] = round((time.perf_counter() - started) * 1000, 1)
+ 
+    def summary(self) -> Dict[str, Any]:
+        """JSON-safe view for stage metadata"""
+        return {
+            'page_count': self.page_count,
+            'is_encrypted': self.is_encrypted,
+            'has_text_layer': self.has_text_layer,
+            'image_density': round(self.image_density, 2),
+            'sampled_pages': self.sampled_pages,
+            'text_page_ratio': round(self.text_page_ratio, 2),
+            'chars_per_page': round(self.chars_per_page, 1),
+            'glyph_image_ratio': round(self.glyph_image_ratio, 1) if self.glyph_image_ratio is not None else None,
+        }
+ 
+    def is_born_digital(self, min_chars_per_page: float, min_text_page_ratio: float, max_images_per_page: float) -> bool:
+        """True when the sampled pages carry a real text layer and few images (i.e. not a scan)"""
+        return (
+            self.sampled_pages > 0
+            and self.text_page_ratio >= min_text_page_ratio
+            and self.chars_per_page >= min_chars_per_page
+            and self.image_density <= max_images_per_page
+        )
+ 
+def inspect_pdf(file_bytes: Optional[bytes], file_path: Optional[str] = None, sample_pages: int = 5) -> PdfInspection:
+    """
+    Parse a PDF once with pypdf and collect routing facts.
+ 
+    The text-layer probe (text density, glyph/image ratio) looks at
+    `sample_pages` pages spread evenly through the document, so the cost
+    stays flat for very long documents and a text cover page in front of
+    a scanned body does not pass as born-digital.
+    """
+    import time
+ 
+    started = time.perf_counter()
+    with open_pdf(file_bytes, file_path) as reader:
+        is_encrypted = reader.is_encrypted
+        if is_encrypted:
+            # Most "encrypted" PDFs only carry an owner password; try the empty user password
+            try:
+                reader.decrypt('')
+            except Exception:
+                pass
+ 
+        pages = reader.pages
+        offsets = {}
+        for generation in reader.xref.values():
+            offsets.update(generation)
+        page_offsets = [
+            offsets.get(page.indirect_reference.idnum, -1) if page.indirect_reference else -1
+            for page in pages
+        ]
+ 
+        total = len(pages)
+        if total <= sample_pages:
+            sample_indexes = list(range(total))
+        else:
+            step = total / sample_pages
+            sample_indexes = sorted({int(i * step) for i in range(sample_pages)})
+ 
+        sampled = 0
+        text_pages = 0
+        glyphs = 0
+        image_count = 0
+        for index in sample_indexes:
+            page = pages[index]
+            sampled += 1
+            try:
+                page_glyphs = sum(1 for ch in (page.extract_text() or '') if not ch.isspace())
+                glyphs += page_glyphs
+                if page_glyphs:
+                    text_pages += 1
+            except Exception:
+                pass
+            try:
+                resources = page.get('/Resources')
+                resources = resources.get_object() if resources else {}
+                xobjects = resources.get('/XObject')
+                xobjects = xobjects.get_object() if xobjects else {}
+                image_count += sum(
+                    1 for obj in xobjects.values() if obj.get_object().get('/Subtype') == '/Image'
+                )
+            except Exception:
+                pass
+ 
+        inspection = PdfInspection(
+            page_count=total,
+            is_encrypted=is_encrypted,
+            has_text_layer=text_pages > 0,
+            image_density=image_count / sampled if sampled else 0.0,
+            page_offsets=page_offsets,
+            sampled_pages=sampled,
+            text_page_ratio=text_pages / sampled if sampled else 0.0,
+            chars_per_page=glyphs / sampled if sampled else 0.0,
+            glyph_image_ratio=glyphs / image_count if image_count else None
+        )
+    inspection.record_parse('inspect', started)
+    return inspection
+ 
 class BaseDocumentProcessor(ABC):
-    """Base class for document processors"""
+    """
+    Base class for document processors.
+ 
+    Input arrives either as `file_bytes` or, for files streamed to disk by
+    the pipeline, as `file_path` (with file_bytes=None).
+    """
    
     @abstractmethod
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
+    async def process(self, file_bytes: bytes, filename: str, file_path: str = None, **kwargs) -> ProcessedDocument:
         pass
    
     @abstractmethod
@@ -49,7 +209,7 @@ class GeminiProcessor(BaseDocumentProcessor):
     def supports(self, mime_type: str) -> bool:
         return mime_type in self.config.GEMINI_SUPPORTED_TYPES
    
-    async def process(self, file_bytes: bytes, filename: str, mime_type: str = None, **kwargs) -> ProcessedDocument:
+    async def process(self, file_bytes: bytes, filename: str, mime_type: str = None, file_path: str = None, **kwargs) -> ProcessedDocument:
         from google.genai.types import Part, GenerateContentConfig
         import json
        
@@ -74,7 +234,7 @@ class GeminiProcessor(BaseDocumentProcessor):
                 model=self.config.GEMINI_MODEL,
                 contents=[
                     extraction_prompt,
-                    Part.from_bytes(data=file_bytes, mime_type=mime_type)
+                    Part.from_bytes(data=read_source(file_bytes, file_path), mime_type=mime_type)
                 ],
                 config=GenerateContentConfig(
                     temperature=0,
@@ -103,62 +263,188 @@ class GeminiProcessor(BaseDocumentProcessor):
                 error=str(e)
             )
  
+def extract_pymupdf_pages(
+    file_bytes: Optional[bytes],
+    file_path: Optional[str],
+    start: int,
+    stop: int
+) -> Dict[str, Any]:
+    """
+    Extract text, images and tables for pages [start, stop) of a PDF.
+
+    Module-level so it can run in a worker process: each worker opens the
+    file by path (PyMuPDF maps it, so workers share the OS page cache) and
+    returns plain picklable results for its page range.
+    """
+    import fitz
+ 
+    doc = fitz.open(file_path, filetype="pdf") if file_path else fitz.open(stream=file_bytes, filetype="pdf")
+    texts = []
+    tables = []
+    images = []
+    try:
+        for page_index in range(start, min(stop, len(doc))):
+            page = doc[page_index]
+            page_num = page_index + 1
+            texts.append(page.get_text())
+           
+            # Extract images
+            image_list = page.get_images()
+            for img_index, img in enumerate(image_list):
+                images.append({
+                    'page': page_num,
+                    'index': img_index,
+                    'description': f'Image {img_index + 1} on page {page_num}'
+                })
+           
+            # Extract tables (if supported)
+            try:
+                if hasattr(page, 'find_tables'):
+                    tables_on_page = page.find_tables()
+                    if tables_on_page:
+                        for table_index, table in enumerate(tables_on_page):
+                            try:
+                                tables.append({
+                                    'page': page_num,
+                                    'content': table.extract(),
+                                    'description': f'Table {table_index + 1} on page {page_num}'
+                                })
+                            except:
+                                pass
+            except Exception:
+                pass
+    finally:
+        doc.close()
+    return {'texts': texts, 'tables': tables, 'images': images}
+ 
+_pymupdf_pool = None
+ 
+def get_pymupdf_pool(max_workers: int):
+    """Process pool shared by all PyMuPDF parallel extractions, created on first use"""
+    global _pymupdf_pool
+    if _pymupdf_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: forking a process that already holds gRPC/DB client threads is unsafe
+        _pymupdf_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pymupdf_pool
+ 
+def reset_pymupdf_pool(broken) -> None:
+    """Shut down a broken pool so the next get_pymupdf_pool() starts a new one"""
+    global _pymupdf_pool
+    # Concurrent extractions may both see the break; only the first replaces the pool
+    if _pymupdf_pool is broken:
+        _pymupdf_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+ 
 class PyMuPDFProcessor(BaseDocumentProcessor):
-    """Process PDFs using PyMuPDF"""
+    """
+    Process PDFs using PyMuPDF.
+ 
+    Small documents are extracted in one worker thread. Documents with at
+    least PYMUPDF_PARALLEL_MIN_PAGES pages that are on disk are split into
+    page ranges and extracted across a process pool of up to
+    MAX_CONCURRENT_PYMUPDF_CALLS workers, then merged in page order.
+    """
    
     def supports(self, mime_type: str) -> bool:
         return mime_type == 'application/pdf'
    
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
+    async def extract(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        file_path: str = None,
+        inspection: PdfInspection = None
+    ) -> Dict[str, Any]:
+        """
+        Extract per-page results without joining them.
+ 
+        Returns a dict with `texts` (one entry per page, in order), `tables`,
+        `images`, `metadata` and `page_count`. Used by process() and by
+        callers that need page-level text, such as the hybrid processor.
+        """
+        import asyncio
+        import time
         import fitz
+        from config import Config
        
-        try:
+        started = time.perf_counter()
+        if file_path:
+            doc = fitz.open(file_path, filetype="pdf")
+        else:
             doc = fitz.open(stream=file_bytes, filetype="pdf")
-           
-            full_text = []
-            tables = []
-            images = []
-           
-            for page_num, page in enumerate(doc, start=1):
-                text = page.get_text()
-                full_text.append(text)
-               
-                # Extract images
-                image_list = page.get_images()
-                for img_index, img in enumerate(image_list):
-                    images.append({
-                        'page': page_num,
-                        'index': img_index,
-                        'description': f'Image {img_index + 1} on page {page_num}'
-                    })
-               
-                # Extract tables (if supported)
+        if inspection:
+            inspection.record_parse('pymupdf_open', started)
+        page_count = len(doc)
+        metadata = {
+            'title': doc.metadata.get('title', ''),
+            'author': doc.metadata.get('author', ''),
+            'pages': page_count
+        }
+        doc.close()
+       
+        loop = asyncio.get_event_loop()
+        workers = min(Config.MAX_CONCURRENT_PYMUPDF_CALLS, os.cpu_count() or 1)
+        parallel = (
+            file_path is not None
+            and workers > 1
+            and page_count >= Config.PYMUPDF_PARALLEL_MIN_PAGES
+        )
+       
+        if parallel:
+            step = -(-page_count // workers)
+            ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            for attempt in range(2):
+                pool = get_pymupdf_pool(workers)
                 try:
-                    if hasattr(page, 'find_tables'):
-                        tables_on_page = page.find_tables()
-                        if tables_on_page:
-                            for table_index, table in enumerate(tables_on_page):
-                                try:
-                                    tables.append({
-                                        'page': page_num,
-                                        'content': table.extract(),
-                                        'description': f'Table {table_index + 1} on page {page_num}'
-                                    })
-                                except:
-                                    pass
-                except Exception:
-                    pass
+                    parts = await asyncio.gather(*[
+                        loop.run_in_executor(pool, extract_pymupdf_pages, None, file_path, start, stop)
+                        for start, stop in ranges
+                    ])
+                    break
+                except BrokenProcessPool:
+                    # A worker died (OOM kill, crash in MuPDF); the pool refuses all further work
+                    reset_pymupdf_pool(pool)
+                    if attempt:
+                        raise
+                    logger.warning(f"⚠️ PyMuPDF process pool broke on {filename}, retrying with a new pool")
+            metadata['parallel_workers'] = len(ranges)
+            logger.info(f"PyMuPDF extracted {page_count} pages of {filename} across {len(ranges)} processes")
+        else:
+            parts = [await loop.run_in_executor(
+                None, extract_pymupdf_pages, file_bytes, file_path, 0, page_count
+            )]
+       
+        # Ranges are contiguous and gathered in order, so concatenation keeps page order
+        return {
+            'texts': [text for part in parts for text in part['texts']],
+            'tables': [table for part in parts for table in part['tables']],
+            'images': [image for part in parts for image in part['images']],
+            'metadata': metadata,
+            'page_count': page_count
+        }
+   
+    async def process(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        file_path: str = None,
+        inspection: PdfInspection = None,
+        **kwargs
+    ) -> ProcessedDocument:
+        try:
+            extracted = await self.extract(file_bytes, filename, file_path=file_path, inspection=inspection)
            
             return ProcessedDocument(
-                text="\n\n".join(full_text),
-                metadata={
-                    'title': doc.metadata.get('title', ''),
-                    'author': doc.metadata.get('author', ''),
-                    'pages': len(doc)
-                },
-                tables=tables,
-                images=images,
-                page_count=len(doc),
+                text="\n\n".join(extracted['texts']),
+                metadata=extracted['metadata'],
+                tables=extracted['tables'],
+                images=extracted['images'],
+                page_count=extracted['page_count'],
                 processing_method='pymupdf'
             )
            
@@ -177,26 +463,39 @@ class PyPDFProcessor(BaseDocumentProcessor):
     def supports(self, mime_type: str) -> bool:
         return mime_type == 'application/pdf'
    
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
-        from pypdf import PdfReader
+    async def process(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        file_path: str = None,
+        inspection: PdfInspection = None,
+        **kwargs
+    ) -> ProcessedDocument:
+        import time
        
         try:
-            pdf = PdfReader(io.BytesIO(file_bytes))
-           
-            full_text = []
-            for page in pdf.pages:
-                full_text.append(page.extract_text())
-           
-            metadata = pdf.metadata or {}
+            started = time.perf_counter()
+            with open_pdf(file_bytes, file_path) as pdf:
+                if inspection is not None:
+                    inspection.record_parse('pypdf', started)
+               
+                full_text = []
+                for page in pdf.pages:
+                    full_text.append(page.extract_text())
+               
+                # Read while the file is open: values may be indirect objects
+                info = pdf.metadata or {}
+                page_count = len(pdf.pages)
+                metadata = {
+                    'title': info.get('/Title', ''),
+                    'author': info.get('/Author', ''),
+                    'pages': page_count
+                }
            
             return ProcessedDocument(
                 text="\n\n".join(full_text),
-                metadata={
-                    'title': metadata.get('/Title', ''),
-                    'author': metadata.get('/Author', ''),
-                    'pages': len(pdf.pages)
-                },
-                page_count=len(pdf.pages),
+                metadata=metadata,
+                page_count=page_count,
                 processing_method='pypdf'
             )
            
@@ -218,11 +517,11 @@ class DocxProcessor(BaseDocumentProcessor):
             'application/msword'
         }
    
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
+    async def process(self, file_bytes: bytes, filename: str, file_path: str = None, **kwargs) -> ProcessedDocument:
         from docx import Document
        
         try:
-            doc = Document(io.BytesIO(file_bytes))
+            doc = Document(open_source(file_bytes, file_path))
            
             full_text = []
             tables = []
@@ -272,11 +571,11 @@ class ExcelProcessor(BaseDocumentProcessor):
             'application/vnd.ms-excel'
         }
    
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
+    async def process(self, file_bytes: bytes, filename: str, file_path: str = None, **kwargs) -> ProcessedDocument:
         from openpyxl import load_workbook
        
         try:
-            wb = load_workbook(io.BytesIO(file_bytes), read_only=True)
+            wb = load_workbook(open_source(file_bytes, file_path), read_only=True)
            
             full_text = []
             tables = []
@@ -320,7 +619,8 @@ class TextProcessor(BaseDocumentProcessor):
     def supports(self, mime_type: str) -> bool:
         return mime_type in {'text/plain', 'text/markdown', 'text/csv'}
    
-    async def process(self, file_bytes: bytes, filename: str, **kwargs) -> ProcessedDocument:
+    async def process(self, file_bytes: bytes, filename: str, file_path: str = None, **kwargs) -> ProcessedDocument:
+        file_bytes = read_source(file_bytes, file_path)
         try:
             text = file_bytes.decode('utf-8')
             return ProcessedDocument(
@@ -365,7 +665,8 @@ class DocumentProcessorFactory:
         file_bytes: bytes,
         filename: str,
         mime_type: str,
-        preferred_method: str = None
+        preferred_method: str = None,
+        file_path: str = None
     ) -> ProcessedDocument:
         """Process document with fallback strategies"""
         from config import Config
@@ -394,7 +695,8 @@ class DocumentProcessorFactory:
                 result = await processor.process(
                     file_bytes=file_bytes,
                     filename=filename,
-                    mime_type=mime_type
+                    mime_type=mime_type,
+                    file_path=file_path
                 )
                
                 if result.error is None and result.text:
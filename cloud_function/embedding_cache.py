@@ -0,0 +1,132 @@
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """sha256 of chunk text, used as the content address for embeddings"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed on (embedding model, sha256(text)).
+
+    Two tiers:
+    - an in-process LRU (float32 arrays, so 10k entries of 768 dims is ~30MB)
+    - the embedding_cache table in Postgres, shared by every instance
+
+    Cache failures are logged and treated as misses; they never fail ingestion.
+    """
+
+    def __init__(self, db_manager, model_name: str, max_entries: int = 10000):
+        from config import Config
+
+        self.db_manager = db_manager
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.config = Config
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+
+    async def initialize(self):
+        """Create the Postgres tier if needed"""
+        await self.db_manager.execute_query(f"""
+            CREATE TABLE IF NOT EXISTS {self.config.EMBEDDING_CACHE_TABLE} (
+                model TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedding vector({self.config.EMBEDDING_DIMENSION}) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (model, content_hash)
+            )
+        """)
+        logger.info(f"✅ Embedding cache table '{self.config.EMBEDDING_CACHE_TABLE}' ready")
+
+    # ------------------------------------------------------------------
+    # In-process LRU tier
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        value = self._memory.get(key)
+        if value is None:
+            return None
+        self._memory.move_to_end(key)
+        return value.tolist()
+
+    def _memory_put(self, key: str, embedding) -> None:
+        self._memory[key] = array('f', embedding)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get_many(self, hashes: List[str], stats: Dict = None) -> Dict[str, List[float]]:
+        """
+        Look up embeddings for the given content hashes.
+
+        Returns a dict of hash -> embedding for every hit. When `stats` is
+        given, `cache_hits` (split into `cache_memory_hits` and
+        `cache_db_hits`) and `cache_misses` are incremented in place.
+        """
+        found = {}
+        remaining = []
+        for key in dict.fromkeys(hashes):
+            embedding = self._memory_get(key)
+            if embedding is not None:
+                found[key] = embedding
+            else:
+                remaining.append(key)
+        memory_hits = len(found)
+
+        if remaining:
+            try:
+                rows = await self.db_manager.fetch_all(
+                    f"""
+                        SELECT content_hash, embedding
+                        FROM {self.config.EMBEDDING_CACHE_TABLE}
+                        WHERE model = $1 AND content_hash = ANY($2::text[])
+                    """,
+                    (self.model_name, remaining)
+                )
+                for row in rows:
+                    embedding = [float(x) for x in row['embedding']]  # numpy array via pgvector codec
+                    found[row['content_hash']] = embedding
+                    self._memory_put(row['content_hash'], embedding)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache lookup failed: {e}")
+
+        if stats is not None:
+            db_hits = len(found) - memory_hits
+            stats['cache_hits'] = stats.get('cache_hits', 0) + len(found)
+            stats['cache_memory_hits'] = stats.get('cache_memory_hits', 0) + memory_hits
+            stats['cache_db_hits'] = stats.get('cache_db_hits', 0) + db_hits
+            stats['cache_misses'] = stats.get('cache_misses', 0) + len(remaining) - db_hits
+        return found
+
+    async def put_many(self, embeddings: Dict[str, List[float]]) -> None:
+        """Store freshly computed embeddings in both tiers"""
+        if not embeddings:
+            return
+
+        for key, embedding in embeddings.items():
+            self._memory_put(key, embedding)
+
+        try:
+            pool = await self.db_manager._get_pool()
+            async with pool.acquire() as conn:
+                await conn.executemany(
+                    f"""
+                        INSERT INTO {self.config.EMBEDDING_CACHE_TABLE} (model, content_hash, embedding)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (model, content_hash) DO NOTHING
+                    """,
+                    [(self.model_name, key, embedding) for key, embedding in embeddings.items()]
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to persist {len(embeddings)} embeddings to cache: {e}")
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One round trip for a whole batch of stage rows
+LOG_STAGES_SQL = """
+    INSERT INTO processing_logs
+    (document_id, project_id, stage, status, duration_ms, error_details, metadata)
+    SELECT document_id, project_id, stage, status, duration_ms, error_details, metadata::jsonb
+    FROM unnest($1::uuid[], $2::uuid[], $3::text[], $4::text[], $5::int[], $6::text[], $7::text[])
+        AS t(document_id, project_id, stage, status, duration_ms, error_details, metadata)
+"""
+
+
+class StageEventBus:
+    """
+    Buffered, in-process delivery of pipeline stage events.
+
+    log_stage() and notify() only append to a buffer. A background task
+    flushes every EVENT_BUS_FLUSH_INTERVAL seconds, or sooner once
+    EVENT_BUS_MAX_BATCH events are waiting:
+    - stage rows go to processing_logs in one multi-row INSERT
+    - WebSocket messages go to /api/projects/{id}/broadcast as one batch
+      per project, over a persistent (HTTP/2 when available) client
+
+    Delivery failures are logged and dropped; they never fail a document.
+    """
+
+    def __init__(self, db_manager, api_url: str):
+        from config import Config
+
+        self.db_manager = db_manager
+        self.api_url = api_url
+        self.flush_interval = Config.EVENT_BUS_FLUSH_INTERVAL
+        self.max_batch = Config.EVENT_BUS_MAX_BATCH
+        self.max_buffer = Config.EVENT_BUS_MAX_BUFFER
+
+        self._rows: List[tuple] = []
+        self._messages: List[tuple] = []
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.counters = {'rows_written': 0, 'messages_sent': 0, 'flushes': 0, 'dropped': 0}
+
+        db_manager.register_statement('log_stages', LOG_STAGES_SQL)
+
+    # ------------------------------------------------------------------
+    # Producers (non-blocking)
+    # ------------------------------------------------------------------
+
+    def log_stage(
+        self,
+        document_id: str,
+        project_id: str,
+        stage: str,
+        status: str,
+        duration_ms: int = None,
+        error_details: str = None,
+        metadata: Dict = None
+    ):
+        """Queue a processing_logs row and its WebSocket update"""
+        self._rows.append((
+            document_id, project_id, stage, status, duration_ms, error_details,
+            json.dumps(metadata, default=str) if metadata else None
+        ))
+        self.notify(
+            project_id=str(project_id),
+            document_id=document_id,
+            status=f"{stage}_{status}",
+            data={
+                'stage': stage,
+                'status': status,
+                'duration_ms': duration_ms,
+                'error_details': error_details,
+                'metadata': metadata
+            }
+        )
+
+    def notify(self, *, project_id: str, document_id: str, status: str, data: dict):
+        """Queue a WebSocket update"""
+        self._messages.append((str(project_id), {
+            "type": "document_update",
+            "document_id": document_id,
+            "status": status,
+            "data": data,
+            "timestamp": datetime.now().isoformat()
+        }))
+        self._trim()
+        self._ensure_running()
+        if len(self._messages) >= self.max_batch or len(self._rows) >= self.max_batch:
+            self._wakeup.set()
+
+    def _trim(self):
+        """Bound memory if the backend is down: drop the oldest messages first"""
+        excess = len(self._messages) - self.max_buffer
+        if excess > 0:
+            del self._messages[:excess]
+            self.counters['dropped'] += excess
+            logger.warning(f"⚠️ Event bus buffer full, dropped {excess} WebSocket updates")
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            limits = httpx.Limits(max_keepalive_connections=5, keepalive_expiry=60.0)
+            try:
+                self._client = httpx.AsyncClient(http2=True, timeout=5.0, limits=limits)
+            except ImportError:
+                # h2 not installed: still reuse one keep-alive HTTP/1.1 connection
+                self._client = httpx.AsyncClient(timeout=5.0, limits=limits)
+        return self._client
+
+    async def flush(self):
+        """Deliver everything buffered so far"""
+        if not self._rows and not self._messages:
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            messages, self._messages = self._messages, []
+            self.counters['flushes'] += 1
+            # Rows first, so a client refreshing on an update sees the log entry
+            await self._write_rows(rows)
+            await self._broadcast(messages)
+
+    async def _write_rows(self, rows: List[tuple]):
+        if not rows:
+            return
+        try:
+            await self.db_manager.execute_prepared('log_stages', *[list(column) for column in zip(*rows)])
+            self.counters['rows_written'] += len(rows)
+        except Exception as e:
+            self.counters['dropped'] += len(rows)
+            logger.warning(f"⚠️ Failed to write {len(rows)} processing log rows: {e}")
+
+    async def _broadcast(self, messages: List[tuple]):
+        if not messages:
+            return
+        by_project: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for project_id, message in messages:
+            by_project[project_id].append(message)
+
+        client = self._get_client()
+
+        async def send(project_id, batch):
+            try:
+                response = await client.post(
+                    f"{self.api_url}/api/projects/{project_id}/broadcast",
+                    json={"type": "batch", "messages": batch},
+                    params={"user_id": "system"}
+                )
+                response.raise_for_status()
+                self.counters['messages_sent'] += len(batch)
+            except Exception as e:
+                self.counters['dropped'] += len(batch)
+                logger.warning(f"⚠️ Failed to send {len(batch)} WebSocket updates for project {project_id}: {e}")
+
+        await asyncio.gather(*[send(project_id, batch) for project_id, batch in by_project.items()])
+
+    async def close(self):
+        """Flush, stop the background task and close the HTTP client"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
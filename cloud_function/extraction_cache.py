@@ -0,0 +1,304 @@
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# Disk entries start with this magic and the write time (unix seconds, big-endian double)
+_DISK_HEADER = b'EXC1'
+_DISK_HEADER_SIZE = len(_DISK_HEADER) + 8
+# A trim shrinks the table to this share of its budget, so the next writes don't trim again
+_DB_TRIM_TARGET = 0.8
+
+
+def _key_digest(key: Tuple[str, str, str, str]) -> str:
+    """Stable file name for a cache key"""
+    return hashlib.sha256('\x1f'.join(key).encode('utf-8')).hexdigest()
+
+
+def serialize_result(result) -> bytes:
+    """ProcessedDocument -> gzip'd JSON"""
+    return gzip.compress(json.dumps(asdict(result), default=str).encode('utf-8'), compresslevel=5)
+
+
+def deserialize_result(payload: bytes):
+    """gzip'd JSON -> ProcessedDocument"""
+    from document_processors import ProcessedDocument
+    return ProcessedDocument(**json.loads(gzip.decompress(payload).decode('utf-8')))
+
+
+class ExtractionCache:
+    """
+    Extraction result cache keyed on (file sha256, processing method,
+    processor version, prompt version).
+
+    Two tiers:
+    - a size-bounded LRU directory on local disk (per instance)
+    - the extraction_cache table in Postgres (gzip'd JSON in a BYTEA column,
+      shared by every instance so retries and re-uploads hit on any worker)
+
+    Entries older than CACHE_TTL_HOURS (counted from the original write,
+    whichever tier serves them) are ignored and purged. Both tiers are
+    trimmed to their size budget by last access; the table only once this
+    instance's running total of it passes the budget. Cache failures are
+    logged and treated as misses; they never fail extraction.
+    """
+
+    def __init__(self, db_manager=None):
+        import tempfile
+        from config import Config
+
+        self.db_manager = db_manager
+        self.config = Config
+        self.ttl_seconds = Config.CACHE_TTL_HOURS * 3600
+        self.disk_dir = Config.EXTRACTION_CACHE_DIR or os.path.join(tempfile.gettempdir(), 'extraction_cache')
+        self.disk_max_bytes = Config.EXTRACTION_CACHE_DISK_MAX_MB * 1024 * 1024
+        self.db_max_bytes = Config.EXTRACTION_CACHE_DB_MAX_MB * 1024 * 1024
+        # Table size as last measured plus this instance's writes since (None: not measured yet)
+        self._db_bytes: Optional[int] = None
+
+    async def initialize(self):
+        """Create the Postgres tier and drop expired rows"""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        if self.db_manager is None:
+            return
+        table = self.config.EXTRACTION_CACHE_TABLE
+        await self.db_manager.execute_query(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                file_hash TEXT NOT NULL,
+                processing_method TEXT NOT NULL,
+                processor_version TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result BYTEA NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (file_hash, processing_method, processor_version, prompt_version)
+            )
+        """)
+        await self.db_manager.execute_query(
+            f"DELETE FROM {table} WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => $1)",
+            (self.ttl_seconds,)
+        )
+        logger.info(f"✅ Extraction cache table '{table}' ready")
+
+    def processor_version(self, method: str) -> str:
+        """Gemini-backed methods are versioned by model; local parsers by name only"""
+        if method in ('gemini', 'hybrid'):
+            return self.config.GEMINI_MODEL
+        return 'local'
+
+    def key(self, file_hash: str, method: str) -> Tuple[str, str, str, str]:
+        return (file_hash, method, self.processor_version(method), self.config.EXTRACTION_PROMPT_VERSION)
+
+    # ------------------------------------------------------------------
+    # Local disk LRU tier
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, key) -> str:
+        return os.path.join(self.disk_dir, _key_digest(key) + '.json.gz')
+
+    def _disk_get(self, key) -> Optional[bytes]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(_DISK_HEADER_SIZE)
+                # The write time is stored in the file: mtime is bumped on every
+                # hit for LRU order, and that bumps ctime too
+                if len(header) < _DISK_HEADER_SIZE or not header.startswith(_DISK_HEADER):
+                    written_at = None
+                else:
+                    written_at = struct.unpack('>d', header[len(_DISK_HEADER):])[0]
+                if written_at is None or time.time() - written_at > self.ttl_seconds:
+                    payload = None
+                else:
+                    payload = f.read()
+        except FileNotFoundError:
+            return None
+        if payload is None:
+            self._disk_remove(path)
+            return None
+        os.utime(path)
+        return payload
+
+    def _disk_put(self, key, payload: bytes, written_at: Optional[float] = None) -> None:
+        """Store `payload`; `written_at` carries over the original write time of a DB-tier hit"""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_DISK_HEADER + struct.pack('>d', time.time() if written_at is None else written_at))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._disk_trim()
+
+    def _disk_trim(self) -> None:
+        """Evict least recently used files until the directory fits its budget"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.json.gz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            self._disk_remove(path)
+            total -= size
+
+    @staticmethod
+    def _disk_remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, file_hash: str, methods: List[str]):
+        """
+        Return (method, ProcessedDocument) for the first of `methods` with a
+        live cache entry for this file, or None.
+
+        `methods` is the factory's routing order, so a cached Gemini result is
+        not returned for a file that is now routed to PyMuPDF first.
+        """
+        if not file_hash or not methods:
+            return None
+
+        loop = asyncio.get_event_loop()
+        keys = {method: self.key(file_hash, method) for method in methods}
+
+        for method in methods:
+            try:
+                payload = await loop.run_in_executor(None, self._disk_get, keys[method])
+                if payload is not None:
+                    logger.info(f"⚡ Extraction cache hit (disk) for {file_hash[:12]} via {method}")
+                    return method, deserialize_result(payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Extraction disk cache read failed: {e}")
+
+        if self.db_manager is None:
+            return None
+
+        try:
+            table = self.config.EXTRACTION_CACHE_TABLE
+            rows = await self.db_manager.fetch_all(
+                f"""
+                    UPDATE {table}
+                    SET last_accessed = CURRENT_TIMESTAMP
+                    WHERE file_hash = $1
+                      AND processing_method = ANY($2::text[])
+                      AND prompt_version = $3
+                      AND created_at >= CURRENT_TIMESTAMP - make_interval(secs => $4)
+                    RETURNING processing_method, processor_version, result,
+                              EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - created_at) AS age_seconds
+                """,
+                (file_hash, methods, self.config.EXTRACTION_PROMPT_VERSION, self.ttl_seconds)
+            )
+            found = {
+                row['processing_method']: row
+                for row in rows
+                if row['processor_version'] == self.processor_version(row['processing_method'])
+            }
+            for method in methods:
+                if method in found:
+                    logger.info(f"⚡ Extraction cache hit (db) for {file_hash[:12]} via {method}")
+                    payload = bytes(found[method]['result'])
+                    # The disk copy expires with the row, not a full TTL from now
+                    written_at = time.time() - float(found[method]['age_seconds'] or 0)
+                    await loop.run_in_executor(None, self._disk_put, keys[method], payload, written_at)
+                    return method, deserialize_result(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ Extraction cache lookup failed: {e}")
+        return None
+
+    async def put(self, file_hash: str, method: str, result) -> None:
+        """Store a successful extraction in both tiers"""
+        if not file_hash or result.error or not result.text:
+            return
+
+        key = self.key(file_hash, method)
+        try:
+            payload = serialize_result(result)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not serialize extraction result: {e}")
+            return
+
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._disk_put, key, payload)
+        except Exception as e:
+            logger.warning(f"⚠️ Extraction disk cache write failed: {e}")
+
+        if self.db_manager is None:
+            return
+
+        try:
+            table = self.config.EXTRACTION_CACHE_TABLE
+            await self.db_manager.execute_query(
+                f"""
+                    INSERT INTO {table}
+                        (file_hash, processing_method, processor_version, prompt_version, result, size_bytes)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    ON CONFLICT (file_hash, processing_method, processor_version, prompt_version)
+                    DO UPDATE SET result = EXCLUDED.result,
+                                  size_bytes = EXCLUDED.size_bytes,
+                                  created_at = CURRENT_TIMESTAMP,
+                                  last_accessed = CURRENT_TIMESTAMP
+                """,
+                (*key, payload, len(payload))
+            )
+            await self._db_trim(len(payload))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to persist extraction result to cache: {e}")
+
+    async def _db_trim(self, added_bytes: int) -> None:
+        """
+        Keep the table inside its budget. The full-table trim only runs once
+        the tracked total passes the budget, and then shrinks the table to
+        _DB_TRIM_TARGET of it by dropping least recently used rows.
+        """
+        table = self.config.EXTRACTION_CACHE_TABLE
+        if self._db_bytes is None:
+            self._db_bytes = await self._db_total_bytes()
+        else:
+            self._db_bytes += added_bytes
+        if self._db_bytes <= self.db_max_bytes:
+            return
+
+        await self.db_manager.execute_query(
+            f"""
+                DELETE FROM {table} t
+                USING (
+                    SELECT file_hash, processing_method, processor_version, prompt_version,
+                           SUM(size_bytes) OVER (ORDER BY last_accessed DESC) AS running_bytes
+                    FROM {table}
+                ) ranked
+                WHERE ranked.running_bytes > $1
+                  AND t.file_hash = ranked.file_hash
+                  AND t.processing_method = ranked.processing_method
+                  AND t.processor_version = ranked.processor_version
+                  AND t.prompt_version = ranked.prompt_version
+            """,
+            (int(self.db_max_bytes * _DB_TRIM_TARGET),)
+        )
+        # Other instances write to the table too; re-measure rather than assume
+        self._db_bytes = await self._db_total_bytes()
+        logger.info(f"🧹 Trimmed extraction cache table to {self._db_bytes / 1024 / 1024:.0f}MB")
+
+    async def _db_total_bytes(self) -> int:
+        row = await self.db_manager.fetch_one(
+            f"SELECT COALESCE(SUM(size_bytes), 0) AS total FROM {self.config.EXTRACTION_CACHE_TABLE}"
+        )
+        return int(row['total'])
@@ -1,12 +1,76 @@
-from google import genai
-from google.genai.types import GenerateContentConfig, Part
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
 import logging
 import io
 import asyncio  # FIXED: Add missing import
+from vertex_throttle import get_throttle
 
 logger = logging.getLogger(__name__)
 
+
+def _offset_pages(items: List[Dict], offset: int) -> List[Dict]:
+    """Shift shard-relative page numbers to document page numbers"""
+    shifted = []
+    for item in items or []:
+        item = dict(item)
+        page = item.get('page')
+        # 0 / missing means Gemini could not tell the page; leave it alone
+        if isinstance(page, int) and page > 0:
+            item['page'] = page + offset
+        shifted.append(item)
+    return shifted
+
+
+def stitch_shard_results(shards: List[tuple], total_pages: int):
+    """
+    Merge per-shard extraction results into one ProcessedDocument.
+
+    Args:
+        shards: (first page index, ProcessedDocument) per shard, in page order
+        total_pages: page count of the original document
+    """
+    from document_processors import ProcessedDocument
+
+    texts, sections, tables, images = [], [], [], []
+    metadata = {}
+    for offset, result in shards:
+        texts.append(result.text)
+        sections.extend(_offset_pages(result.sections, offset))
+        tables.extend(_offset_pages(result.tables, offset))
+        images.extend(_offset_pages(result.images, offset))
+        # Title/author come from whichever shard saw them first (normally the cover page)
+        for key, value in (result.metadata or {}).items():
+            if value and not metadata.get(key):
+                metadata[key] = value
+
+    metadata['pages'] = total_pages
+    metadata['total_pages'] = total_pages
+    metadata['shards'] = len(shards)
+
+    return ProcessedDocument(
+        text="\n\n".join(text for text in texts if text),
+        metadata=metadata,
+        sections=sections,
+        tables=tables,
+        images=images,
+        page_count=total_pages,
+        processing_method='gemini-sharded'
+    )
+
+
+def shard_ranges(page_count: int, shard_pages: int, ranges: List[tuple] = None) -> List[tuple]:
+    """
+    [start, stop) page ranges of at most `shard_pages` pages covering the
+    document, or only `ranges` ([start, stop) page index pairs) when given
+    """
+    wanted = ranges or [(0, page_count)]
+    return [
+        (start, min(start + shard_pages, stop))
+        for first, stop in wanted
+        for start in range(first, stop, shard_pages)
+    ]
+
+
 class EnhancedGeminiProcessor:
     """
     Enhanced Gemini processor with proper limits handling
@@ -22,18 +86,29 @@ class EnhancedGeminiProcessor:
     MAX_RESOLUTION = 3072
     
     def __init__(self):
-        from google import genai
         from config import Config
         
         # FIXED: Create Config instance
         config = Config()
         
-        self.client = genai.Client(
-            vertexai=True,
-            project=config.PROJECT_ID,
-            location=config.REGION
-        )
+        self._client = None
         self.config = config
+        
+        # Caps concurrent Gemini calls across all shards of all documents
+        self.semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_GEMINI_CALLS)
+    
+    @property
+    def client(self):
+        """genai client, created (and google.genai imported) on the first Gemini call"""
+        if self._client is None:
+            from google import genai
+            
+            self._client = genai.Client(
+                vertexai=True,
+                project=self.config.PROJECT_ID,
+                location=self.config.REGION
+            )
+        return self._client
     
     def supports(self, mime_type: str) -> bool:
         """Check if file type is supported by Gemini"""
@@ -44,16 +119,35 @@ class EnhancedGeminiProcessor:
         file_bytes: bytes, 
         filename: str, 
         mime_type: str = None,
+        file_path: str = None,
+        inspection=None,
         **kwargs
     ):
         """
-        Process document with intelligent handling of Gemini limitations
+        Process document with intelligent handling of Gemini limitations.
+
+        `inspection` is the factory's PdfInspection; when given, the PDF is
+        not parsed again to count pages.
         """
-        from document_processors import ProcessedDocument
+        from document_processors import ProcessedDocument, read_source, source_size
         
-        file_size = len(file_bytes)
+        file_size = source_size(file_bytes, file_path)
+        if inspection is not None:
+            page_count = inspection.page_count
+        else:
+            page_count = await self._estimate_page_count(file_bytes, mime_type, file_path)
+        
+        # Step 1: PDFs over the page or size limits are split into shards
+        if (
+            page_count
+            and self.config.GEMINI_SHARDING_ENABLED
+            and (page_count > self.MAX_PAGES or file_size > self.FILE_API_LIMIT_BYTES)
+        ):
+            return await self._process_sharded(
+                file_bytes, filename, mime_type, page_count, file_path=file_path, inspection=inspection
+            )
         
-        # Step 1: Validate file size
+        # Step 2: Validate file size
         if file_size > self.FILE_API_LIMIT_BYTES:
             logger.warning(f"File {filename} ({file_size} bytes) exceeds File API limit")
             return ProcessedDocument(
@@ -63,37 +157,79 @@ class EnhancedGeminiProcessor:
                 error=f"File size {file_size / (1024*1024):.1f}MB exceeds Gemini's 50MB limit"
             )
         
-        # Step 2: Check page count (for PDFs)
-        page_count = await self._estimate_page_count(file_bytes, mime_type)
+        # Step 3: Check page count (for PDFs)
         if page_count and page_count > self.MAX_PAGES:
             logger.warning(f"File {filename} has {page_count} pages, exceeds {self.MAX_PAGES} limit")
             
             # Strategy: Process in chunks or use alternative processor
             return await self._handle_large_document(
-                file_bytes, filename, mime_type, page_count
+                file_bytes, filename, mime_type, page_count, file_path=file_path, inspection=inspection
             )
         
-        # Step 3: Choose processing method based on file size
+        # Step 4: Choose processing method based on file size
         if file_size <= self.INLINE_DATA_LIMIT_BYTES:
-            # Use inline processing (faster)
-            return await self._process_inline(file_bytes, filename, mime_type)
+            # Use inline processing (faster); inline parts need the bytes in memory
+            return await self._process_inline(
+                read_source(file_bytes, file_path), filename, mime_type, page_count=page_count
+            )
         else:
             # Use File API (for 20MB - 50MB files)
-            return await self._process_with_file_api(file_bytes, filename, mime_type)
+            return await self._process_with_file_api(
+                file_bytes, filename, mime_type, file_path=file_path, page_count=page_count
+            )
+    
+    def _estimate_tokens(self, num_bytes: int, page_count: Optional[int]) -> int:
+        """
+        Rough input + output tokens of one extraction call, for the TPM bucket.
+
+        Input is TOKENS_PER_PAGE per page (pages guessed from size when
+        unknown); the JSON output is assumed to be about as large again.
+        """
+        pages = page_count or max(1, num_bytes // self.config.GEMINI_BYTES_PER_PAGE_ESTIMATE)
+        return 2 * pages * self.TOKENS_PER_PAGE
+    
+    async def _generate(self, contents, num_bytes: int, page_count: Optional[int]):
+        """generate_content through the shared Vertex AI throttle (RPM/TPM, AIMD, 429 retries)"""
+        from google.genai.types import GenerateContentConfig
+        
+        return await get_throttle(self.config.GEMINI_MODEL).call(
+            lambda: self.client.aio.models.generate_content(
+                model=self.config.GEMINI_MODEL,
+                contents=contents,
+                config=GenerateContentConfig(
+                    temperature=0,
+                    response_mime_type="application/json"
+                )
+            ),
+            tokens=self._estimate_tokens(num_bytes, page_count)
+        )
+    
+    @contextmanager
+    def _reader(self, file_bytes: bytes, file_path: str, inspection, parse_name: str):
+        """A fresh PdfReader over an open file; the parse time is recorded on the inspection"""
+        import time
+        from document_processors import open_pdf
+        
+        started = time.perf_counter()
+        with open_pdf(file_bytes, file_path) as reader:
+            if inspection is not None:
+                inspection.record_parse(parse_name, started)
+            yield reader
     
     async def _estimate_page_count(
         self, 
         file_bytes: bytes, 
-        mime_type: str
+        mime_type: str,
+        file_path: str = None
     ) -> Optional[int]:
         """Estimate page count from PDF"""
         if mime_type != 'application/pdf':
             return None
         
         try:
-            from pypdf import PdfReader
-            pdf = PdfReader(io.BytesIO(file_bytes))
-            return len(pdf.pages)
+            from document_processors import open_pdf
+            with open_pdf(file_bytes, file_path) as pdf:
+                return len(pdf.pages)
         except Exception as e:
             logger.warning(f"Could not estimate page count: {e}")
             return None
@@ -102,10 +238,12 @@ class EnhancedGeminiProcessor:
         self, 
         file_bytes: bytes, 
         filename: str, 
-        mime_type: str
+        mime_type: str,
+        page_count: int = None
     ):
         """Process file using inline data (< 20MB)"""
         from document_processors import ProcessedDocument
+        from google.genai.types import Part
         import json
         
         extraction_prompt = """Analyze this document thoroughly and extract:
@@ -131,16 +269,13 @@ class EnhancedGeminiProcessor:
             # FIXED: Ensure we're using the event loop properly
             loop = asyncio.get_event_loop()
             
-            response = await self.client.aio.models.generate_content(
-                model=self.config.GEMINI_MODEL,
-                contents=[
+            response = await self._generate(
+                [
                     extraction_prompt,
                     Part.from_bytes(data=file_bytes, mime_type=mime_type)
                 ],
-                config=GenerateContentConfig(
-                    temperature=0,
-                    response_mime_type="application/json"
-                )
+                len(file_bytes),
+                page_count
             )
             
             result = json.loads(response.text)
@@ -168,10 +303,12 @@ class EnhancedGeminiProcessor:
         self, 
         file_bytes: bytes, 
         filename: str, 
-        mime_type: str
+        mime_type: str,
+        file_path: str = None,
+        page_count: int = None
     ):
         """Process file using File API (20MB - 50MB)"""
-        from document_processors import ProcessedDocument
+        from document_processors import ProcessedDocument, source_size
         import json
         import asyncio
         
@@ -185,10 +322,10 @@ class EnhancedGeminiProcessor:
         Return as JSON with keys: text, metadata, sections, tables, images"""
         
         try:
-            logger.info(f"Processing {filename} with File API ({len(file_bytes)} bytes)")
+            logger.info(f"Processing {filename} with File API ({source_size(file_bytes, file_path)} bytes)")
             
-            # Upload file to Gemini File API (48 hour storage)
-            file_io = io.BytesIO(file_bytes)
+            # Upload file to Gemini File API (48 hour storage); on-disk files upload by path
+            file_io = file_path if file_path else io.BytesIO(file_bytes)
             
             # Run in executor since File API is synchronous
             def _sync_upload():
@@ -203,13 +340,10 @@ class EnhancedGeminiProcessor:
             logger.info(f"File uploaded: {uploaded_file.name}")
             
             # Process with Gemini
-            response = await self.client.aio.models.generate_content(
-                model=self.config.GEMINI_MODEL,
-                contents=[uploaded_file, extraction_prompt],
-                config=GenerateContentConfig(
-                    temperature=0,
-                    response_mime_type="application/json"
-                )
+            response = await self._generate(
+                [uploaded_file, extraction_prompt],
+                source_size(file_bytes, file_path),
+                page_count
             )
             
             result = json.loads(response.text)
@@ -243,12 +377,139 @@ class EnhancedGeminiProcessor:
                 error=str(e)
             )
     
+    async def _process_sharded(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        mime_type: str,
+        page_count: int,
+        file_path: str = None,
+        inspection=None
+    ):
+        """
+        Split a PDF into page-range shards and extract them concurrently.
+
+        Shards are GEMINI_SHARD_PAGES pages each (split further if one still
+        exceeds the File API limit). Each goes inline or through the File API
+        by its own size, at most MAX_CONCURRENT_GEMINI_CALLS at a time. If any
+        shard fails the whole result is an error, so the factory falls back
+        instead of silently dropping pages.
+        """
+        from document_processors import ProcessedDocument
+        
+        shards = shard_ranges(page_count, self.config.GEMINI_SHARD_PAGES)
+        logger.info(f"Processing {filename} ({page_count} pages) as {len(shards)} shards")
+        
+        results = await asyncio.gather(*[
+            self._process_shard(file_bytes, file_path, start, stop, filename, mime_type, inspection)
+            for start, stop in shards
+        ])
+        
+        failed = [
+            f"pages {start + 1}-{stop}: {result.error}"
+            for (start, stop), result in zip(shards, results)
+            if result.error
+        ]
+        if failed:
+            logger.error(f"{len(failed)}/{len(shards)} shards of {filename} failed")
+            return ProcessedDocument(
+                text="",
+                metadata={'total_pages': page_count, 'shards': len(shards)},
+                processing_method='gemini-sharded',
+                error=f"{len(failed)} of {len(shards)} shards failed; first: {failed[0]}"
+            )
+        
+        return stitch_shard_results(
+            [(start, result) for (start, _), result in zip(shards, results)],
+            page_count
+        )
+    
+    async def _process_shard(
+        self,
+        file_bytes: bytes,
+        file_path: str,
+        start: int,
+        stop: int,
+        filename: str,
+        mime_type: str,
+        inspection=None
+    ):
+        """
+        Extract pages [start, stop) under the shared semaphore: the sub-PDF is
+        written only once a slot is free and goes inline or via the File API
+        by its size, so at most MAX_CONCURRENT_GEMINI_CALLS shards are in
+        memory at a time. A range still over the File API limit is sent as
+        halves, one after the other.
+        """
+        from document_processors import ProcessedDocument
+        
+        async with self.semaphore:
+            loop = asyncio.get_event_loop()
+            try:
+                pieces = await loop.run_in_executor(
+                    None, self._write_shard, file_bytes, file_path, start, stop, inspection
+                )
+            except Exception as e:
+                logger.error(f"Could not split pages {start + 1}-{stop} of {filename}: {e}")
+                return ProcessedDocument(
+                    text="",
+                    metadata={},
+                    processing_method='gemini-sharded',
+                    error=f"Could not split PDF: {e}"
+                )
+            
+            results = []
+            while pieces:
+                piece_start, piece_stop, data = pieces.pop(0)
+                name = f"{filename}[pages {piece_start + 1}-{piece_stop}]"
+                pages = piece_stop - piece_start
+                if len(data) <= self.INLINE_DATA_LIMIT_BYTES:
+                    result = await self._process_inline(data, name, mime_type, page_count=pages)
+                else:
+                    result = await self._process_with_file_api(data, name, mime_type, page_count=pages)
+                del data
+                if result.error:
+                    return result
+                results.append((piece_start - start, result))
+        
+        if len(results) == 1:
+            return results[0][1]
+        return stitch_shard_results(results, stop - start)
+    
+    def _write_shard(self, file_bytes: bytes, file_path: str, start: int, stop: int, inspection=None) -> List[tuple]:
+        """
+        (start, stop, pdf bytes) for pages [start, stop): one piece, or halves
+        (recursively) for image-heavy ranges over the File API limit
+        """
+        from pypdf import PdfWriter
+        
+        with self._reader(file_bytes, file_path, inspection, 'gemini_split') as pdf_reader:
+            pending = [(start, stop)]
+            pieces = []
+            while pending:
+                first, last = pending.pop(0)
+                pdf_writer = PdfWriter()
+                for i in range(first, last):
+                    pdf_writer.add_page(pdf_reader.pages[i])
+                output = io.BytesIO()
+                pdf_writer.write(output)
+                data = output.getvalue()
+                if len(data) > self.FILE_API_LIMIT_BYTES and last - first > 1:
+                    # Halve it and retry both halves in order
+                    mid = (first + last) // 2
+                    pending[0:0] = [(first, mid), (mid, last)]
+                    continue
+                pieces.append((first, last, data))
+            return pieces
+    
     async def _handle_large_document(
         self, 
         file_bytes: bytes, 
         filename: str, 
         mime_type: str,
-        page_count: int
+        page_count: int,
+        file_path: str = None,
+        inspection=None
     ):
         """Handle documents exceeding page limits"""
         from document_processors import ProcessedDocument
@@ -263,7 +524,9 @@ class EnhancedGeminiProcessor:
                 # Extract first N pages
                 truncated_pdf = await self._extract_pages(
                     file_bytes, 
-                    max_pages=self.MAX_PAGES
+                    max_pages=self.MAX_PAGES,
+                    file_path=file_path,
+                    inspection=inspection
                 )
                 
                 # Process truncated version
@@ -300,77 +563,253 @@ class EnhancedGeminiProcessor:
     async def _extract_pages(
         self, 
         file_bytes: bytes, 
-        max_pages: int
+        max_pages: int,
+        file_path: str = None,
+        inspection=None
     ) -> bytes:
         """Extract first N pages from PDF"""
-        from pypdf import PdfReader, PdfWriter
+        from pypdf import PdfWriter
         import asyncio
         
         def _sync_extract():
-            pdf_reader = PdfReader(io.BytesIO(file_bytes))
-            pdf_writer = PdfWriter()
-            
-            # Add first max_pages pages
-            for i in range(min(max_pages, len(pdf_reader.pages))):
-                pdf_writer.add_page(pdf_reader.pages[i])
-            
-            # Write to bytes
-            output = io.BytesIO()
-            pdf_writer.write(output)
-            return output.getvalue()
+            with self._reader(file_bytes, file_path, inspection, 'gemini_truncate') as pdf_reader:
+                pdf_writer = PdfWriter()
+                
+                # Add first max_pages pages
+                for i in range(min(max_pages, len(pdf_reader.pages))):
+                    pdf_writer.add_page(pdf_reader.pages[i])
+                
+                # Write to bytes
+                output = io.BytesIO()
+                pdf_writer.write(output)
+                return output.getvalue()
         
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, _sync_extract)
 
 
+# ==============================================================================
+# HYBRID PER-PAGE PROCESSOR
+# ==============================================================================
+
+def scanned_page_runs(texts: List[str], min_chars: int) -> List[tuple]:
+    """
+    Group pages without a usable text layer into contiguous [start, stop) runs.
+
+    A page counts as scanned when it has fewer than `min_chars`
+    non-whitespace characters of extractable text.
+    """
+    runs = []
+    start = None
+    for index, text in enumerate(texts):
+        scanned = sum(1 for ch in text or '' if not ch.isspace()) < min_chars
+        if scanned and start is None:
+            start = index
+        elif not scanned and start is not None:
+            runs.append((start, index))
+            start = None
+    if start is not None:
+        runs.append((start, len(texts)))
+    return runs
+
+
+class HybridPdfProcessor:
+    """
+    Per-page hybrid extraction for PDFs that mix digital and scanned pages.
+
+    Every page is extracted locally with PyMuPDF first. Pages whose text
+    layer is (nearly) empty are grouped into contiguous runs, packed into
+    small sub-PDFs and sent to Gemini; everything else keeps the local text.
+    Results are merged back in page order, so Gemini cost and latency scale
+    with the number of scanned pages rather than the document length.
+    """
+
+    def __init__(self, gemini_processor: EnhancedGeminiProcessor, pymupdf_processor):
+        self.gemini = gemini_processor
+        self.pymupdf = pymupdf_processor
+        self.config = gemini_processor.config
+
+    def supports(self, mime_type: str) -> bool:
+        return mime_type == 'application/pdf'
+
+    async def process(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        mime_type: str = None,
+        file_path: str = None,
+        inspection=None,
+        **kwargs
+    ):
+        from document_processors import ProcessedDocument
+
+        try:
+            local = await self.pymupdf.extract(file_bytes, filename, file_path=file_path, inspection=inspection)
+            texts = local['texts']
+            page_count = local['page_count']
+            runs = scanned_page_runs(texts, self.config.HYBRID_MIN_PAGE_CHARS)
+            scanned = {index for start, stop in runs for index in range(start, stop)}
+
+            logger.info(
+                f"Hybrid: {filename} has {page_count - len(scanned)} digital and "
+                f"{len(scanned)} scanned pages in {len(runs)} runs"
+            )
+
+            shards = []
+            results = []
+            if runs:
+                shards = shard_ranges(page_count, self.config.GEMINI_SHARD_PAGES, ranges=runs)
+                results = await asyncio.gather(*[
+                    self.gemini._process_shard(
+                        file_bytes, file_path, start, stop, filename, mime_type, inspection
+                    )
+                    for start, stop in shards
+                ])
+                failed = [
+                    f"pages {start + 1}-{stop}: {result.error}"
+                    for (start, stop), result in zip(shards, results)
+                    if result.error
+                ]
+                if failed:
+                    return ProcessedDocument(
+                        text="",
+                        metadata={'total_pages': page_count, 'scanned_pages': len(scanned)},
+                        processing_method='hybrid',
+                        error=f"{len(failed)} of {len(shards)} scanned-page shards failed; first: {failed[0]}"
+                    )
+
+            # Page-ordered blocks: local text per digital page, one Gemini block per scanned shard
+            blocks = [(index, text) for index, text in enumerate(texts) if index not in scanned]
+            blocks += [(start, result.text) for (start, _), result in zip(shards, results)]
+            blocks.sort(key=lambda block: block[0])
+
+            # PyMuPDF only sees a raster on scanned pages; Gemini's descriptions replace it there
+            tables = [t for t in local['tables'] if t.get('page', 0) - 1 not in scanned]
+            images = [i for i in local['images'] if i.get('page', 0) - 1 not in scanned]
+            sections = []
+            for (start, _), result in zip(shards, results):
+                sections.extend(_offset_pages(result.sections, start))
+                tables.extend(_offset_pages(result.tables, start))
+                images.extend(_offset_pages(result.images, start))
+            tables.sort(key=lambda item: item.get('page') or 0)
+            images.sort(key=lambda item: item.get('page') or 0)
+            sections.sort(key=lambda item: item.get('page') or 0)
+
+            metadata = dict(local['metadata'])
+            metadata.update({
+                'digital_pages': page_count - len(scanned),
+                'scanned_pages': len(scanned),
+                'gemini_calls': len(shards),
+            })
+
+            return ProcessedDocument(
+                text="\n\n".join(text for _, text in blocks if text),
+                metadata=metadata,
+                sections=sections,
+                tables=tables,
+                images=images,
+                page_count=page_count,
+                processing_method='hybrid'
+            )
+
+        except Exception as e:
+            logger.error(f"Hybrid processing failed: {e}")
+            return ProcessedDocument(
+                text="",
+                metadata={},
+                processing_method='hybrid',
+                error=str(e)
+            )
+
+
 # ==============================================================================
 # ENHANCED DOCUMENT PROCESSOR FACTORY WITH SMART FALLBACK
 # ==============================================================================
 
+def _document_processor(name: str):
+    import document_processors
+    return getattr(document_processors, name)()
+
+
+class LazyProcessors:
+    """method -> processor, each constructed on first lookup"""
+    
+    def __init__(self, builders: Dict[str, Any]):
+        self._builders = builders
+        self._built: Dict[str, Any] = {}
+    
+    def __getitem__(self, method: str):
+        if method not in self._built:
+            self._built[method] = self._builders[method]()
+        return self._built[method]
+    
+    def get(self, method: str, default=None):
+        return self[method] if method in self._builders else default
+    
+    def __contains__(self, method: str) -> bool:
+        return method in self._builders
+
+
 class SmartDocumentProcessorFactory:
     """
     Enhanced factory with intelligent fallback when Gemini fails
     """
     
-    def __init__(self):
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: ExtractionCache to use; by default a disk-only cache is
+                created when ENABLE_PROCESSING_CACHE is set
+        """
         from config import Config
+        from extraction_cache import ExtractionCache
         
         # FIXED: Create an instance of Config to access field defaults
         self.config = Config()
         
-        self.gemini_processor = EnhancedGeminiProcessor()
+        if cache is None and self.config.ENABLE_PROCESSING_CACHE:
+            cache = ExtractionCache()
+        self.cache = cache
         
-        # Import other processors
-        from document_processors import (
-            PyMuPDFProcessor,
-            PyPDFProcessor,
-            DocxProcessor,
-            ExcelProcessor,
-            TextProcessor
-        )
-        
-        self.processors = {
-            'gemini': self.gemini_processor,
-            'pymupdf': PyMuPDFProcessor(),
-            'pypdf': PyPDFProcessor(),
-            'docx': DocxProcessor(),
-            'openpyxl': ExcelProcessor(),
-            'text': TextProcessor(),
-        }
+        # Processors are built on first use of their method, so a cold
+        # instance only pays for the libraries its MIME types need
+        self.processors = LazyProcessors({
+            'gemini': lambda: EnhancedGeminiProcessor(),
+            'hybrid': lambda: HybridPdfProcessor(self.processors['gemini'], self.processors['pymupdf']),
+            'pymupdf': lambda: _document_processor('PyMuPDFProcessor'),
+            'pypdf': lambda: _document_processor('PyPDFProcessor'),
+            'docx': lambda: _document_processor('DocxProcessor'),
+            'openpyxl': lambda: _document_processor('ExcelProcessor'),
+            'text': lambda: _document_processor('TextProcessor'),
+        })
+    
+    @property
+    def gemini_processor(self):
+        return self.processors['gemini']
     
     async def process_document(
         self,
         file_bytes: bytes,
         filename: str,
         mime_type: str,
-        preferred_method: str = None
+        preferred_method: str = None,
+        file_path: str = None,
+        file_hash: str = None
     ):
         """
-        Process document with smart fallback strategies
+        Process document with smart fallback strategies.
+
+        Pass either file_bytes or, for files already on disk, file_path
+        (with file_bytes=None) so large files are never held in memory.
+        With `file_hash` (sha256 of the file) a cached extraction for the
+        same bytes is returned instead of re-running the processors.
         """
-        from document_processors import ProcessedDocument
+        from document_processors import ProcessedDocument, inspect_pdf, source_size
         
-        file_size_mb = len(file_bytes) / (1024 * 1024)
+        file_size = source_size(file_bytes, file_path)
+        file_size_mb = file_size / (1024 * 1024)
+        inspection = None
+        routing = None
         
         logger.info(f"Processing {filename} ({file_size_mb:.1f}MB, {mime_type})")
         
@@ -387,29 +826,80 @@ class SmartDocumentProcessorFactory:
         
         # Smart method selection based on file characteristics
         if mime_type == 'application/pdf':
-            # Estimate page count
+            # Inspect once; the result is shared with every processor below
             try:
-                from pypdf import PdfReader
-                pdf = PdfReader(io.BytesIO(file_bytes))
-                page_count = len(pdf.pages)
+                loop = asyncio.get_event_loop()
+                inspection = await loop.run_in_executor(
+                    None, inspect_pdf, file_bytes, file_path, self.config.PDF_INSPECTION_SAMPLE_PAGES
+                )
+                page_count = inspection.page_count
                 
-                logger.info(f"PDF has {page_count} pages")
+                logger.info(
+                    f"PDF has {page_count} pages "
+                    f"(text layer: {inspection.has_text_layer}, images/page: {inspection.image_density:.1f}, "
+                    f"parsed in {inspection.parse_timings['inspect']}ms)"
+                )
+                
+                born_digital = inspection.is_born_digital(
+                    self.config.BORN_DIGITAL_MIN_CHARS_PER_PAGE,
+                    self.config.BORN_DIGITAL_MIN_TEXT_PAGE_RATIO,
+                    self.config.BORN_DIGITAL_MAX_IMAGES_PER_PAGE
+                )
                 
                 # Decision tree for PDF processing
-                if page_count > EnhancedGeminiProcessor.MAX_PAGES:
+                if born_digital and self.config.ROUTE_BORN_DIGITAL_TO_PYMUPDF:
+                    # Text layer is already good; local extraction is faster and free
+                    logger.info("PDF is born-digital, using PyMuPDF")
+                    route = 'born-digital'
+                    methods_to_try = ['pymupdf', 'pypdf'] + (['gemini'] if 'gemini' in available_methods else [])
+                elif (
+                    self.config.HYBRID_EXTRACTION_ENABLED
+                    and 'gemini' in available_methods
+                    and 0 < inspection.text_page_ratio < 1
+                ):
+                    # Mixed digital/scanned pages: Gemini only for the pages without text
+                    logger.info("PDF mixes digital and scanned pages, using hybrid extraction")
+                    route = 'mixed'
+                    methods_to_try = ['hybrid', 'gemini', 'pymupdf', 'pypdf']
+                elif (
+                    self.config.GEMINI_SHARDING_ENABLED
+                    and 'gemini' in available_methods
+                    and (page_count > EnhancedGeminiProcessor.MAX_PAGES or file_size_mb > 50)
+                ):
+                    # Over Gemini's limits, but it can be split into shards
+                    logger.info("PDF exceeds Gemini limits, using sharded Gemini")
+                    route = 'gemini-sharded'
+                    methods_to_try = ['gemini', 'pymupdf', 'pypdf']
+                elif page_count > EnhancedGeminiProcessor.MAX_PAGES:
                     # Too large for Gemini, use PyMuPDF
                     logger.info("PDF exceeds Gemini page limit, using PyMuPDF")
+                    route = 'over-page-limit'
                     methods_to_try = ['pymupdf', 'pypdf']
                 elif file_size_mb > 50:
                     # Too large for Gemini File API
                     logger.info("PDF exceeds Gemini size limit, using PyMuPDF")
+                    route = 'over-size-limit'
                     methods_to_try = ['pymupdf', 'pypdf']
                 elif 'gemini' in available_methods:
-                    # Gemini first, then fallback
+                    # Scanned or image-heavy: Gemini first, then fallback
+                    route = 'scanned-or-image-heavy'
                     methods_to_try = ['gemini', 'pymupdf', 'pypdf']
                 else:
+                    route = 'configured'
                     methods_to_try = available_methods
-                    
+                
+                # Recorded with the result so the thresholds can be tuned from real traffic
+                routing = {
+                    'route': route,
+                    'born_digital': born_digital,
+                    'methods': methods_to_try,
+                    'thresholds': {
+                        'min_chars_per_page': self.config.BORN_DIGITAL_MIN_CHARS_PER_PAGE,
+                        'min_text_page_ratio': self.config.BORN_DIGITAL_MIN_TEXT_PAGE_RATIO,
+                        'max_images_per_page': self.config.BORN_DIGITAL_MAX_IMAGES_PER_PAGE
+                    }
+                }
+                
             except Exception as e:
                 logger.warning(f"Could not analyze PDF: {e}")
                 methods_to_try = available_methods
@@ -422,6 +912,15 @@ class SmartDocumentProcessorFactory:
             else:
                 methods_to_try = available_methods
         
+        # Same bytes already extracted (retry after a later-stage failure, re-upload)?
+        if self.cache is not None and file_hash:
+            cached = await self.cache.get(file_hash, methods_to_try)
+            if cached:
+                method, result = cached
+                result.metadata = result.metadata or {}
+                result.metadata['extraction_cache'] = {'hit': True, 'method': method}
+                return self._annotate(result, inspection, routing)
+        
         # Try each method until one succeeds
         last_error = None
         
@@ -436,13 +935,17 @@ class SmartDocumentProcessorFactory:
                 result = await processor.process(
                     file_bytes=file_bytes,
                     filename=filename,
-                    mime_type=mime_type
+                    mime_type=mime_type,
+                    file_path=file_path,
+                    inspection=inspection
                 )
                 
                 # Check if processing was successful
                 if result.error is None and result.text:
                     logger.info(f"✓ Successfully processed with {method}")
-                    return result
+                    if self.cache is not None and file_hash:
+                        await self.cache.put(file_hash, method, result)
+                    return self._annotate(result, inspection, routing)
                 
                 # If Gemini returned error due to limits, try next method immediately
                 if method == 'gemini' and result.error:
@@ -460,6 +963,16 @@ class SmartDocumentProcessorFactory:
         # All methods failed
         return ProcessedDocument(
             text="",
-            metadata={'file_size': len(file_bytes), 'mime_type': mime_type},
+            metadata={'file_size': file_size, 'mime_type': mime_type},
             error=f"All processing methods failed. Last error: {last_error}"
-        )
\ No newline at end of file
+        )
+    
+    def _annotate(self, result, inspection, routing):
+        """Attach this run's PDF inspection, parse timings and routing decision"""
+        result.metadata = result.metadata or {}
+        if inspection is not None:
+            result.metadata['pdf_inspection'] = inspection.summary()
+            result.metadata['parse_timings'] = dict(inspection.parse_timings)
+        if routing is not None:
+            result.metadata['routing'] = dict(routing, processing_method=result.processing_method)
+        return result
@@ -1,18 +1,46 @@
 import functions_framework
 import asyncio
+import atexit
 import threading
 import logging
-import google.cloud.logging as cloud_logging
+import json
+import sys
 import time
 from config import Config
-from pipeline_processor import PipelineProcessor # Import at top
+# PipelineProcessor (and the GCP / LangChain libraries behind it) is imported
+# on the first event, not at instance start; see get_processor()
 
-# Initialize Cloud Logging
-try:
-    logging_client = cloud_logging.Client()
-    logging_client.setup_logging()
-except Exception as e:
-    print(f"Warning: Could not setup cloud logging: {e}")
+
+class _CloudLoggingJsonFormatter(logging.Formatter):
+    """One JSON object per line on stdout; Cloud Logging parses severity and message"""
+
+    def format(self, record):
+        entry = {
+            'severity': record.levelname,
+            'message': super().format(record),
+            'logger': record.name,
+        }
+        return json.dumps(entry, default=str)
+
+
+def _setup_logging():
+    if Config.USE_CLOUD_LOGGING_CLIENT:
+        # Full client library: ~0.5s of imports and a gRPC channel at cold start
+        try:
+            import google.cloud.logging as cloud_logging
+            cloud_logging.Client().setup_logging()
+            return
+        except Exception as e:
+            print(f"Warning: Could not setup cloud logging: {e}")
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_CloudLoggingJsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+
+
+_setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +50,19 @@ _LOOP = None
 _LOOP_THREAD_LOCK = threading.Lock() # Lock for creating the loop thread
 _PROCESSOR = None
 _PROCESSOR_LOCK = None # This will become an *asyncio.Lock*
+_DOCUMENT_SLOTS = None # asyncio.Semaphore: documents in flight on this instance
+_IN_FLIGHT = set()     # (gcs_uri, generation) currently being processed here
 
 def _start_event_loop():
     """Runs the asyncio event loop in a separate thread."""
-    global _LOOP, _PROCESSOR_LOCK
+    global _LOOP, _PROCESSOR_LOCK, _DOCUMENT_SLOTS
     try:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
         # Create the asyncio lock *within the loop it will manage*
         _PROCESSOR_LOCK = asyncio.Lock()
+        _DOCUMENT_SLOTS = asyncio.Semaphore(Config.PIPELINE_MAX_CONCURRENT_DOCUMENTS)
         
         # Signal that the loop and its lock are ready
         _LOOP = loop
@@ -60,6 +91,18 @@ def get_event_loop():
                 
         return _LOOP
 
+def _shutdown():
+    """Flush buffered events and pending Pub/Sub batches when the instance stops."""
+    if _LOOP is None or _PROCESSOR is None:
+        return
+    try:
+        future = asyncio.run_coroutine_threadsafe(_PROCESSOR.close(), _LOOP)
+        future.result(timeout=10)
+    except Exception as e:
+        logger.warning(f"⚠️ Error during shutdown flush: {e}")
+
+atexit.register(_shutdown)
+
 # --- End Persistent Async Loop Setup ---
 
 async def get_processor():
@@ -73,6 +116,8 @@ async def get_processor():
     # _PROCESSOR_LOCK is guaranteed to exist by get_event_loop()
     async with _PROCESSOR_LOCK:
         if _PROCESSOR is None:
+            from pipeline_processor import PipelineProcessor
+            
             logger.info("Initializing PipelineProcessor singleton...")
             _PROCESSOR = PipelineProcessor()
             await _PROCESSOR.initialize()
@@ -85,6 +130,10 @@ def process_document_upload(cloud_event):
     """
     Cloud Function triggered by GCS object finalization (SYNCHRONOUS).
     This function bridges the sync world to the async world.
+
+    With --concurrency above 1, each request thread submits its event to
+    the same persistent loop, so several documents are processed at once;
+    per-stage limits live in PipelineProcessor.stages.
     """
     try:
         # 1. Get the persistent event loop
@@ -130,16 +179,28 @@ async def async_process_document_upload(cloud_event):
     metadata = data.get('metadata', {})
     uploaded_by = metadata.get('uploaded_by', metadata.get('uploader', 'unknown'))
     
+    # Redelivery of an event this instance is already working on
+    event_key = (gcs_uri, data.get('generation'))
+    if event_key in _IN_FLIGHT:
+        logger.info(f"ℹ️ Skipping duplicate event for {gcs_uri}; already in flight on this instance")
+        return {
+            'status': 'skipped',
+            'reason': 'Document is already being processed',
+            'gcs_uri': gcs_uri
+        }
+    
     # Process document
     # This await is now safe and correct
     processor = await get_processor()
     
+    _IN_FLIGHT.add(event_key)
     try:
-        result = await processor.process_document(
-            gcs_uri=gcs_uri,
-            project_id=project_id,
-            uploaded_by=uploaded_by
-        )
+        async with _DOCUMENT_SLOTS:
+            result = await processor.process_document(
+                gcs_uri=gcs_uri,
+                project_id=project_id,
+                uploaded_by=uploaded_by
+            )
         
         logger.info(f"✓ Processing completed: {result}")
         return result
@@ -162,3 +223,6 @@ async def async_process_document_upload(cloud_event):
             'status': 'failed',
             'gcs_uri': gcs_uri
         }
+    
+    finally:
+        _IN_FLIGHT.discard(event_key)
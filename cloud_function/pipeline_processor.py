@@ -1,16 +1,33 @@
 import time
 import json
+from dataclasses import asdict
 from datetime import datetime
-from google.cloud import storage
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from document_processors import ProcessedDocument
+from vertex_throttle import throttle_metrics
 import logging
 import asyncio
 import traceback
-import httpx
+import hashlib
 import os
+import tempfile
 
 logger = logging.getLogger(__name__)
 
+# Written a few times per document; prepared once per pooled connection
+UPDATE_DOCUMENT_STATUS_SQL = """
+    UPDATE documents
+    SET status = $1,
+        processing_method = $2,
+        page_count = $3,
+        error_message = $4,
+        processed_at = $5,
+        metadata = $6,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = $7
+    RETURNING project_id
+"""
+
 class PipelineProcessor:
     """Enhanced pipeline with smart Gemini handling and document updates"""
     
@@ -19,14 +36,37 @@ class PipelineProcessor:
         from gemini_processor import SmartDocumentProcessorFactory
         from chunking_strategies import ChunkingFactory
         from database_manager import DatabaseManager
+        from extraction_cache import ExtractionCache
+        from checkpoint_store import CheckpointStore
+        from event_bus import StageEventBus
+        from stage_limiter import StageLimiter
         
         # FIXED: Create Config instance
         self.config = Config()
         self.db_manager = DatabaseManager()
+        self.db_manager.register_statement('update_document_status', UPDATE_DOCUMENT_STATUS_SQL)
+        self.events = StageEventBus(self.db_manager, self.config.API_URL)
+        self._publisher = None
+        self._topic_path = None
+        self.publish_stats = {'published': 0, 'failed': 0}
         self.vector_manager = None
-        self.doc_processor = SmartDocumentProcessorFactory()
+        self.extraction_cache = (
+            ExtractionCache(self.db_manager) if self.config.ENABLE_PROCESSING_CACHE else None
+        )
+        self.doc_processor = SmartDocumentProcessorFactory(cache=self.extraction_cache)
+        self.checkpoints = (
+            CheckpointStore(self.db_manager) if self.config.PIPELINE_CHECKPOINTS_ENABLED else None
+        )
         self.chunking_factory = ChunkingFactory()
-        self.storage_client = storage.Client(project=self.config.PROJECT_ID)
+        # Several documents can be in flight on the shared loop; bound each stage separately
+        self.stages = StageLimiter({
+            'download': self.config.STAGE_LIMIT_DOWNLOAD,
+            'extraction': self.config.STAGE_LIMIT_EXTRACTION,
+            'embedding': self.config.STAGE_LIMIT_EMBEDDING,
+            'db': self.config.STAGE_LIMIT_DB,
+        })
+        self._storage_client = None
+        self._prewarm = None
     
     async def initialize(self):
         """Initialize all components"""
@@ -35,6 +75,11 @@ class PipelineProcessor:
             # DB manager initializes its pool on first use
             self.vector_manager = VectorStoreManager(self.db_manager)
             await self.vector_manager.initialize()
+            await self.db_manager.init_document_hash_column()
+            if self.extraction_cache:
+                await self.extraction_cache.initialize()
+            if self.checkpoints:
+                await self.checkpoints.initialize()
             logger.info("✅ Enhanced pipeline processor initialized")
         except Exception as e:
             logger.error(f"❌ Failed to initialize pipeline: {e}")
@@ -49,6 +94,7 @@ class PipelineProcessor:
         """Main document processing pipeline with smart update handling"""
         
         document_id = None
+        local_path = None
         start_time = time.time()
         
         try:
@@ -57,22 +103,24 @@ class PipelineProcessor:
             mime_type = self._get_mime_type(filename)
             
             logger.info(f"📄 Processing: {filename} ({mime_type})")
+            self._start_prewarm()
             
-            # Download file
-            file_bytes = await self._download_file(gcs_uri)
-            file_size = len(file_bytes)
+            # Download file to local disk (SHA-256 is computed while streaming)
+            async with self.stages.stage('download'):
+                local_path, file_size, file_hash = await self._download_file(gcs_uri)
             file_size_mb = file_size / (1024 * 1024)
             
-            logger.info(f"📦 File size: {file_size_mb:.2f}MB")
+            logger.info(f"📦 File size: {file_size_mb:.2f}MB (sha256 {file_hash[:12]})")
             
             # Check file size against limits
             if file_size > self.config.MAX_FILE_SIZE_MB * 1024 * 1024:
                 raise ValueError(f"File size {file_size_mb:.1f}MB exceeds {self.config.MAX_FILE_SIZE_MB}MB limit")
             
             # *** UPDATED: Smart document creation/update handling ***
-            document_id, is_new, should_skip = await self._create_or_update_document_record(
-                project_id, filename, gcs_uri, mime_type, file_size, uploaded_by
-            )
+            async with self.stages.stage('db'):
+                document_id, is_new, should_skip = await self._create_or_update_document_record(
+                    project_id, filename, gcs_uri, mime_type, file_size, uploaded_by, file_hash
+                )
             
             if is_new:
                 logger.info(f"✨ Created new document record: {document_id}")
@@ -89,27 +137,61 @@ class PipelineProcessor:
                     'reason': 'Document already processed successfully'
                 }
             
+            # Same bytes already processed under another path: clone instead of reprocessing
+            if is_new:
+                async with self.stages.stage('db'):
+                    source_id = await self._clone_duplicate_content(
+                        document_id, project_id, filename, gcs_uri, file_hash
+                    )
+                if source_id:
+                    total_time = int((time.time() - start_time) * 1000)
+                    logger.info(f"🧬 Cloned document {document_id} from {source_id} in {total_time}ms")
+                    return {
+                        'status': 'cloned',
+                        'document_id': str(document_id),
+                        'filename': filename,
+                        'cloned_from': source_id,
+                        'processing_time_ms': total_time
+                    }
+            
+            # Resume a failed attempt on the same bytes from its last completed stage
+            checkpoints = {}
+            if self.checkpoints and not is_new:
+                checkpoints = await self.checkpoints.load(document_id, file_hash)
+                if checkpoints:
+                    logger.info(f"⏯️ Resuming {document_id}; completed stages: {', '.join(sorted(checkpoints))}")
+            
             # ====== STEP 1: Extract content with smart processor ======
             await self._log_stage(document_id, project_id, 'extraction', 'started')
             extraction_start = time.time()
             
-            # Use enhanced processor with automatic fallback
-            processed_doc = await self.doc_processor.process_document(
-                file_bytes=file_bytes,
-                filename=filename,
-                mime_type=mime_type
-            )
+            if 'extraction' in checkpoints:
+                processed_doc = ProcessedDocument(**checkpoints['extraction'])
+            else:
+                # Use enhanced processor with automatic fallback
+                async with self.stages.stage('extraction'):
+                    processed_doc = await self.doc_processor.process_document(
+                        file_bytes=None,
+                        filename=filename,
+                        mime_type=mime_type,
+                        file_path=local_path,
+                        file_hash=file_hash
+                    )
             
             extraction_time = int((time.time() - extraction_start) * 1000)
             
             if processed_doc.error:
                 raise Exception(f"Extraction failed: {processed_doc.error}")
             
+            if self.checkpoints and 'extraction' not in checkpoints:
+                await self.checkpoints.save(document_id, 'extraction', file_hash, asdict(processed_doc))
+            
             # Check for warnings (truncation, etc.)
             extraction_metadata = {
                 'method': processed_doc.processing_method,
                 'file_size_mb': file_size_mb,
-                'is_update': not is_new
+                'is_update': not is_new,
+                'resumed': 'extraction' in checkpoints
             }
             
             if processed_doc.metadata and 'warning' in processed_doc.metadata:
@@ -123,6 +205,11 @@ class PipelineProcessor:
                     metadata={'warning': processed_doc.metadata['warning']}
                 )
             
+            # PDF inspection / routing decision, parse timings and cache hits
+            for key in ('pdf_inspection', 'routing', 'parse_timings', 'extraction_cache'):
+                if processed_doc.metadata and key in processed_doc.metadata:
+                    extraction_metadata[key] = processed_doc.metadata[key]
+            
             await self._log_stage(
                 document_id, project_id, 'extraction', 'completed',
                 duration_ms=extraction_time,
@@ -154,11 +241,28 @@ class PipelineProcessor:
                 chunk_metadata['total_pages'] = processed_doc.metadata.get('total_pages')
                 chunk_metadata['processed_pages'] = processed_doc.metadata.get('processed_pages')
             
-            documents = await self.chunking_factory.chunk_text(
-                text=processed_doc.text,
-                method=chunk_method,
-                metadata=chunk_metadata
-            )
+            if 'chunking' in checkpoints:
+                # Same chunk list as the failed attempt, so content hashes line up with stored vectors
+                from langchain_core.documents import Document
+                chunk_method = checkpoints['chunking']['chunk_method']
+                documents = [
+                    Document(page_content=chunk['content'], metadata=chunk['metadata'])
+                    for chunk in checkpoints['chunking']['chunks']
+                ]
+            else:
+                documents = await self.chunking_factory.chunk_text(
+                    text=processed_doc.text,
+                    method=chunk_method,
+                    metadata=chunk_metadata
+                )
+                if self.checkpoints:
+                    await self.checkpoints.save(document_id, 'chunking', file_hash, {
+                        'chunk_method': chunk_method,
+                        'chunks': [
+                            {'content': doc.page_content, 'metadata': doc.metadata}
+                            for doc in documents
+                        ]
+                    })
             
             chunking_time = int((time.time() - chunking_start) * 1000)
             
@@ -167,16 +271,29 @@ class PipelineProcessor:
             await self._log_stage(
                 document_id, project_id, 'chunking', 'completed',
                 duration_ms=chunking_time,
-                metadata={'chunk_count': len(documents), 'method': chunk_method}
+                metadata={
+                    'chunk_count': len(documents),
+                    'method': chunk_method,
+                    'resumed': 'chunking' in checkpoints
+                }
             )
             
             # ====== STEP 3: Generate embeddings ======
             await self._log_stage(document_id, project_id, 'embedding', 'started')
             embedding_start = time.time()
             
-            chunk_ids = await self.vector_manager.add_documents(
-                documents, str(document_id), project_id
-            )
+            embedding_stats = {}
+            async with self.stages.stage('embedding'):
+                if not is_new and (self.config.INCREMENTAL_REINGESTION or self.checkpoints):
+                    # Existing rows were kept (including batches committed by a failed
+                    # attempt); only apply the chunk diff
+                    chunk_ids = await self.vector_manager.sync_documents(
+                        documents, str(document_id), project_id, stats=embedding_stats
+                    )
+                else:
+                    chunk_ids = await self.vector_manager.add_documents(
+                        documents, str(document_id), project_id, stats=embedding_stats
+                    )
             
             embedding_time = int((time.time() - embedding_start) * 1000)
             
@@ -185,7 +302,12 @@ class PipelineProcessor:
             await self._log_stage(
                 document_id, project_id, 'embedding', 'completed',
                 duration_ms=embedding_time,
-                metadata={'embedding_count': len(chunk_ids)}
+                metadata={
+                    'embedding_count': len(chunk_ids),
+                    **embedding_stats,
+                    'vertex_throttle': throttle_metrics(),
+                    'stage_limits': self.stages.snapshot()
+                }
             )
             
             # ====== STEP 4: Update document status ======
@@ -203,6 +325,18 @@ class PipelineProcessor:
                 'is_update': not is_new
             }
             
+            # Routing decision (born-digital -> pymupdf, scanned -> gemini) for threshold tuning
+            if processed_doc.metadata and 'routing' in processed_doc.metadata:
+                final_metadata['routing'] = processed_doc.metadata['routing']['route']
+            
+            if checkpoints:
+                final_metadata['resumed_stages'] = sorted(checkpoints)
+            
+            # Report the chunk diff for incremental re-ingestion
+            for key in ('chunks_kept', 'chunks_added', 'chunks_removed'):
+                if key in embedding_stats:
+                    final_metadata[key] = embedding_stats[key]
+            
             # Add warning to final metadata if present
             if processed_doc.metadata and 'warning' in processed_doc.metadata:
                 final_metadata['warning'] = processed_doc.metadata['warning']
@@ -216,6 +350,10 @@ class PipelineProcessor:
                 metadata=final_metadata
             )
             
+            # Completed: resume points are no longer needed, for new documents too
+            if self.checkpoints:
+                await self.checkpoints.clear(document_id)
+            
             # ====== STEP 5: Publish notification ======
             notification_metadata = {
                 'chunks_count': len(documents),
@@ -264,6 +402,13 @@ class PipelineProcessor:
                 )
             
             raise
+        
+        finally:
+            if local_path:
+                self._remove_local_file(local_path)
+            if self.config.EVENT_BUS_DRAIN_ON_COMPLETE:
+                # One batched delivery before the instance may be throttled
+                await self.events.flush()
     
     # ========================================================================
     # SMART DOCUMENT UPDATE HANDLING
@@ -284,7 +429,8 @@ class PipelineProcessor:
         
         - If file is new, creates a new document record.
         - If file exists, clears old data (chunks, vectors) and resets the 
-          document for reprocessing.
+          document for reprocessing. With INCREMENTAL_REINGESTION the chunks
+          and vectors are kept so the embedding stage can diff against them.
 
         Returns:
             tuple: (document_id, is_new, should_skip)
@@ -292,7 +438,7 @@ class PipelineProcessor:
         
         # Look for an existing document with this STABLE GCS_URI
         check_query = """
-            SELECT id, status, file_size
+            SELECT id, status, file_size, file_hash
             FROM documents 
             WHERE gcs_uri = $1 AND project_id = $2 AND deleted_at IS NULL
         """
@@ -306,22 +452,34 @@ class PipelineProcessor:
                 doc_id = str(existing['id'])
                 old_status = existing['status']
                 old_file_size = existing['file_size']
+                old_file_hash = existing['file_hash']
                 
-                # Check if the file is *actually* different.
-                # If GCS just sends a duplicate event for a file that's already
-                # processed and the size is the same, we can skip.
-                if old_status == 'completed' and old_file_size == file_size:
+                # Check if the file is *actually* different by content digest.
+                # Rows written before file_hash existed fall back to comparing size.
+                if old_file_hash and file_hash:
+                    unchanged = old_file_hash == file_hash
+                else:
+                    unchanged = old_file_size == file_size
+                
+                if old_status == 'completed' and unchanged:
                     logger.info(f"✅ Document {doc_id} is unchanged and already completed. Skipping.")
                     return doc_id, False, True # (doc_id, is_new=False, should_skip=True)
 
-                logger.info(f"📋 Document exists: {doc_id} (status: {old_status}). Clearing old data for reprocessing.")
+                # A retry of the same bytes keeps the rows a failed attempt committed so it can resume
+                keep_rows = self.config.INCREMENTAL_REINGESTION or (self.checkpoints is not None and unchanged)
+                
+                if keep_rows:
+                    logger.info(f"📋 Document exists: {doc_id} (status: {old_status}). Keeping chunks for incremental re-ingestion.")
+                else:
+                    logger.info(f"📋 Document exists: {doc_id} (status: {old_status}). Clearing old data for reprocessing.")
 
-                # 1. Delete old vector data from vector store
-                await self.vector_manager.delete_document_vectors(doc_id, project_id)
+                    # 1. Delete old vector data from vector store
+                    await self.vector_manager.delete_document_vectors(doc_id, project_id)
 
                 # 2. Delete old data from relational DB (chunks and logs)
                 async with conn.transaction():
-                    await conn.execute("DELETE FROM document_chunks WHERE document_id = $1", doc_id)
+                    if not keep_rows:
+                        await conn.execute("DELETE FROM document_chunks WHERE document_id = $1", doc_id)
                     await conn.execute("DELETE FROM processing_logs WHERE document_id = $1", doc_id)
                 
                     # 3. Update the main document record to trigger reprocessing
@@ -336,7 +494,8 @@ class PipelineProcessor:
                             processed_at = NULL,
                             error_message = NULL,
                             retry_count = 0,
-                            metadata = '{}'::jsonb -- Clear all old metadata
+                            metadata = '{}'::jsonb, -- Clear all old metadata
+                            file_hash = $5
                         WHERE id = $4
                     """
                     await conn.execute(
@@ -344,7 +503,8 @@ class PipelineProcessor:
                         file_size,
                         file_type,
                         uploaded_by,
-                        doc_id
+                        doc_id,
+                        file_hash
                     )
                 
                 # Return (doc_id, is_new=False, should_skip=False)
@@ -355,8 +515,8 @@ class PipelineProcessor:
                 logger.info(f"✨ Creating new document record")
                 query = """
                     INSERT INTO documents
-                    (project_id, filename, gcs_uri, file_type, file_size, uploaded_by, status, retry_count)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    (project_id, filename, gcs_uri, file_type, file_size, uploaded_by, status, retry_count, file_hash)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
                     RETURNING id
                 """
                 
@@ -369,12 +529,106 @@ class PipelineProcessor:
                     file_size, 
                     uploaded_by, 
                     'processing',  # Set to processing, as this function *is* the processor
-                    0  # retry_count
+                    0,  # retry_count
+                    file_hash
                 )
         
                 # Return (new_doc_id, is_new=True, should_skip=False)
                 return str(document_id), True, False
     
+    async def _clone_duplicate_content(
+        self,
+        document_id: str,
+        project_id: str,
+        filename: str,
+        gcs_uri: str,
+        file_hash: str
+    ) -> Optional[str]:
+        """
+        Clone chunks and vectors from a completed document with identical bytes.
+
+        Looks for another completed document in the same project with the
+        same file_hash. If found, copies its document_vectors and
+        document_chunks rows (embeddings included) to the new document and
+        marks it completed, skipping extraction and embedding entirely.
+
+        Returns:
+            The source document id, or None if there is no duplicate.
+        """
+        if not file_hash:
+            return None
+
+        source_query = """
+            SELECT id, processing_method, page_count, metadata
+            FROM documents
+            WHERE project_id = $1 AND file_hash = $2 AND gcs_uri <> $3
+              AND status = 'completed' AND deleted_at IS NULL
+            ORDER BY processed_at DESC NULLS LAST
+            LIMIT 1
+        """
+
+        # New ids are drawn once per source row so vectors and chunks keep matching ids
+        clone_query = f"""
+            WITH src AS MATERIALIZED (
+                SELECT id AS old_id, gen_random_uuid() AS new_id, project_id, chunk_index,
+                       content, embedding, metadata, content_hash
+                FROM {self.config.VECTOR_TABLE_NAME}
+                WHERE document_id = $1
+            ),
+            vectors AS (
+                INSERT INTO {self.config.VECTOR_TABLE_NAME}
+                (id, document_id, project_id, chunk_index, content, embedding, metadata, content_hash)
+                SELECT new_id, $2, project_id, chunk_index, content, embedding,
+                       metadata || $3::jsonb, content_hash
+                FROM src
+            )
+            INSERT INTO document_chunks
+            (id, document_id, project_id, chunk_index, chunk_method, content_preview, token_count, metadata)
+            SELECT src.new_id, $2, c.project_id, c.chunk_index, c.chunk_method,
+                   c.content_preview, c.token_count, c.metadata || $3::jsonb
+            FROM document_chunks c
+            JOIN src ON c.chunk_index = src.chunk_index
+            WHERE c.document_id = $1
+        """
+
+        pool = await self.db_manager._get_pool()
+        async with pool.acquire() as conn:
+            source = await conn.fetchrow(source_query, project_id, file_hash, gcs_uri)
+            if not source:
+                return None
+
+            source_id = str(source['id'])
+            logger.info(f"🧬 Identical content already processed as {source_id}, cloning vectors")
+
+            metadata_patch = json.dumps({
+                'document_id': str(document_id),
+                'filename': filename,
+                'cloned_from': source_id
+            })
+            async with conn.transaction():
+                await conn.execute(clone_query, source_id, document_id, metadata_patch)
+
+        source_metadata = source['metadata'] or {}
+        if isinstance(source_metadata, str):
+            source_metadata = json.loads(source_metadata)
+
+        await self._log_stage(
+            document_id, project_id, 'dedup', 'completed',
+            metadata={'cloned_from': source_id, 'file_hash': file_hash}
+        )
+        await self._update_document_status(
+            document_id,
+            status='completed',
+            processing_method=source['processing_method'],
+            page_count=source['page_count'],
+            metadata={**source_metadata, 'cloned_from': source_id, 'is_update': False}
+        )
+        await self._publish_notification(
+            document_id, project_id, 'completed',
+            metadata={'cloned_from': source_id, 'processing_method': source['processing_method']}
+        )
+        return source_id
+
     async def _reset_for_reprocessing(self, conn, doc_id: str):
         """Reset a 'failed' or 'stuck' document for reprocessing"""
         logger.info(f"♻️ Resetting document {doc_id} for reprocessing.")
@@ -412,28 +666,33 @@ class PipelineProcessor:
         status: str,
         data: dict
     ):
-        """Send update via API to broadcast through WebSocket"""
-        try:
-            # Get backend API URL from config
-            api_url = self.config.API_URL
-            
-            # Use a system user ID for Cloud Function calls
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    f"{api_url}/api/projects/{project_id}/broadcast",
-                    json={
-                        "type": "document_update",
-                        "document_id": document_id,
-                        "status": status,
-                        "data": data,
-                        "timestamp": datetime.now().isoformat()
-                    },
-                    params={"user_id": "system"},
-                    timeout=5.0
-                )
-                logger.info(f"✅ Sent WebSocket update for document {document_id}")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to send WebSocket update: {e}")
+        """Queue an update for the backend to broadcast through WebSocket"""
+        self.events.notify(project_id=project_id, document_id=document_id, status=status, data=data)
+    
+    def _start_prewarm(self):
+        """
+        Build the embeddings client on a worker thread while the first
+        document downloads and extracts, instead of when it reaches the
+        embedding stage.
+        """
+        if self._prewarm is None and self.config.PREWARM_EMBEDDINGS_CLIENT and self.vector_manager:
+            loop = asyncio.get_event_loop()
+            self._prewarm = loop.run_in_executor(None, lambda: self.vector_manager.embeddings)
+            self._prewarm.add_done_callback(self._on_prewarm_done)
+    
+    @staticmethod
+    def _on_prewarm_done(future):
+        if not future.cancelled() and future.exception():
+            # Not fatal: the embedding stage builds the client itself
+            logger.warning(f"⚠️ Embeddings client pre-warm failed: {future.exception()}")
+    
+    @property
+    def storage_client(self):
+        """GCS client, created on the first download"""
+        if self._storage_client is None:
+            from google.cloud import storage
+            self._storage_client = storage.Client(project=self.config.PROJECT_ID)
+        return self._storage_client
     
     def _get_mime_type(self, filename: str) -> str:
         """Determine MIME type from filename"""
@@ -441,8 +700,16 @@ class PipelineProcessor:
         mime_type, _ = mimetypes.guess_type(filename)
         return mime_type or 'application/octet-stream'
     
-    async def _download_file(self, gcs_uri: str) -> bytes:
-        """Download file from GCS"""
+    async def _download_file(self, gcs_uri: str) -> tuple:
+        """
+        Stream file from GCS into a local temp file, hashing it as it is written.
+
+        The file never has to fit in memory; processors read it by path.
+        The caller owns the temp file and must remove it when done.
+
+        Returns:
+            tuple: (local path, size in bytes, sha256 hex digest)
+        """
         def _sync_download():
             parts = gcs_uri.replace('gs://', '').split('/', 1)
             bucket_name = parts[0]
@@ -450,11 +717,36 @@ class PipelineProcessor:
             
             bucket = self.storage_client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
-            return blob.download_as_bytes()
+            
+            suffix = os.path.splitext(blob_path)[1]
+            digest = hashlib.sha256()
+            size = 0
+            tmp = tempfile.NamedTemporaryFile(
+                suffix=suffix, dir=self.config.DOWNLOAD_TMP_DIR, delete=False
+            )
+            try:
+                with tmp, blob.open('rb', chunk_size=self.config.DOWNLOAD_CHUNK_SIZE) as reader:
+                    for chunk in iter(lambda: reader.read(self.config.DOWNLOAD_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        tmp.write(chunk)
+                        size += len(chunk)
+            except Exception:
+                self._remove_local_file(tmp.name)
+                raise
+            return tmp.name, size, digest.hexdigest()
         
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, _sync_download)
     
+    def _remove_local_file(self, path: str):
+        """Delete a downloaded temp file, ignoring files already gone"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to remove temp file {path}: {e}")
+    
     async def _update_document_status(
         self,
         document_id: str,
@@ -465,45 +757,30 @@ class PipelineProcessor:
         metadata: Dict = None
     ):
         """Update document status"""
-        query = """
-            UPDATE documents
-            SET status = $1,
-                processing_method = $2,
-                page_count = $3,
-                error_message = $4,
-                processed_at = $5,
-                metadata = $6,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = $7
-            RETURNING project_id
-        """
+        project_id = await self.db_manager.fetch_value_prepared(
+            'update_document_status',
+            status,
+            processing_method,
+            page_count,
+            error_message,
+            datetime.now() if status in ['completed', 'failed'] else None,
+            json.dumps(metadata) if metadata else None,
+            document_id
+        )
         
-        pool = await self.db_manager._get_pool()
-        async with pool.acquire() as conn:
-            project_id = await conn.fetchval(
-                query,
-                status,
-                processing_method,
-                page_count,
-                error_message,
-                datetime.now() if status in ['completed', 'failed'] else None,
-                json.dumps(metadata) if metadata else None,
-                document_id
+        # Send WebSocket update for status changes
+        if project_id:
+            await self.send_websocket_update(
+                project_id=str(project_id),
+                document_id=document_id,
+                status=status,
+                data={
+                    'processing_method': processing_method,
+                    'page_count': page_count,
+                    'error_message': error_message,
+                    'metadata': metadata
+                }
             )
-            
-            # Send WebSocket update for status changes
-            if project_id:
-                await self.send_websocket_update(
-                    project_id=str(project_id),
-                    document_id=document_id,
-                    status=status,
-                    data={
-                        'processing_method': processing_method,
-                        'page_count': page_count,
-                        'error_message': error_message,
-                        'metadata': metadata
-                    }
-                )
     
     async def _log_stage(
         self,
@@ -515,42 +792,38 @@ class PipelineProcessor:
         error_details: str = None,
         metadata: Dict = None
     ):
-        """Log processing stage"""
-        query = """
-            INSERT INTO processing_logs
-            (document_id, project_id, stage, status, duration_ms, error_details, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """
-        
-        pool = await self.db_manager._get_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                query,
-                document_id,
-                project_id,
-                stage,
-                status,
-                duration_ms,
-                error_details,
-                json.dumps(metadata) if metadata else None
-            )
-            
-            # Send WebSocket update for stage progress
-            stage_data = {
-                'stage': stage,
-                'status': status,
-                'duration_ms': duration_ms,
-                'error_details': error_details,
-                'metadata': metadata
-            }
-            
-            await self.send_websocket_update(
-                project_id=str(project_id),
-                document_id=document_id,
-                status=f"{stage}_{status}",
-                data=stage_data
-            )
+        """Log processing stage (buffered; written and broadcast by the event bus)"""
+        self.events.log_stage(
+            document_id, project_id, stage, status,
+            duration_ms=duration_ms,
+            error_details=error_details,
+            metadata=metadata
+        )
     
+    def _get_publisher(self):
+        """Long-lived Pub/Sub publisher; batches messages on a background thread"""
+        if self._publisher is None:
+            from google.cloud import pubsub_v1
+
+            self._publisher = pubsub_v1.PublisherClient(
+                batch_settings=pubsub_v1.types.BatchSettings(
+                    max_messages=self.config.PUBSUB_BATCH_MAX_MESSAGES,
+                    max_bytes=self.config.PUBSUB_BATCH_MAX_BYTES,
+                    max_latency=self.config.PUBSUB_BATCH_MAX_LATENCY
+                )
+            )
+            self._topic_path = self._publisher.topic_path(self.config.PROJECT_ID, self.config.PUBSUB_TOPIC)
+        return self._publisher
+
+    def _on_publish_done(self, future):
+        """Publish callback (runs on the publisher's thread)"""
+        try:
+            future.result()
+            self.publish_stats['published'] += 1
+        except Exception as e:
+            self.publish_stats['failed'] += 1
+            logger.warning(f"⚠️ Failed to publish notification: {e}")
+
     async def _publish_notification(
         self,
         document_id: str,
@@ -559,35 +832,46 @@ class PipelineProcessor:
         error: str = None,
         metadata: Dict = None
     ):
-        """Publish notification to Pub/Sub"""
-        from google.cloud import pubsub_v1
-       
-        def _sync_publish():
+        """
+        Publish notification to Pub/Sub.
+
+        publish() only enqueues the message for the next batch. With
+        PUBSUB_FIRE_AND_FORGET the result is reported to _on_publish_done;
+        otherwise we wait up to PUBSUB_PUBLISH_TIMEOUT for the server ack.
+        """
+        message = {
+            'document_id': str(document_id),
+            'project_id': str(project_id),
+            'status': status,
+            'timestamp': datetime.now().isoformat(),
+            'error': error,
+            'metadata': metadata
+        }
+
+        try:
+            publisher = self._get_publisher()
+            future = publisher.publish(
+                self._topic_path,
+                json.dumps(message, default=str).encode('utf-8'),
+                document_id=str(document_id),
+                project_id=str(project_id),
+                status=status
+            )
+            future.add_done_callback(self._on_publish_done)
+            if not self.config.PUBSUB_FIRE_AND_FORGET:
+                await asyncio.wait_for(asyncio.wrap_future(future), self.config.PUBSUB_PUBLISH_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish notification: {e}")
+
+    async def close(self):
+        """Deliver buffered stage events and flush pending Pub/Sub batches"""
+        await self.events.close()
+        if self._publisher is not None:
+            loop = asyncio.get_event_loop()
             try:
-                publisher = pubsub_v1.PublisherClient()
-                topic_path = publisher.topic_path(self.config.PROJECT_ID, self.config.PUBSUB_TOPIC)
-                
-                message = {
-                    'document_id': str(document_id),
-                    'project_id': str(project_id),
-                    'status': status,
-                    'timestamp': datetime.now().isoformat(),
-                    'error': error,
-                    'metadata': metadata
-                }
-                
-                future = publisher.publish(
-                    topic_path,
-                    json.dumps(message).encode('utf-8'),
-                    document_id=str(document_id),
-                    project_id=str(project_id),
-                    status=status
-                )
-                
-                return future.result(timeout=5.0)
+                # stop() commits outstanding batches and blocks until they are sent
+                await loop.run_in_executor(None, self._publisher.stop)
+                logger.info(f"🧹 Pub/Sub publisher flushed ({self.publish_stats})")
             except Exception as e:
-                logger.warning(f"⚠️ Failed to publish notification: {e}")
-                return None
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _sync_publish)
+                logger.warning(f"⚠️ Error flushing Pub/Sub publisher: {e}")
+            self._publisher = None
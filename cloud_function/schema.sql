@@ -69,6 +69,7 @@ CREATE TABLE IF NOT EXISTS documents (
     error_message TEXT,
     retry_count INTEGER DEFAULT 0,
     metadata JSONB DEFAULT '{}',
+    file_hash TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     processed_at TIMESTAMP,
     deleted_at TIMESTAMP
@@ -101,10 +102,21 @@ CREATE TABLE IF NOT EXISTS processing_logs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Per-stage pipeline checkpoints (gzip'd JSON), cleared when a document completes
+CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    payload BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (document_id, stage)
+);
+
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_documents_project_id ON documents(project_id) WHERE deleted_at IS NULL;
 CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status) WHERE deleted_at IS NULL;
 CREATE INDEX IF NOT EXISTS idx_documents_uploaded_by ON documents(uploaded_by);
+CREATE INDEX IF NOT EXISTS idx_documents_project_file_hash ON documents(project_id, file_hash) WHERE deleted_at IS NULL;
 CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON document_chunks(document_id);
 CREATE INDEX IF NOT EXISTS idx_chunks_project_id ON document_chunks(project_id);
 CREATE INDEX IF NOT EXISTS idx_logs_document_id ON processing_logs(document_id);
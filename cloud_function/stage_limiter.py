@@ -0,0 +1,58 @@
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageLimiter:
+    """
+    Per-stage concurrency limits for documents processed side by side on
+    one instance's event loop.
+
+    Each stage (download, extraction, embedding, db) gets its own
+    semaphore, so e.g. eight documents can download while only two run
+    extraction and the rest queue for it. Tracks in-flight and waiting
+    counts and the longest wait per stage.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = dict(limits)
+        self._semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in limits.items()}
+        self._stats = {
+            stage: {'in_flight': 0, 'waiting': 0, 'completed': 0, 'max_wait_ms': 0}
+            for stage in limits
+        }
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Hold one slot of `name` for the duration of the block"""
+        stats = self._stats[name]
+        stats['waiting'] += 1
+        started = time.monotonic()
+        try:
+            await self._semaphores[name].acquire()
+        finally:
+            stats['waiting'] -= 1
+
+        wait_ms = int((time.monotonic() - started) * 1000)
+        stats['max_wait_ms'] = max(stats['max_wait_ms'], wait_ms)
+        if wait_ms > 1000:
+            logger.info(f"⏳ Waited {wait_ms}ms for a '{name}' slot ({self.limits[name]} max)")
+
+        stats['in_flight'] += 1
+        try:
+            yield
+        finally:
+            stats['in_flight'] -= 1
+            stats['completed'] += 1
+            self._semaphores[name].release()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current per-stage limits and counters"""
+        return {
+            stage: {'limit': self.limits[stage], **stats}
+            for stage, stats in self._stats.items()
+        }
@@ -1,9 +1,12 @@
-from langchain_google_vertexai import VertexAIEmbeddings
 from langchain_core.documents import Document
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import threading
 import uuid
 import json
 import logging
+from embedding_cache import EmbeddingCache, content_hash
+from vertex_throttle import estimate_text_tokens, get_throttle
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +18,39 @@ class VectorStoreManager:
         from config import Config
 
         self.db_manager = db_manager
-        self.embeddings = VertexAIEmbeddings(
-            model_name=Config.EMBEDDING_MODEL,
-            project=Config.PROJECT_ID,
+        self._embeddings = None
+        self._embeddings_lock = threading.Lock()
+        self.embedding_cache = (
+            EmbeddingCache(db_manager, Config.EMBEDDING_MODEL, Config.EMBEDDING_CACHE_MEMORY_ENTRIES)
+            if Config.EMBEDDING_CACHE_ENABLED else None
         )
         self.vector_store = None
         self._initialized = False
         self.config = Config
 
+        # Hot-path queries, prepared on each pooled connection
+        db_manager.register_statement('vector_search', vector_search_sql(Config.VECTOR_TABLE_NAME))
+        db_manager.register_statement('vector_insert', vector_insert_sql(Config.VECTOR_TABLE_NAME))
+        db_manager.register_statement('chunk_upsert', CHUNK_UPSERT_SQL)
+
+    @property
+    def embeddings(self):
+        """
+        VertexAIEmbeddings, built on first use: importing
+        langchain_google_vertexai is the largest single cold-start cost.
+        Thread-safe so it can be pre-warmed off the event loop.
+        """
+        if self._embeddings is None:
+            with self._embeddings_lock:
+                if self._embeddings is None:
+                    from langchain_google_vertexai import VertexAIEmbeddings
+                    self._embeddings = VertexAIEmbeddings(
+                        model_name=self.config.EMBEDDING_MODEL,
+                        project=self.config.PROJECT_ID,
+                        max_retries=0,  # 429s are retried by the Vertex throttle, which adapts to them
+                    )
+        return self._embeddings
+
     async def initialize(self):
         """Initialize vector store and tables (loop-safe)."""
         if self._initialized:
@@ -65,6 +93,9 @@ class VectorStoreManager:
                 CREATE INDEX IF NOT EXISTS document_chunks_project_idx 
                 ON document_chunks(project_id);
             """)
+
+            if self.embedding_cache:
+                await self.embedding_cache.initialize()
             
             logger.info("✅ Vector store initialized successfully")
             self._initialized = True
@@ -77,7 +108,8 @@ class VectorStoreManager:
         self,
         documents: List[Document],
         document_id: str,
-        project_id: str
+        project_id: str,
+        stats: Optional[Dict] = None
     ) -> List[str]:
         """
         Add documents with project isolation.
@@ -86,6 +118,7 @@ class VectorStoreManager:
             documents: List of LangChain Document objects
             document_id: UUID of the parent document
             project_id: UUID of the project
+            stats: Optional dict that receives embedding cache hit/miss counters
             
         Returns:
             List of chunk IDs that were inserted
@@ -97,98 +130,302 @@ class VectorStoreManager:
         try:
             logger.info(f"📝 Adding {len(documents)} chunks for document {document_id}")
 
-            # Enrich metadata and get contents
-            contents = []
-            for idx, doc in enumerate(documents):
-                metadata = doc.metadata or {}
-                metadata.update({
-                    'document_id': document_id,
-                    'project_id': project_id,
-                    'chunk_index': idx
-                })
-                doc.metadata = metadata
-                contents.append(doc.page_content)
-
-            # Get embeddings from Vertex AI (async)
-            logger.info("🔮 Generating embeddings...")
-            embeddings = await self.embeddings.aembed_documents(contents)
-            logger.info(f"✅ Generated {len(embeddings)} embeddings")
+            self._enrich_metadata(documents, document_id, project_id)
 
             # Generate unique IDs for chunks
             ids = [str(uuid.uuid4()) for _ in documents]
 
-            # Insert into vector table
-            insert_query = f"""
-                INSERT INTO {self.config.VECTOR_TABLE_NAME}
-                (id, document_id, project_id, chunk_index, content, embedding, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (id) DO NOTHING;
-            """
+            await self._embed_and_store(documents, ids, document_id, project_id, stats)
+
+            logger.info(f"✅ Successfully added {len(documents)} document chunks for project {project_id}")
+            return ids
+
+        except Exception as e:
+            logger.error(f"❌ Failed to add documents: {e}", exc_info=True)
+            raise
+
+    async def sync_documents(
+        self,
+        documents: List[Document],
+        document_id: str,
+        project_id: str,
+        stats: Optional[Dict] = None
+    ) -> List[str]:
+        """
+        Incrementally re-ingest a document by diffing chunks on content hash.
+
+        New chunks are aligned to the stored ones by sha256 of their text.
+        Matching rows are kept (only chunk_index/metadata are refreshed),
+        unmatched new chunks are embedded and inserted, and stored rows with
+        no counterpart are deleted. Unchanged chunks never touch the HNSW index.
+
+        The writes are not one transaction: deletions, refreshes and the
+        document_chunks rebuild commit first, then added chunks are embedded
+        and committed batch by batch (holding every new embedding for one
+        transaction would defeat the bounded pipeline). A run that fails in
+        between leaves the document partial, and marked failed by the
+        pipeline, until it is re-ingested; that sync diffs against whatever
+        was committed, keeps it, and converges on the new chunk list.
+
+        Args:
+            documents: Freshly chunked LangChain Document objects
+            document_id: UUID of the parent document
+            project_id: UUID of the project
+            stats: Optional dict that receives chunks_kept / chunks_added /
+                chunks_removed plus embedding cache counters
+
+        Returns:
+            List of chunk IDs in chunk order
+        """
+        stats = stats if stats is not None else {}
+
+        try:
+            logger.info(f"🔁 Syncing {len(documents)} chunks for document {document_id}")
+
+            self._enrich_metadata(documents, document_id, project_id)
+
+            # Legacy rows written before content_hash existed are hashed in SQL
+            existing = await self.db_manager.fetch_all(
+                f"""
+                    SELECT id, chunk_index,
+                           COALESCE(content_hash, encode(sha256(convert_to(content, 'UTF8')), 'hex')) AS content_hash
+                    FROM {self.config.VECTOR_TABLE_NAME}
+                    WHERE document_id = $1 AND project_id = $2
+                    ORDER BY chunk_index
+                """,
+                (document_id, project_id)
+            )
+
+            old_by_hash: Dict[str, List[str]] = {}
+            for row in existing:
+                old_by_hash.setdefault(row['content_hash'], []).append(str(row['id']))
+
+            ids: List[str] = []
+            kept: List[Tuple[str, Document]] = []
+            added: List[Document] = []
+            for doc in documents:
+                matches = old_by_hash.get(doc.metadata['content_hash'])
+                if matches:
+                    chunk_id = matches.pop(0)
+                    kept.append((chunk_id, doc))
+                else:
+                    chunk_id = str(uuid.uuid4())
+                    added.append(doc)
+                ids.append(chunk_id)
+            removed = [chunk_id for chunk_ids in old_by_hash.values() for chunk_id in chunk_ids]
 
             pool = await self.db_manager._get_pool()
             async with pool.acquire() as conn:
                 async with conn.transaction():
-                    for idx, doc in enumerate(documents):
-                        meta_json = json.dumps(doc.metadata)
-                        emb = embeddings[idx]
-                        
+                    if removed:
                         await conn.execute(
-                            insert_query,
-                            ids[idx],
-                            document_id,
-                            project_id,
-                            idx,
-                            doc.page_content,
-                            emb,  # asyncpg accepts Python list for vector column
-                            meta_json
+                            f"DELETE FROM {self.config.VECTOR_TABLE_NAME} WHERE id = ANY($1::uuid[]) AND project_id = $2",
+                            removed, project_id
                         )
 
-            logger.info(f"✅ Inserted {len(documents)} vectors into database")
-
-            # Save chunk metadata in document_chunks table
-            chunk_records = [
-                (
-                    ids[idx],
-                    document_id,
-                    project_id,
-                    idx,
-                    doc.metadata.get('chunk_method', 'unknown'),
-                    doc.page_content[:500],  # Preview first 500 chars
-                    self._estimate_tokens(doc.page_content),
-                    json.dumps(doc.metadata)
-                )
-                for idx, doc in enumerate(documents)
-            ]
-            await self._save_chunk_metadata(chunk_records)
+                    # Refresh position/metadata of kept rows; skip rows that are identical
+                    if kept:
+                        await conn.execute(
+                            f"""
+                                UPDATE {self.config.VECTOR_TABLE_NAME} AS v
+                                SET chunk_index = u.chunk_index,
+                                    metadata = u.metadata,
+                                    content_hash = u.content_hash
+                                FROM unnest($1::uuid[], $2::int[], $3::jsonb[], $4::text[])
+                                     AS u(id, chunk_index, metadata, content_hash)
+                                WHERE v.id = u.id AND v.project_id = $5
+                                  AND (v.chunk_index IS DISTINCT FROM u.chunk_index
+                                       OR v.metadata IS DISTINCT FROM u.metadata
+                                       OR v.content_hash IS DISTINCT FROM u.content_hash)
+                            """,
+                            [chunk_id for chunk_id, _ in kept],
+                            [doc.metadata['chunk_index'] for _, doc in kept],
+                            [json.dumps(doc.metadata) for _, doc in kept],
+                            [doc.metadata['content_hash'] for _, doc in kept],
+                            project_id
+                        )
 
-            logger.info(f"✅ Successfully added {len(documents)} document chunks for project {project_id}")
+                    # document_chunks has no ANN index, so it is simply rebuilt
+                    await conn.execute("DELETE FROM document_chunks WHERE document_id = $1", document_id)
+                    kept_chunk_records = [
+                        self._chunk_record(chunk_id, doc, document_id, project_id)
+                        for chunk_id, doc in kept
+                    ]
+                    if self.config.VECTOR_BULK_INSERT:
+                        await copy_chunk_records(conn, kept_chunk_records)
+                    else:
+                        await insert_chunk_records(conn, kept_chunk_records)
+
+            if added:
+                added_ids = [ids[doc.metadata['chunk_index']] for doc in added]
+                await self._embed_and_store(added, added_ids, document_id, project_id, stats)
+
+            stats.update({
+                'chunks_kept': len(kept),
+                'chunks_added': len(added),
+                'chunks_removed': len(removed),
+            })
+            logger.info(
+                f"✅ Synced document {document_id}: {len(kept)} kept, "
+                f"{len(added)} added, {len(removed)} removed"
+            )
             return ids
 
         except Exception as e:
-            logger.error(f"❌ Failed to add documents: {e}", exc_info=True)
+            logger.error(f"❌ Failed to sync documents: {e}", exc_info=True)
             raise
 
-    async def _save_chunk_metadata(self, chunk_records: List[tuple]):
-        """Save chunk metadata to document_chunks table"""
-        query = """
-            INSERT INTO document_chunks 
-            (id, document_id, project_id, chunk_index, chunk_method, 
-             content_preview, token_count, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            ON CONFLICT (document_id, chunk_index) DO UPDATE
-            SET chunk_method = EXCLUDED.chunk_method,
-                content_preview = EXCLUDED.content_preview,
-                token_count = EXCLUDED.token_count,
-                metadata = EXCLUDED.metadata;
+    def _enrich_metadata(self, documents: List[Document], document_id: str, project_id: str):
+        """Stamp ownership, position and content hash onto chunk metadata"""
+        for idx, doc in enumerate(documents):
+            metadata = doc.metadata or {}
+            metadata.update({
+                'document_id': document_id,
+                'project_id': project_id,
+                'chunk_index': idx,
+                'content_hash': content_hash(doc.page_content)
+            })
+            doc.metadata = metadata
+
+    async def _embed_and_store(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        document_id: str,
+        project_id: str,
+        stats: Optional[Dict] = None
+    ):
         """
-        
+        Embed -> store pipeline: batch N+1 is embedded while batch N is
+        written. The queue bounds how many embedded batches wait in memory.
+        """
+        await self._ensure_partition(project_id)
+
+        batch_size = self.config.EMBEDDING_BATCH_SIZE
+        queue = asyncio.Queue(maxsize=self.config.EMBEDDING_MAX_INFLIGHT_BATCHES)
+        total_batches = (len(documents) + batch_size - 1) // batch_size
+
+        async def _embed_batches():
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start:start + batch_size]
+                embeddings = await self._embed_batch(
+                    [doc.page_content for doc in batch], stats
+                )
+                await queue.put((start, batch, embeddings))
+            await queue.put(None)
+
+        async def _store_batches():
+            stored = 0
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                start, batch, embeddings = item
+                vector_records, chunk_records = self._build_records(
+                    batch, ids[start:start + len(batch)], embeddings,
+                    document_id, project_id
+                )
+                await self._store_records(vector_records, chunk_records)
+                stored += 1
+                logger.info(f"💾 Stored batch {stored}/{total_batches} ({len(batch)} chunks)")
+
+        logger.info(f"🔮 Embedding and storing {total_batches} batches of up to {batch_size} chunks...")
+        await _run_pipeline(_embed_batches(), _store_batches())
+
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """aembed_documents through the shared Vertex AI throttle"""
+        return await get_throttle(self.config.EMBEDDING_MODEL).call(
+            lambda: self.embeddings.aembed_documents(texts),
+            tokens=estimate_text_tokens(texts),
+            requests=-(-len(texts) // self.config.VERTEX_EMBEDDING_TEXTS_PER_REQUEST)
+        )
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """aembed_query through the shared Vertex AI throttle"""
+        return await get_throttle(self.config.EMBEDDING_MODEL).call(
+            lambda: self.embeddings.aembed_query(query),
+            tokens=estimate_text_tokens(query)
+        )
+
+    async def _embed_batch(self, contents: List[str], stats: Optional[Dict] = None) -> List[List[float]]:
+        """Embed a batch of texts, reusing cached vectors for unchanged content"""
+        if self.embedding_cache is None:
+            return await self._embed_texts(contents)
+
+        hashes = [content_hash(text) for text in contents]
+        cached = await self.embedding_cache.get_many(hashes, stats)
+
+        # Embed each missing text once, even if it repeats within the batch
+        missing = {h: text for h, text in zip(hashes, contents) if h not in cached}
+        if missing:
+            fresh = await self._embed_texts(list(missing.values()))
+            computed = dict(zip(missing.keys(), fresh))
+            await self.embedding_cache.put_many(computed)
+            cached.update(computed)
+
+        return [cached[h] for h in hashes]
+
+    def _build_records(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        embeddings: List[List[float]],
+        document_id: str,
+        project_id: str
+    ) -> Tuple[List[tuple], List[tuple]]:
+        """Build document_vectors and document_chunks rows for a batch"""
+        vector_records = []
+        chunk_records = []
+        for pos, doc in enumerate(documents):
+            vector_records.append((
+                ids[pos],
+                document_id,
+                project_id,
+                doc.metadata['chunk_index'],
+                doc.page_content,
+                embeddings[pos],  # encoded by pgvector's registered codec
+                json.dumps(doc.metadata),
+                doc.metadata.get('content_hash')
+            ))
+            chunk_records.append(self._chunk_record(ids[pos], doc, document_id, project_id))
+        return vector_records, chunk_records
+
+    def _chunk_record(self, chunk_id: str, doc: Document, document_id: str, project_id: str) -> tuple:
+        """document_chunks row for a chunk"""
+        return (
+            chunk_id,
+            document_id,
+            project_id,
+            doc.metadata['chunk_index'],
+            doc.metadata.get('chunk_method', 'unknown'),
+            doc.page_content[:500],  # Preview first 500 chars
+            self._estimate_tokens(doc.page_content),
+            json.dumps(doc.metadata)
+        )
+
+    async def _ensure_partition(self, project_id: str):
+        """Make sure the project's vector partition exists before writing to it"""
+        try:
+            await self.db_manager.ensure_project_partition(project_id)
+        except Exception as e:
+            # Rows still land in the default partition and stay searchable
+            logger.warning(f"⚠️ Could not create vector partition for project {project_id}: {e}")
+
+    async def _store_records(self, vector_records: List[tuple], chunk_records: List[tuple]):
+        """Write vector rows and chunk metadata in a single transaction"""
         pool = await self.db_manager._get_pool()
         async with pool.acquire() as conn:
             async with conn.transaction():
-                for record in chunk_records:
-                    await conn.execute(query, *record)
-        
-        logger.info(f"✅ Saved metadata for {len(chunk_records)} chunks")
+                if self.config.VECTOR_BULK_INSERT:
+                    await copy_vector_records(conn, self.config.VECTOR_TABLE_NAME, vector_records)
+                    await copy_chunk_records(conn, chunk_records)
+                else:
+                    vector_insert = await self.db_manager.prepared(conn, 'vector_insert')
+                    chunk_upsert = await self.db_manager.prepared(conn, 'chunk_upsert')
+                    await vector_insert.executemany(vector_records)
+                    await chunk_upsert.executemany(chunk_records)
+
+        logger.info(f"✅ Inserted {len(vector_records)} vectors and {len(chunk_records)} chunk records")
 
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count (rough approximation: 1 token ≈ 4 chars)"""
@@ -217,29 +454,11 @@ class VectorStoreManager:
             logger.info(f"🔍 Searching for '{query[:50]}...' in project {project_id}")
 
             # Compute query embedding
-            query_emb = await self.embeddings.aembed_query(query)
+            query_emb = await self._embed_query(query)
             
-            # Build SQL with cosine distance operator (<=>)
-            # Lower distance = more similar
-            # We calculate similarity as 1 - distance for easier interpretation
-            search_sql = f"""
-                SELECT 
-                    id,
-                    document_id,
-                    project_id,
-                    chunk_index,
-                    content,
-                    metadata,
-                    1 - (embedding <=> $1::vector) AS similarity
-                FROM {self.config.VECTOR_TABLE_NAME}
-                WHERE project_id = $2
-                ORDER BY embedding <=> $1::vector
-                LIMIT $3;
-            """
-
-            pool = await self.db_manager._get_pool()
-            async with pool.acquire() as conn:
-                rows = await conn.fetch(search_sql, query_emb, project_id, k)
+            # Cosine distance (<=>) search, prepared once per connection;
+            # similarity is reported as 1 - distance
+            rows = await self.db_manager.fetch_all_prepared('vector_search', query_emb, project_id, k)
 
             # Format results as LangChain Documents
             results = []
@@ -294,7 +513,7 @@ class VectorStoreManager:
             logger.info(f"🔍 Advanced search in project {project_id}")
 
             # Compute query embedding
-            query_emb = await self.embeddings.aembed_query(query)
+            query_emb = await self._embed_query(query)
             
             # Build dynamic SQL with filters
             where_clauses = ["project_id = $2"]
@@ -452,7 +671,10 @@ class VectorStoreManager:
         try:
             logger.warning(f"⚠️ BULK DELETE: Removing all vectors for project {project_id}")
 
-            # Delete from vector table
+            # Dropping the project's partition removes its rows and HNSW graph
+            # at once; the DELETE catches rows in the default partition (or
+            # everything, when the table is not partitioned)
+            await self.db_manager.drop_project_partition(project_id)
             delete_vectors = f"""
                 DELETE FROM {self.config.VECTOR_TABLE_NAME} 
                 WHERE project_id = $1;
@@ -470,4 +692,131 @@ class VectorStoreManager:
             
         except Exception as e:
             logger.error(f"❌ Error in bulk delete: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+
+async def _run_pipeline(producer, consumer):
+    """Run a producer/consumer pair; if either fails, cancel the other and re-raise."""
+    tasks = [asyncio.ensure_future(producer), asyncio.ensure_future(consumer)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ============================================================================
+# BULK WRITE HELPERS
+# ============================================================================
+# Rows are streamed with COPY (binary protocol, so pgvector's registered codec
+# encodes embeddings) into a per-session temp table and merged with a single
+# INSERT ... SELECT. This keeps the ON CONFLICT semantics of the row-by-row
+# path while replacing one round trip per row with a handful per batch.
+# The row-by-row variants are kept for VECTOR_BULK_INSERT=False and for
+# benchmarking (tools/bench_vector_inserts.py).
+
+VECTOR_COLUMNS = [
+    'id', 'document_id', 'project_id', 'chunk_index', 'content', 'embedding', 'metadata', 'content_hash'
+]
+CHUNK_COLUMNS = [
+    'id', 'document_id', 'project_id', 'chunk_index', 'chunk_method',
+    'content_preview', 'token_count', 'metadata'
+]
+
+
+async def _copy_via_staging(conn, table_name: str, columns: List[str], records: List[tuple], on_conflict: str):
+    """COPY records into a temp staging table, then merge into table_name."""
+    staging = f"_staging_{table_name}"
+    column_list = ", ".join(columns)
+
+    # ON COMMIT DELETE ROWS keeps the temp table alive on pooled connections
+    await conn.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging}
+        (LIKE {table_name} INCLUDING DEFAULTS)
+        ON COMMIT DELETE ROWS
+    """)
+    await conn.copy_records_to_table(staging, records=records, columns=columns)
+    await conn.execute(f"""
+        INSERT INTO {table_name} ({column_list})
+        SELECT {column_list} FROM {staging}
+        {on_conflict};
+    """)
+
+
+async def copy_vector_records(conn, table_name: str, records: List[tuple]):
+    """Bulk write rows laid out as VECTOR_COLUMNS"""
+    if not records:
+        return
+    await _copy_via_staging(conn, table_name, VECTOR_COLUMNS, records, "ON CONFLICT DO NOTHING")
+
+
+async def copy_chunk_records(conn, records: List[tuple]):
+    """Bulk upsert rows into document_chunks"""
+    if not records:
+        return
+    await _copy_via_staging(conn, 'document_chunks', CHUNK_COLUMNS, records, """
+        ON CONFLICT (document_id, chunk_index) DO UPDATE
+        SET chunk_method = EXCLUDED.chunk_method,
+            content_preview = EXCLUDED.content_preview,
+            token_count = EXCLUDED.token_count,
+            metadata = EXCLUDED.metadata""")
+
+
+def vector_insert_sql(table_name: str) -> str:
+    return f"""
+        INSERT INTO {table_name}
+        (id, document_id, project_id, chunk_index, content, embedding, metadata, content_hash)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT DO NOTHING;
+    """
+
+
+CHUNK_UPSERT_SQL = """
+    INSERT INTO document_chunks 
+    (id, document_id, project_id, chunk_index, chunk_method, 
+     content_preview, token_count, metadata)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (document_id, chunk_index) DO UPDATE
+    SET chunk_method = EXCLUDED.chunk_method,
+        content_preview = EXCLUDED.content_preview,
+        token_count = EXCLUDED.token_count,
+        metadata = EXCLUDED.metadata;
+"""
+
+
+def vector_search_sql(table_name: str) -> str:
+    """Top-k cosine search within one project: $1 query embedding, $2 project_id, $3 k"""
+    return f"""
+        SELECT 
+            id,
+            document_id,
+            project_id,
+            chunk_index,
+            content,
+            metadata,
+            1 - (embedding <=> $1::vector) AS similarity
+        FROM {table_name}
+        WHERE project_id = $2
+        ORDER BY embedding <=> $1::vector
+        LIMIT $3;
+    """
+
+
+async def insert_vector_records(conn, table_name: str, records: List[tuple]):
+    """Row-by-row insert into the vector table (one round trip per row)"""
+    query = vector_insert_sql(table_name)
+    for record in records:
+        await conn.execute(query, *record)
+
+
+async def insert_chunk_records(conn, records: List[tuple]):
+    """Row-by-row upsert into document_chunks (one round trip per row)"""
+    for record in records:
+        await conn.execute(CHUNK_UPSERT_SQL, *record)
@@ -0,0 +1,17 @@
+# tests/backend/conftest.py
+
+import pytest
+from tests.source_trees import activate
+
+# Bare imports in these tests and in the code under test resolve to backend/
+activate('backend')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collectstart(collector):
+    activate('backend')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    activate('backend')
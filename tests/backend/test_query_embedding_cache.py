@@ -0,0 +1,93 @@
+# tests/backend/test_query_embedding_cache.py
+
+import asyncio
+
+import pytest
+from query_embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+class FakeEmbedder:
+    """Counts calls; each call takes `delay` seconds"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return [float(len(text)), 0.5]
+
+
+class TestQueryEmbeddingCache:
+    """Test the query embedding cache used by search and chat"""
+
+    def test_normalization_collapses_whitespace_only(self):
+        assert normalize_query("  what is\tpgvector?\n") == "what is pgvector?"
+        assert normalize_query("What is pgvector?") != normalize_query("what is pgvector?")
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_served_from_cache(self):
+        cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+        embed = FakeEmbedder()
+
+        first = await cache.get_or_compute('model-a', "refund policy", embed)
+        second = await cache.get_or_compute('model-a', " refund  policy ", embed)
+        await cache.get_or_compute('model-b', "refund policy", embed)
+
+        assert first == second
+        assert embed.calls == ["refund policy", "refund policy"]
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 2)
+        assert stats['hit_ratio'] == pytest.approx(1 / 3, abs=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_share_one_call(self):
+        cache = QueryEmbeddingCache()
+        embed = FakeEmbedder(delay=0.01)
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute('model-a', "quarterly revenue", embed) for _ in range(20)
+        ])
+
+        assert len(embed.calls) == 1
+        assert all(result == results[0] for result in results)
+        assert cache.stats()['coalesced'] == 19
+        assert cache.stats()['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        cache = QueryEmbeddingCache()
+        failing = FakeEmbedder(delay=0.005, fail=True)
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute('model-a', "q", failing) for _ in range(3)
+        ], return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(failing.calls) == 1
+
+        embed = FakeEmbedder()
+        await cache.get_or_compute('model-a', "q", embed)
+        assert embed.calls == ["q"]
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_ttl(self):
+        cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+        embed = FakeEmbedder()
+        for query in ("a", "b", "a", "c"):
+            await cache.get_or_compute('model-a', query, embed)
+
+        # "b" was least recently used when "c" arrived
+        await cache.get_or_compute('model-a', "a", embed)
+        await cache.get_or_compute('model-a', "b", embed)
+        assert embed.calls == ["a", "b", "c", "b"]
+        assert cache.stats()['evictions'] == 2
+
+        expiring = QueryEmbeddingCache(ttl_seconds=0)
+        await expiring.get_or_compute('model-a', "a", embed)
+        await expiring.get_or_compute('model-a', "a", embed)
+        assert expiring.stats()['expired'] == 1
+        assert expiring.stats()['hits'] == 0
@@ -0,0 +1,194 @@
+# tests/backend/test_search_engine.py
+
+import pytest
+from config import Config
+from search_engine import VectorSearchEngine, plan_search, reciprocal_rank_fusion
+from vector_store_manager import VectorStoreManager
+
+PROFILES = {
+    'fast': {'ef_search': 40, 'max_scan_tuples': 10000},
+    'balanced': {'ef_search': 100, 'max_scan_tuples': 20000},
+}
+
+
+def plan(recall='balanced', k=10, project_rows=500_000, total_rows=1_000_000, iterative_scan=None):
+    return plan_search(
+        recall, k, project_rows, total_rows,
+        profiles=PROFILES, exact_max_rows=20_000, iterative_scan=iterative_scan
+    )
+
+
+class FakeDatabase:
+    """Answers the engine's version and stats queries, records searches"""
+
+    def __init__(self, extversion='0.8.0', project_rows=50_000, total_rows=5_000_000, partitioned=False, rows=None,
+                 matching_rows=0):
+        self.extversion = extversion
+        self.rows = rows or {}
+        self.matching_rows = matching_rows
+        self.partitioned = partitioned
+        self.stats = {'project_rows': project_rows, 'total_rows': total_rows}
+        self.statements = {}
+        self.searches = []
+        self.stats_calls = 0
+
+    def register_statement(self, name, query):
+        self.statements[name] = query
+
+    async def vector_table_partitioned(self):
+        return self.partitioned
+
+    async def fetch_one(self, query, params=None):
+        return {'extversion': self.extversion}
+
+    async def fetch_one_prepared(self, name, *args):
+        self.stats_calls += 1
+        return self.stats
+
+    async def fetch_all_prepared(self, name, *args, settings=None):
+        self.searches.append((name, settings))
+        return self.rows.get(name.split(':')[0], [])
+
+    async def fetch_value_prepared(self, name, *args):
+        self.stats_calls += 1
+        return self.matching_rows
+
+
+class TestSearchPlanning:
+    """Test exact vs HNSW planning"""
+
+    def test_small_projects_and_exact_recall_scan_exactly(self):
+        assert plan(project_rows=1_000).method == 'exact'
+        assert plan(recall='exact').method == 'exact'
+
+    def test_iterative_scan_keeps_profile_ef_search(self):
+        result = plan(recall='fast', iterative_scan='relaxed_order', project_rows=30_000, total_rows=10_000_000)
+        assert result.method == 'hnsw'
+        assert result.settings() == {
+            'hnsw.ef_search': 40, 'hnsw.iterative_scan': 'relaxed_order', 'hnsw.max_scan_tuples': 10000
+        }
+
+    def test_ef_search_scales_with_project_share_without_iterative_scan(self):
+        assert plan(project_rows=500_000, total_rows=1_000_000).settings() == {'hnsw.ef_search': 200}
+        # 100 / 5% would exceed pgvector's ef_search cap
+        assert plan(project_rows=50_000, total_rows=1_000_000).method == 'exact'
+
+    def test_ef_search_is_at_least_k(self):
+        assert plan(recall='fast', k=80, total_rows=500_000).ef_search == 80
+
+
+class TestVectorSearchEngine:
+    """Test the engine against a fake database"""
+
+    @pytest.mark.asyncio
+    async def test_settings_are_applied_per_query(self):
+        db = FakeDatabase()
+        engine = VectorSearchEngine(db)
+
+        await engine.search([0.1], 'project-1', 5, 'balanced')
+        await engine.search([0.1], 'project-1', 5, 'exact')
+
+        assert db.searches[0][0] == 'vector_search'
+        assert db.searches[0][1]['hnsw.iterative_scan'] == 'relaxed_order'
+        assert db.searches[1] == ('vector_search_exact', {})
+        assert db.stats_calls == 1
+        assert engine.counters == {'exact': 1, 'hnsw': 1, 'hybrid': 0, 'filtered': 0, 'filter_fallback': 0}
+        stats = engine.stats()
+        assert stats['methods'] == engine.counters
+        assert (stats['iterative_scan'], stats['partitioned']) == ('relaxed_order', False)
+
+    @pytest.mark.asyncio
+    async def test_old_pgvector_falls_back_to_scaled_ef_search(self):
+        db = FakeDatabase(extversion='0.7.4', project_rows=400_000, total_rows=1_000_000)
+        engine = VectorSearchEngine(db)
+
+        await engine.search([0.1], 'project-1', 5)
+
+        assert db.searches == [('vector_search', {'hnsw.ef_search': 250})]
+
+    @pytest.mark.asyncio
+    async def test_partitioned_table_searches_only_the_project_graph(self):
+        # 1% of the table would force an exact scan, but the project has its own partition
+        db = FakeDatabase(extversion='0.7.4', project_rows=50_000, total_rows=5_000_000, partitioned=True)
+        engine = VectorSearchEngine(db)
+
+        await engine.search([0.1], 'project-1', 5, 'balanced')
+
+        assert db.searches == [('vector_search', {'hnsw.ef_search': 100})]
+
+    @pytest.mark.asyncio
+    async def test_selective_filter_is_scanned_exactly(self):
+        db = FakeDatabase(project_rows=2_000_000, matching_rows=300)
+        engine = VectorSearchEngine(db)
+
+        await engine.search([0.1], 'project-1', 5, 'balanced', filters={'filename': 'a.pdf'})
+        await engine.search([0.1], 'project-1', 5, 'balanced', filters={'filename': 'b.pdf'})
+
+        name, settings = db.searches[0]
+        assert name.startswith('vector_search_exact:') and settings == {}
+        assert 'metadata @> $4::jsonb' in db.statements[name]
+        # One filtered statement per shape, whatever the values
+        assert db.searches[1][0] == name
+        assert engine.counters['filtered'] == 2
+
+    @pytest.mark.asyncio
+    async def test_broad_filter_falls_back_to_exact_when_hnsw_comes_up_short(self):
+        db = FakeDatabase(project_rows=2_000_000, matching_rows=100_000, rows={'vector_search': [{'id': 1}]})
+        engine = VectorSearchEngine(db)
+
+        await engine.search([0.1], 'project-1', 5, 'balanced', filters={'page_count': {'gte': 10}})
+
+        assert [name.split(':')[0] for name, _ in db.searches] == ['vector_search', 'vector_search_exact']
+        assert engine.counters['filter_fallback'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_recall_is_rejected(self):
+        engine = VectorSearchEngine(FakeDatabase())
+        with pytest.raises(ValueError):
+            await engine.search([0.1], 'project-1', 5, 'perfect')
+
+
+class TestHybridSearch:
+    """Test reciprocal rank fusion of vector and full-text results"""
+
+    def test_rows_in_both_lists_rank_first(self):
+        fused = reciprocal_rank_fusion(
+            {'vector': [{'id': 'a'}, {'id': 'b'}], 'text': [{'id': 'c'}, {'id': 'b'}]}, k=3, rrf_k=60
+        )
+
+        assert [row['id'] for row in fused] == ['b', 'a', 'c']
+        assert fused[0]['rrf_score'] == pytest.approx(2 / 62)
+        assert (fused[0]['vector_rank'], fused[0]['text_rank']) == (2, 2)
+        assert 'text_rank' not in fused[1]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_fetches_both_candidate_lists(self):
+        db = FakeDatabase(rows={
+            'vector_search': [{'id': 1}, {'id': 2}],
+            'text_search': [{'id': 3}, {'id': 1}],
+        })
+        engine = VectorSearchEngine(db)
+
+        results = await engine.hybrid_search([0.1], 'ERR-4521', 'project-1', 2, 'balanced')
+
+        assert [row['id'] for row in results] == [1, 3]
+        assert sorted(name for name, _ in db.searches) == ['text_search', 'vector_search']
+        assert engine.counters == {'exact': 0, 'hnsw': 1, 'hybrid': 1, 'filtered': 0, 'filter_fallback': 0}
+
+    @pytest.mark.asyncio
+    async def test_min_similarity_is_rejected_in_hybrid_mode(self):
+        searched = []
+
+        async def search_similar(query, project_id, k, filters, recall=None, mode=None):
+            searched.append(mode)
+            return []
+        manager = VectorStoreManager.__new__(VectorStoreManager)
+        manager.config = Config
+        manager.search_similar = search_similar
+
+        with pytest.raises(ValueError):
+            await manager.search_with_filters("ERR-4521", 'project-1', min_similarity=0.5, mode='hybrid')
+        await manager.search_with_filters("ERR-4521", 'project-1', mode='hybrid')
+        await manager.search_with_filters("ERR-4521", 'project-1', min_similarity=0.5, mode='vector')
+
+        assert searched == ['hybrid', 'vector']
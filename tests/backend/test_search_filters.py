@@ -0,0 +1,59 @@
+# tests/backend/test_search_filters.py
+
+from datetime import datetime
+
+import pytest
+from search_filters import compile_filters
+
+DOCUMENT_IDS = ['6f1c2b1e-93a4-4c55-9b1d-0c7e5c8d2a10', '0b7d9a52-1c3e-4f6a-8e2d-5a9c7b3e1f04']
+
+
+class TestCompileFilters:
+    """Test filter dicts -> parameterized SQL over metadata"""
+
+    def test_scalar_equalities_merge_into_one_containment(self):
+        compiled = compile_filters({'filename': 'report.pdf', 'has_tables': True, 'page_count': 3})
+
+        assert compiled.sql(4) == " AND metadata @> $4::jsonb"
+        assert compiled.values == ['{"filename": "report.pdf", "has_tables": true, "page_count": 3}']
+
+    def test_lists_ranges_and_dates_are_bound_parameters(self):
+        compiled = compile_filters({
+            'processing_method': ['gemini', 'pypdf'],
+            'page_count': {'gte': 2, 'lt': 5},
+            'created_at': {'gte': '2026-01-01'},
+        })
+
+        assert compiled.sql(5) == (
+            " AND created_at >= $5"
+            " AND (metadata->>'page_count')::numeric >= $6 AND (metadata->>'page_count')::numeric < $7"
+            " AND metadata->>'processing_method' = ANY($8::text[])"
+        )
+        assert compiled.values == [datetime(2026, 1, 1), 2.0, 5.0, ['gemini', 'pypdf']]
+
+    def test_shape_key_ignores_values(self):
+        first = compile_filters({'filename': 'a.pdf', 'document_ids': [DOCUMENT_IDS[0]]})
+        second = compile_filters({'filename': 'b.pdf', 'document_ids': DOCUMENT_IDS})
+
+        assert first.key == second.key
+        assert first.cache_key != second.cache_key
+
+    def test_empty_filters_compile_to_none(self):
+        assert compile_filters(None) is None
+        assert compile_filters({'filename': None}) is None
+
+    @pytest.mark.parametrize('filters', [
+        {'owner': 'me'},
+        {'page_count': {'between': [1, 2]}},
+        {'page': {'gte': 1, 'lte': 3}},
+        {'has_images': 'yes'},
+        {'created_at': {'gte': 'last week'}},
+        {'file_type': []},
+        {'tags': 5},
+        {'tags': ['finance', 7]},
+        {'document_ids': ['abc']},
+        {'document_ids': 42},
+    ])
+    def test_invalid_filters_are_rejected(self, filters):
+        with pytest.raises(ValueError):
+            compile_filters(filters)
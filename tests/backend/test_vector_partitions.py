@@ -0,0 +1,174 @@
+# tests/backend/test_vector_partitions.py
+
+import asyncio
+import uuid
+
+import pytest
+from database_manager import (
+    DatabaseManager,
+    SimpleConnectionPool,
+    partition_index_ddl,
+    partition_name,
+    vector_table_ddl
+)
+
+PROJECT_ID = '6F1C2B1E-93A4-4C55-9B1D-0C7E5C8D2A10'
+
+
+PARENT_INDEXES = [
+    ("CREATE UNIQUE INDEX document_vectors_pkey ON ONLY public.document_vectors USING btree (id, project_id)",
+     "PRIMARY KEY (id, project_id)"),
+    ("CREATE INDEX document_vectors_embedding_idx ON ONLY public.document_vectors "
+     "USING hnsw (embedding vector_cosine_ops)", None),
+    ("CREATE INDEX document_vectors_metadata_idx ON ONLY public.document_vectors "
+     "USING gin (metadata jsonb_path_ops)", None),
+]
+
+
+class FakeTransaction:
+    """Marks transaction boundaries in the connection's statement log"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.executed.append('BEGIN')
+        return self
+
+    async def __aexit__(self, *exc):
+        self.conn.executed.append('ROLLBACK' if exc[0] else 'COMMIT')
+        return False
+
+
+class FakeConnection:
+    """Records DDL/DML; answers the catalog lookups ensure_project_partition makes"""
+
+    def __init__(self, partitioned=True, existing=(), fail_on=None):
+        self.partitioned = partitioned
+        self.existing = set(existing)
+        self.fail_on = fail_on
+        self.executed = []
+
+    def is_closed(self):
+        return False
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def fetchval(self, query, *args):
+        if 'relkind' in query:
+            return self.partitioned
+        if 'to_regclass' in query:
+            return args[0] in self.existing
+        if 'string_agg' in query:
+            return 'id, document_id, project_id, embedding'
+        raise AssertionError(query)
+
+    async def fetch(self, query, *args):
+        if 'pg_get_indexdef' in query:
+            return [{'indexdef': indexdef, 'constraintdef': constraintdef} for indexdef, constraintdef in PARENT_INDEXES]
+        raise AssertionError(query)
+
+    async def execute(self, query, *args):
+        self.executed.append(' '.join(query.split()))
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError(f"{self.fail_on} failed")
+        return 'INSERT 0 3' if query.lstrip().startswith('INSERT') else 'OK'
+
+    async def close(self):
+        pass
+
+
+async def make_manager(conn):
+    db = DatabaseManager()
+
+    async def connect():
+        raise AssertionError("the pool should not need new connections")
+
+    db._pool = SimpleConnectionPool(connect, [conn])
+    db._connector_loop = asyncio.get_running_loop()
+    return db
+
+
+class TestVectorPartitions:
+    """Test per-project partitions of the vector table"""
+
+    def test_partition_names_are_canonical_and_validated(self):
+        name = partition_name('document_vectors', PROJECT_ID)
+        assert name == f"document_vectors_p_{uuid.UUID(PROJECT_ID).hex}"
+        assert len(name) <= 63
+        with pytest.raises(ValueError):
+            partition_name('document_vectors', "x'); DROP TABLE projects; --")
+
+    def test_partitioned_table_keys_on_project(self):
+        ddl = ' '.join(vector_table_ddl('document_vectors', 768, partitioned=True).split())
+        assert 'PRIMARY KEY (id, project_id)' in ddl
+        assert ddl.endswith('PARTITION BY LIST (project_id)')
+        assert 'PARTITION BY' not in vector_table_ddl('document_vectors', 768, partitioned=False)
+
+    @pytest.mark.asyncio
+    async def test_partition_is_filled_before_attach_and_cached(self):
+        conn = FakeConnection()
+        db = await make_manager(conn)
+
+        assert await db.ensure_project_partition(PROJECT_ID)
+        assert await db.ensure_project_partition(PROJECT_ID.lower())
+
+        name = partition_name('document_vectors', PROJECT_ID)
+        key = PROJECT_ID.lower()
+        transactions = ' '.join(f"[{sql}]" for sql in conn.executed).split('[BEGIN]')[1:]
+        assert len(transactions) == 3
+        excluded, build, attach = transactions
+        assert excluded.strip() == (
+            f"[SELECT set_config(name, value, true) FROM unnest($1::text[], $2::text[]) AS s(name, value)] "
+            f"[ALTER TABLE document_vectors_default ADD CONSTRAINT {name}_excluded "
+            f"CHECK (project_id <> '{key}') NOT VALID] [COMMIT]"
+        )
+        # Filled, then indexed like the parent, away from ATTACH's locks
+        assert build.index(f"[CREATE TABLE {name} (LIKE document_vectors") < build.index(f"[INSERT INTO {name}")
+        assert build.index(f"[INSERT INTO {name}") < build.index(f"[ALTER TABLE {name} ADD PRIMARY KEY (id, project_id)]")
+        assert f"[CREATE INDEX ON {name} USING hnsw (embedding vector_cosine_ops)]" in build
+        assert 'CREATE INDEX' not in attach and 'PRIMARY KEY' not in attach
+        # Validated before ATTACH so ATTACH skips scanning the default partition
+        steps = [
+            f"[DELETE FROM {name} p WHERE NOT EXISTS",
+            "[DELETE FROM document_vectors_default WHERE project_id = $1]",
+            f"[ALTER TABLE document_vectors_default VALIDATE CONSTRAINT {name}_excluded]",
+            f"[ALTER TABLE document_vectors ATTACH PARTITION {name} FOR VALUES IN ('{key}')]",
+            f"[ALTER TABLE document_vectors_default DROP CONSTRAINT {name}_excluded]",
+        ]
+        assert [attach.index(step) for step in steps] == sorted(attach.index(step) for step in steps)
+        # Second call answered from the cache: one advisory lock in total, released
+        assert sum('pg_advisory_lock' in sql for sql in conn.executed) == 1
+        assert conn.executed[-1] == "SELECT pg_advisory_unlock(hashtext($1))"
+
+    @pytest.mark.asyncio
+    async def test_failed_build_removes_the_default_partition_constraint(self):
+        conn = FakeConnection(fail_on='ATTACH')
+        db = await make_manager(conn)
+
+        with pytest.raises(RuntimeError):
+            await db.ensure_project_partition(PROJECT_ID)
+
+        name = partition_name('document_vectors', PROJECT_ID)
+        assert f"ALTER TABLE document_vectors_default DROP CONSTRAINT IF EXISTS {name}_excluded" in conn.executed
+        assert f"DROP TABLE IF EXISTS {name}" in conn.executed
+        assert conn.executed[-1] == "SELECT pg_advisory_unlock(hashtext($1))"
+
+    def test_parent_indexes_are_recreated_on_the_standalone_table(self):
+        assert partition_index_ddl('document_vectors_p_1', PARENT_INDEXES) == [
+            "ALTER TABLE document_vectors_p_1 ADD PRIMARY KEY (id, project_id)",
+            "CREATE INDEX ON document_vectors_p_1 USING hnsw (embedding vector_cosine_ops)",
+            "CREATE INDEX ON document_vectors_p_1 USING gin (metadata jsonb_path_ops)",
+        ]
+        with pytest.raises(ValueError):
+            partition_index_ddl('document_vectors_p_1', [("CREATE INDEX CONCURRENTLY x ON y (z)", None)])
+
+    @pytest.mark.asyncio
+    async def test_unpartitioned_table_is_left_alone(self):
+        conn = FakeConnection(partitioned=False)
+        db = await make_manager(conn)
+
+        assert not await db.ensure_project_partition(PROJECT_ID)
+        assert not await db.drop_project_partition(PROJECT_ID)
+        assert conn.executed == []
@@ -0,0 +1,17 @@
+# tests/cloud_function/conftest.py
+
+import pytest
+from tests.source_trees import activate
+
+# Bare imports in these tests and in the code under test resolve to cloud_function/
+activate('cloud_function')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collectstart(collector):
+    activate('cloud_function')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    activate('cloud_function')
@@ -0,0 +1,104 @@
+# tests/cloud_function/test_connection_pool.py
+
+import asyncio
+
+import pytest
+from database_manager import PoolAcquireTimeout, SimpleConnectionPool
+
+
+class FakeConnection:
+    """Just enough of asyncpg.Connection for the pool"""
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+        self.pings = 0
+
+    def is_closed(self):
+        return self.closed
+
+    async def fetchval(self, query):
+        self.pings += 1
+        return 1
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(initial=1, **options):
+    opened = []
+
+    async def connect():
+        conn = FakeConnection(f"conn-{len(opened)}")
+        opened.append(conn)
+        return conn
+
+    connections = [FakeConnection(f"initial-{i}") for i in range(initial)]
+    pool = SimpleConnectionPool(connect, connections, **options)
+    return pool, connections, opened
+
+
+class TestConnectionPool:
+    """Test the connection pool's waiter queue and health checks"""
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_in_fifo_order(self):
+        pool, _, _ = make_pool(initial=1, max_size=1)
+        served = []
+
+        async def worker(i):
+            async with pool.acquire():
+                served.append(i)
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*[worker(i) for i in range(5)])
+
+        assert served == [0, 1, 2, 3, 4]
+        assert pool.stats()['waited'] == 4
+
+    @pytest.mark.asyncio
+    async def test_acquire_times_out_when_exhausted(self):
+        pool, _, _ = make_pool(initial=1, max_size=1)
+
+        async with pool.acquire():
+            with pytest.raises(PoolAcquireTimeout):
+                await pool._acquire(timeout=0.01)
+
+        # The timed-out waiter left the queue; the pool still works
+        async with pool.acquire() as conn:
+            assert conn.name == 'initial-0'
+        assert pool.stats()['timeouts'] == 1
+        assert pool.stats()['waiting'] == 0
+
+    @pytest.mark.asyncio
+    async def test_only_idle_connections_are_pinged(self):
+        pool, (conn,), _ = make_pool(initial=1, idle_check_after=60)
+
+        async with pool.acquire():
+            pass
+        assert conn.pings == 0
+
+        pool._idle_check_after = 0
+        async with pool.acquire():
+            pass
+        assert conn.pings == 1
+
+    @pytest.mark.asyncio
+    async def test_connections_past_max_lifetime_are_replaced(self):
+        pool, (old,), opened = make_pool(initial=1, max_lifetime=0)
+
+        async with pool.acquire() as conn:
+            pass
+
+        assert old.closed
+        assert conn is opened[0]
+        assert pool.stats()['recycled'] >= 1
+
+    @pytest.mark.asyncio
+    async def test_closed_connections_are_discarded(self):
+        pool, (stale,), opened = make_pool(initial=1)
+        stale.closed = True
+
+        async with pool.acquire() as conn:
+            assert conn is opened[0]
+        assert pool.stats()['size'] == 1
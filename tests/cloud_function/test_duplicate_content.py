@@ -0,0 +1,135 @@
+# tests/cloud_function/test_duplicate_content.py
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from config import Config
+from pipeline_processor import PipelineProcessor
+from stage_limiter import StageLimiter
+
+DOCUMENT_ID = '6f1c2b1e-93a4-4c55-9b1d-0c7e5c8d2a10'
+SOURCE_ID = '3d5e8f20-7a1b-4c9d-8e6f-1a2b3c4d5e6f'
+PROJECT_ID = '0b7d9a52-1c3e-4f6a-8e2d-5a9c7b3e1f04'
+FILE_HASH = 'a' * 64
+
+
+class FakeStage:
+    """Records a stage's async calls and answers with a fixed value"""
+
+    def __init__(self, result=None):
+        self.result = result
+        self.calls = []
+
+    async def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self.result
+
+
+class FakeContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Answers the source lookup and records the clone statement"""
+
+    def __init__(self, source):
+        self.source = source
+        self.executed = []
+
+    async def _get_pool(self):
+        return self
+
+    def acquire(self):
+        return FakeContext(self)
+
+    def transaction(self):
+        return FakeContext()
+
+    async def fetchrow(self, query, *args):
+        return self.source
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+
+def make_processor(source=None):
+    processor = PipelineProcessor.__new__(PipelineProcessor)
+    processor.config = Config()
+    processor.db_manager = FakeConnection(source)
+    processor.checkpoints = None
+    processor.stages = StageLimiter({'download': 1, 'extraction': 1, 'embedding': 1, 'db': 1})
+    processor.events = SimpleNamespace(flush=FakeStage())
+    processor.doc_processor = SimpleNamespace(process_document=FakeStage())
+    processor.chunking_factory = SimpleNamespace(chunk_text=FakeStage())
+    processor.vector_manager = SimpleNamespace(add_documents=FakeStage(), sync_documents=FakeStage())
+
+    processor._start_prewarm = lambda: None
+    processor._remove_local_file = lambda path: None
+    processor._download_file = FakeStage(('/tmp/report-copy.pdf', 2048, FILE_HASH))
+    processor._create_or_update_document_record = FakeStage((DOCUMENT_ID, True, False))
+    processor._log_stage = FakeStage()
+    processor._update_document_status = FakeStage()
+    processor._publish_notification = FakeStage()
+    return processor
+
+
+class TestDuplicateContent:
+    """Test cloning an upload whose bytes were already processed"""
+
+    @pytest.mark.asyncio
+    async def test_same_digest_clones_rows_instead_of_embedding(self):
+        processor = make_processor(source={
+            'id': SOURCE_ID,
+            'processing_method': 'pymupdf',
+            'page_count': 12,
+            'metadata': json.dumps({'chunks_count': 30}),
+        })
+
+        result = await processor.process_document('gs://bucket/project/report-copy.pdf', PROJECT_ID, 'user-1')
+
+        assert result['status'] == 'cloned'
+        assert result['cloned_from'] == SOURCE_ID
+        # Vectors and chunks are copied in one statement, in a transaction
+        [(query, args)] = processor.db_manager.executed
+        assert 'INSERT INTO document_chunks' in query
+        assert args[:2] == (SOURCE_ID, DOCUMENT_ID)
+        assert json.loads(args[2]) == {
+            'document_id': DOCUMENT_ID, 'filename': 'report-copy.pdf', 'cloned_from': SOURCE_ID
+        }
+        # Nothing is extracted, chunked or embedded
+        assert processor.doc_processor.process_document.calls == []
+        assert processor.chunking_factory.chunk_text.calls == []
+        assert processor.vector_manager.add_documents.calls == []
+        [(args, kwargs)] = processor._update_document_status.calls
+        assert kwargs['status'] == 'completed'
+        assert kwargs['page_count'] == 12
+        assert kwargs['metadata'] == {'chunks_count': 30, 'cloned_from': SOURCE_ID, 'is_update': False}
+
+    @pytest.mark.asyncio
+    async def test_no_completed_duplicate_returns_none(self):
+        processor = make_processor(source=None)
+
+        source_id = await processor._clone_duplicate_content(
+            DOCUMENT_ID, PROJECT_ID, 'report.pdf', 'gs://bucket/project/report.pdf', FILE_HASH
+        )
+
+        assert source_id is None
+        assert processor.db_manager.executed == []
+        assert processor._update_document_status.calls == []
+
+    @pytest.mark.asyncio
+    async def test_missing_digest_skips_the_lookup(self):
+        processor = make_processor(source={'id': SOURCE_ID})
+
+        assert await processor._clone_duplicate_content(
+            DOCUMENT_ID, PROJECT_ID, 'report.pdf', 'gs://bucket/project/report.pdf', None
+        ) is None
+        assert processor.db_manager.executed == []
@@ -0,0 +1,69 @@
+# tests/cloud_function/test_embedding_cache.py
+
+import pytest
+from embedding_cache import EmbeddingCache, content_hash
+
+
+class FakeDatabaseManager:
+    """Stands in for the Postgres tier: returns preset rows, records writes"""
+
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.queries = []
+
+    async def fetch_all(self, query, params=None):
+        self.queries.append(params)
+        wanted = set(params[1])
+        return [row for row in self.rows if row['content_hash'] in wanted]
+
+    async def _get_pool(self):
+        raise RuntimeError("no database in tests")
+
+
+@pytest.fixture
+def db():
+    return FakeDatabaseManager()
+
+
+class TestEmbeddingCache:
+    """Test the two-tier embedding cache"""
+
+    def test_content_hash_is_stable_sha256(self):
+        assert content_hash("hello") == content_hash("hello")
+        assert content_hash("hello") != content_hash("hello ")
+        assert len(content_hash("hello")) == 64
+
+    @pytest.mark.asyncio
+    async def test_memory_hits_and_misses_are_counted(self, db):
+        cache = EmbeddingCache(db, 'text-embedding-005')
+        await cache.put_many({'a': [0.5, 0.25]})
+
+        stats = {}
+        found = await cache.get_many(['a', 'b'], stats)
+
+        assert found == {'a': [0.5, 0.25]}
+        assert stats == {'cache_hits': 1, 'cache_memory_hits': 1, 'cache_db_hits': 0, 'cache_misses': 1}
+
+    @pytest.mark.asyncio
+    async def test_db_tier_hits_populate_memory(self):
+        db = FakeDatabaseManager(rows=[{'content_hash': 'a', 'embedding': [1.0, 2.0]}])
+        cache = EmbeddingCache(db, 'text-embedding-005')
+
+        stats = {}
+        assert await cache.get_many(['a'], stats) == {'a': [1.0, 2.0]}
+        assert stats['cache_db_hits'] == 1
+
+        # Second lookup is served from memory without touching the database
+        await cache.get_many(['a'], stats)
+        assert stats['cache_memory_hits'] == 1
+        assert len(db.queries) == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_evicts_least_recently_used(self, db):
+        cache = EmbeddingCache(db, 'text-embedding-005', max_entries=2)
+        await cache.put_many({'a': [1.0], 'b': [2.0]})
+        await cache.get_many(['a'])          # touch a, so b is now oldest
+        await cache.put_many({'c': [3.0]})
+
+        found = await cache.get_many(['a', 'b', 'c'])
+        assert set(found) == {'a', 'c'}
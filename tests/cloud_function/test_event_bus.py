@@ -0,0 +1,93 @@
+# tests/cloud_function/test_event_bus.py
+
+import pytest
+from event_bus import StageEventBus
+
+
+class FakeDatabaseManager:
+    """Records prepared-statement executions"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.statements = {}
+        self.executed = []
+
+    def register_statement(self, name, query):
+        self.statements[name] = query
+
+    async def execute_prepared(self, name, *args):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.executed.append((name, args))
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.posts = []
+
+    async def post(self, url, json=None, params=None):
+        self.posts.append((url, json))
+        return FakeResponse()
+
+    async def aclose(self):
+        pass
+
+
+def make_bus(db=None):
+    bus = StageEventBus(db or FakeDatabaseManager(), 'http://backend')
+    bus.flush_interval = 60  # flush only when the test asks
+    bus._client = FakeClient()
+    return bus
+
+
+class TestStageEventBus:
+    """Test buffered stage logging and WebSocket delivery"""
+
+    @pytest.mark.asyncio
+    async def test_stage_rows_are_written_in_one_insert(self):
+        bus = make_bus()
+        bus.log_stage('d1', 'p1', 'extraction', 'started')
+        bus.log_stage('d1', 'p1', 'extraction', 'completed', duration_ms=120, metadata={'pages': 3})
+
+        await bus.flush()
+
+        assert len(bus.db_manager.executed) == 1
+        name, columns = bus.db_manager.executed[0]
+        assert name == 'log_stages'
+        assert columns[2] == ['extraction', 'extraction']
+        assert columns[4] == [None, 120]
+        assert columns[6] == [None, '{"pages": 3}']
+        await bus.close()
+
+    @pytest.mark.asyncio
+    async def test_updates_are_batched_per_project(self):
+        bus = make_bus()
+        bus.log_stage('d1', 'p1', 'chunking', 'started')
+        bus.notify(project_id='p1', document_id='d1', status='completed', data={})
+        bus.notify(project_id='p2', document_id='d2', status='processing', data={})
+
+        await bus.flush()
+
+        posts = {url: body for url, body in bus._client.posts}
+        assert [m['status'] for m in posts['http://backend/api/projects/p1/broadcast']['messages']] == [
+            'chunking_started', 'completed'
+        ]
+        assert len(posts['http://backend/api/projects/p2/broadcast']['messages']) == 1
+        assert bus.counters['messages_sent'] == 3
+        await bus.close()
+
+    @pytest.mark.asyncio
+    async def test_delivery_failures_are_swallowed(self):
+        bus = make_bus(FakeDatabaseManager(fail=True))
+        bus.log_stage('d1', 'p1', 'embedding', 'failed', error_details='boom')
+
+        await bus.flush()
+
+        assert bus.counters['dropped'] == 1
+        assert bus.counters['messages_sent'] == 1
+        await bus.close()
@@ -0,0 +1,141 @@
+# tests/cloud_function/test_extraction_cache.py
+
+import os
+import tempfile
+import time
+
+import pytest
+from document_processors import ProcessedDocument
+from extraction_cache import ExtractionCache
+
+
+@pytest.fixture
+def cache():
+    # Disk tier only; no database in tests
+    cache = ExtractionCache()
+    cache.disk_dir = tempfile.mkdtemp(prefix='extraction_cache_test_')
+    return cache
+
+
+def make_result(text="extracted text", method='gemini-inline'):
+    return ProcessedDocument(
+        text=text,
+        metadata={'pages': 2},
+        sections=[{'heading': 'Intro', 'content': 'x', 'page': 1}],
+        page_count=2,
+        processing_method=method
+    )
+
+
+class FakeCacheDatabase:
+    """Accepts cache writes; counts trims and size measurements"""
+
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.deletes = 0
+        self.total_queries = 0
+
+    async def execute_query(self, query, params=None):
+        if query.lstrip().startswith('DELETE'):
+            self.deletes += 1
+            self.total_bytes = 0
+
+    async def fetch_one(self, query, params=None):
+        self.total_queries += 1
+        return {'total': self.total_bytes}
+
+
+class TestExtractionCache:
+    """Test the extraction result cache"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_returns_processed_document(self, cache):
+        await cache.put('a' * 64, 'gemini', make_result())
+
+        method, result = await cache.get('a' * 64, ['gemini', 'pymupdf'])
+
+        assert method == 'gemini'
+        assert result == make_result()
+
+    @pytest.mark.asyncio
+    async def test_routing_order_and_method_are_part_of_the_key(self, cache):
+        await cache.put('a' * 64, 'gemini', make_result("from gemini"))
+        await cache.put('a' * 64, 'pymupdf', make_result("from pymupdf", 'pymupdf'))
+
+        method, result = await cache.get('a' * 64, ['pymupdf', 'gemini'])
+        assert (method, result.text) == ('pymupdf', "from pymupdf")
+
+        assert await cache.get('a' * 64, ['pypdf']) is None
+        assert await cache.get('b' * 64, ['gemini']) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_extractions_are_not_cached(self, cache):
+        await cache.put('a' * 64, 'gemini', ProcessedDocument(text="", metadata={}, error="quota"))
+
+        assert await cache.get('a' * 64, ['gemini']) is None
+
+    @pytest.mark.asyncio
+    async def test_prompt_version_bump_invalidates(self, cache):
+        await cache.put('a' * 64, 'gemini', make_result())
+
+        cache.config.EXTRACTION_PROMPT_VERSION, old = 'v-test', cache.config.EXTRACTION_PROMPT_VERSION
+        try:
+            assert await cache.get('a' * 64, ['gemini']) is None
+        finally:
+            cache.config.EXTRACTION_PROMPT_VERSION = old
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_ignored(self, cache):
+        await cache.put('a' * 64, 'gemini', make_result())
+        cache.ttl_seconds = 0
+        time.sleep(0.01)
+
+        assert await cache.get('a' * 64, ['gemini']) is None
+        assert os.listdir(cache.disk_dir) == []
+
+    @pytest.mark.asyncio
+    async def test_hits_do_not_extend_the_ttl(self, cache):
+        cache.ttl_seconds = 0.3
+        await cache.put('a' * 64, 'gemini', make_result())
+
+        deadline = time.time() + 0.5
+        hits = 0
+        while time.time() < deadline:
+            if await cache.get('a' * 64, ['gemini']) is not None:
+                hits += 1
+            time.sleep(0.05)
+
+        assert hits > 0
+        assert await cache.get('a' * 64, ['gemini']) is None
+
+    @pytest.mark.asyncio
+    async def test_db_tier_is_trimmed_only_past_its_budget(self, cache):
+        db = FakeCacheDatabase(total_bytes=0)
+        cache.db_manager = db
+        cache.db_max_bytes = 10_000
+
+        await cache.put('a' * 64, 'gemini', make_result())
+        await cache.put('b' * 64, 'gemini', make_result())
+        assert db.deletes == 0
+        # Measured once, then tracked from this instance's writes
+        assert db.total_queries == 1
+
+        await cache.put('c' * 64, 'gemini', make_result(os.urandom(20_000).hex()))
+        assert db.deletes == 1
+        assert db.total_queries == 2
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_evicts_least_recently_used(self, cache):
+        await cache.put('a' * 64, 'gemini', make_result("a" * 2000))
+        await cache.put('b' * 64, 'gemini', make_result("b" * 2000))
+        entry_size = max(os.path.getsize(os.path.join(cache.disk_dir, name)) for name in os.listdir(cache.disk_dir))
+
+        # Touch a so b becomes least recently used, then shrink the budget to two entries
+        time.sleep(0.01)
+        await cache.get('a' * 64, ['gemini'])
+        cache.disk_max_bytes = entry_size * 2
+        await cache.put('c' * 64, 'gemini', make_result("c" * 2000))
+
+        assert await cache.get('a' * 64, ['gemini']) is not None
+        assert await cache.get('b' * 64, ['gemini']) is None
+        assert await cache.get('c' * 64, ['gemini']) is not None
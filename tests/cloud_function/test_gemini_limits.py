@@ -0,0 +1,376 @@
+# tests/cloud_function/test_gemini_limits.py
+
+import pytest
+import asyncio
+from gemini_processor import (
+    EnhancedGeminiProcessor,
+    HybridPdfProcessor,
+    SmartDocumentProcessorFactory,
+    scanned_page_runs,
+    shard_ranges,
+    stitch_shard_results
+)
+import document_processors
+from document_processors import PdfInspection, ProcessedDocument, PyMuPDFProcessor, inspect_pdf, open_pdf
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from pypdf import PdfReader, PdfWriter
+import io
+import tempfile
+
+@pytest.fixture
+def processor():
+    return EnhancedGeminiProcessor()
+
+@pytest.fixture
+def factory():
+    return SmartDocumentProcessorFactory()
+
+def create_test_pdf(num_pages: int) -> bytes:
+    """Create a test PDF with specified number of pages"""
+    writer = PdfWriter()
+    for i in range(num_pages):
+        writer.add_blank_page(width=612, height=792)
+    
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def create_mixed_pdf(pages) -> bytes:
+    """Create a PDF with a text layer on pages given as a string and blank (scanned-like) pages for None"""
+    import fitz
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page(width=612, height=792)
+        if text:
+            page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+class TestGeminiLimits:
+    """Test Gemini limits handling"""
+    
+    @pytest.mark.asyncio
+    async def test_small_pdf_uses_inline(self, processor):
+        """Test that small PDFs use inline processing"""
+        pdf_bytes = create_test_pdf(10)  # 10 pages
+        
+        result = await processor.process(
+            file_bytes=pdf_bytes,
+            filename='test_small.pdf',
+            mime_type='application/pdf'
+        )
+        
+        assert result.processing_method == 'gemini-inline'
+        assert result.error is None
+    
+    @pytest.mark.asyncio
+    async def test_large_pdf_uses_file_api(self, processor):
+        """Test that 20-50MB PDFs use File API"""
+        # Create a 25MB PDF (mock)
+        pdf_bytes = b'0' * (25 * 1024 * 1024)
+        
+        result = await processor.process(
+            file_bytes=pdf_bytes,
+            filename='test_large.pdf',
+            mime_type='application/pdf'
+        )
+        
+        # Should use File API or fail with size error
+        assert result.processing_method in ['gemini-fileapi', 'gemini']
+    
+    @pytest.mark.asyncio
+    async def test_huge_pdf_returns_error(self, processor):
+        """Test that PDFs > 50MB return error"""
+        # Create a 60MB PDF (mock)
+        pdf_bytes = b'0' * (60 * 1024 * 1024)
+        
+        result = await processor.process(
+            file_bytes=pdf_bytes,
+            filename='test_huge.pdf',
+            mime_type='application/pdf'
+        )
+        
+        assert result.error is not None
+        assert '50MB' in result.error
+    
+    @pytest.mark.asyncio
+    async def test_too_many_pages_is_sharded(self, processor):
+        """Test that PDFs with > 1000 pages are sharded, not truncated"""
+        pdf_bytes = create_test_pdf(1500)  # 1500 pages
+        
+        result = await processor.process(
+            file_bytes=pdf_bytes,
+            filename='test_many_pages.pdf',
+            mime_type='application/pdf'
+        )
+        
+        assert result.processing_method == 'gemini-sharded'
+        assert result.metadata is not None
+        assert 'warning' not in result.metadata
+        assert result.metadata['total_pages'] == 1500
+    
+    @pytest.mark.asyncio
+    async def test_too_many_pages_is_truncated_when_sharding_is_off(self, processor, monkeypatch):
+        """Test that with sharding disabled only the first MAX_PAGES pages are sent"""
+        monkeypatch.setattr(processor.config, 'GEMINI_SHARDING_ENABLED', False)
+        sent = []
+        
+        async def fake_file_api(data, name, mime_type, **kwargs):
+            sent.append(len(PdfReader(io.BytesIO(data)).pages))
+            return ProcessedDocument(text="truncated", metadata={})
+        
+        processor._process_with_file_api = fake_file_api
+        
+        result = await processor.process(create_test_pdf(1500), 'test_huge.pdf', 'application/pdf')
+        
+        assert sent == [processor.MAX_PAGES]
+        assert result.metadata['total_pages'] == 1500
+        assert result.metadata['processed_pages'] == processor.MAX_PAGES
+        assert 'truncated' in result.metadata['warning']
+    
+    def test_shards_respect_shard_size(self, processor):
+        """Test that splitting keeps every page, in order"""
+        assert shard_ranges(120, shard_pages=50) == [(0, 50), (50, 100), (100, 120)]
+        assert shard_ranges(120, shard_pages=50, ranges=[(10, 70)]) == [(10, 60), (60, 70)]
+    
+    def test_shard_is_written_on_demand(self, processor):
+        """Test that one shard's sub-PDF holds exactly its pages"""
+        pieces = processor._write_shard(create_test_pdf(120), None, 50, 100)
+        
+        assert [(start, stop) for start, stop, _ in pieces] == [(50, 100)]
+        assert len(PdfReader(io.BytesIO(pieces[0][2])).pages) == 50
+    
+    @pytest.mark.asyncio
+    async def test_shards_are_built_only_under_the_semaphore(self, processor):
+        """Test that at most one shard's bytes exist at a time with one Gemini slot"""
+        processor.semaphore = asyncio.Semaphore(1)
+        live, peak = [], []
+        write_shard = processor._write_shard
+        
+        def tracked_write(*args):
+            pieces = write_shard(*args)
+            live.append(pieces)
+            peak.append(len(live))
+            return pieces
+        
+        async def fake_inline(data, name, mime_type, page_count=None):
+            await asyncio.sleep(0)
+            live.pop()
+            return ProcessedDocument(text=name, metadata={}, page_count=page_count)
+        
+        processor._write_shard = tracked_write
+        processor._process_inline = fake_inline
+        processor.config.GEMINI_SHARD_PAGES = 10
+        
+        result = await processor._process_sharded(create_test_pdf(40), 'big.pdf', 'application/pdf', 40)
+        
+        assert result.error is None
+        assert result.metadata['shards'] == 4
+        assert max(peak) == 1
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_sends_only_scanned_pages_to_gemini(self, processor):
+        """Test that a digital/scanned/digital PDF goes end to end through the hybrid processor"""
+        digital = "Quarterly revenue grew across every region and product line this year."
+        sent = []
+        
+        async def fake_inline(data, name, mime_type, page_count=None):
+            sent.append(len(PdfReader(io.BytesIO(data)).pages))
+            return ProcessedDocument(text="Scanned invoice", metadata={}, page_count=page_count)
+        
+        processor._process_inline = fake_inline
+        hybrid = HybridPdfProcessor(processor, PyMuPDFProcessor())
+        
+        result = await hybrid.process(
+            create_mixed_pdf([digital + " One", None, digital + " Three"]), 'mixed.pdf', 'application/pdf'
+        )
+        
+        assert result.error is None
+        assert result.processing_method == 'hybrid'
+        assert sent == [1]
+        assert [block.strip() for block in result.text.split("\n\n") if block.strip()] == [
+            digital + " One", "Scanned invoice", digital + " Three"
+        ]
+        assert (result.metadata['digital_pages'], result.metadata['scanned_pages']) == (2, 1)
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_merges_scanned_runs_in_page_order(self, processor):
+        """Test that Gemini results for scanned runs are merged by page with shifted page numbers"""
+        digital = "Born-digital page with a full text layer, well over the glyph threshold."
+        
+        class FakePyMuPDF:
+            async def extract(self, file_bytes, filename, file_path=None, inspection=None):
+                return {
+                    'texts': [digital + " 1", "", " ", digital + " 4", ""],
+                    'tables': [{'page': 1, 'content': 'local'}, {'page': 2, 'content': 'raster'}],
+                    'images': [{'page': 3}, {'page': 4}],
+                    'metadata': {'title': 'Mixed'},
+                    'page_count': 5,
+                }
+        
+        calls = []
+        
+        async def fake_shard(file_bytes, file_path, start, stop, filename, mime_type, inspection=None):
+            calls.append((start, stop))
+            return ProcessedDocument(
+                text=f"Scanned pages {start + 1}-{stop}",
+                metadata={},
+                sections=[{'page': 1, 'title': f"Run {start + 1}"}],
+                tables=[{'page': 1, 'content': 'gemini'}],
+                images=[{'page': stop - start}],
+                page_count=stop - start
+            )
+        
+        processor._process_shard = fake_shard
+        result = await HybridPdfProcessor(processor, FakePyMuPDF()).process(b'%PDF', 'mixed.pdf', 'application/pdf')
+        
+        assert result.error is None
+        assert sorted(calls) == [(1, 3), (4, 5)]
+        assert result.text.split("\n\n") == [
+            digital + " 1", "Scanned pages 2-3", digital + " 4", "Scanned pages 5-5"
+        ]
+        # Local items on scanned pages are dropped; Gemini's are shifted to document pages
+        assert [(t['page'], t['content']) for t in result.tables] == [(1, 'local'), (2, 'gemini'), (5, 'gemini')]
+        assert [i['page'] for i in result.images] == [3, 4, 5]
+        assert [s['page'] for s in result.sections] == [2, 5]
+        assert result.metadata['title'] == 'Mixed'
+        assert (result.metadata['scanned_pages'], result.metadata['gemini_calls']) == (3, 2)
+    
+    def test_stitch_offsets_shard_pages(self):
+        """Test that shard-relative page numbers are shifted to document pages"""
+        first = ProcessedDocument(
+            text="one",
+            metadata={'title': 'Report', 'pages': 50},
+            sections=[{'heading': 'Intro', 'content': '', 'page': 1}],
+            tables=[{'content': '|a|', 'description': '', 'page': 3}]
+        )
+        second = ProcessedDocument(
+            text="two",
+            metadata={'title': '', 'pages': 50},
+            sections=[{'heading': 'Results', 'content': '', 'page': 2}],
+            images=[{'description': 'chart', 'page': 0}]
+        )
+        
+        result = stitch_shard_results([(0, first), (50, second)], total_pages=100)
+        
+        assert result.text == "one\n\ntwo"
+        assert [s['page'] for s in result.sections] == [1, 52]
+        assert result.tables[0]['page'] == 3
+        assert result.images[0]['page'] == 0  # unknown page stays unknown
+        assert result.metadata['title'] == 'Report'
+        assert result.page_count == 100
+        assert result.metadata['shards'] == 2
+    
+    def test_inspection_parses_once(self):
+        """Test that PdfInspection carries routing facts and its parse timing"""
+        pdf_bytes = create_test_pdf(12)
+        
+        inspection = inspect_pdf(pdf_bytes, sample_pages=5)
+        
+        assert inspection.page_count == 12
+        assert inspection.sampled_pages == 5
+        assert inspection.has_text_layer is False
+        assert inspection.image_density == 0
+        assert len(inspection.page_offsets) == 12
+        assert 'inspect' in inspection.parse_timings
+        # The reader is not kept alive past routing
+        assert not hasattr(inspection, 'reader')
+    
+    def test_pdf_on_disk_is_read_through_the_file(self):
+        """Test that pypdf gets a file handle for on-disk PDFs instead of a copy in memory"""
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            f.write(create_test_pdf(3))
+            f.flush()
+            
+            with open_pdf(None, f.name) as reader:
+                assert len(reader.pages) == 3
+                assert not isinstance(reader.stream, io.BytesIO)
+                stream = reader.stream
+            assert stream.closed
+            
+            assert inspect_pdf(None, f.name).page_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_broken_pymupdf_pool_is_replaced(self, monkeypatch):
+        """Test that a pool broken by a dead worker is shut down and the extraction retried once"""
+        class BrokenPool(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+        def get_pool(max_workers):
+            if document_processors._pymupdf_pool is None:
+                document_processors._pymupdf_pool = ThreadPoolExecutor(max_workers)
+            return document_processors._pymupdf_pool
+
+        broken = BrokenPool(1)
+        monkeypatch.setattr(document_processors, '_pymupdf_pool', broken)
+        monkeypatch.setattr(document_processors, 'get_pymupdf_pool', get_pool)
+        monkeypatch.setattr(document_processors.os, 'cpu_count', lambda: 2)
+        monkeypatch.setattr(Config, 'MAX_CONCURRENT_PYMUPDF_CALLS', 2)
+        monkeypatch.setattr(Config, 'PYMUPDF_PARALLEL_MIN_PAGES', 2)
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            f.write(create_test_pdf(4))
+            f.flush()
+            extracted = await PyMuPDFProcessor().extract(None, 'report.pdf', file_path=f.name)
+
+        assert len(extracted['texts']) == 4
+        assert extracted['metadata']['parallel_workers'] == 2
+        assert broken._shutdown
+        assert document_processors._pymupdf_pool is not broken
+        document_processors._pymupdf_pool.shutdown()
+    
+    def test_born_digital_probe_thresholds(self):
+        """Test that dense text with few images is born-digital and scans are not"""
+        thresholds = dict(min_chars_per_page=200, min_text_page_ratio=0.8, max_images_per_page=1.0)
+        digital = PdfInspection(
+            page_count=40, is_encrypted=False, has_text_layer=True, image_density=0.2,
+            sampled_pages=5, text_page_ratio=1.0, chars_per_page=1800
+        )
+        scanned = PdfInspection(
+            page_count=40, is_encrypted=False, has_text_layer=True, image_density=1.0,
+            sampled_pages=5, text_page_ratio=0.2, chars_per_page=40
+        )
+        
+        assert digital.is_born_digital(**thresholds)
+        assert not scanned.is_born_digital(**thresholds)
+    
+    def test_hybrid_groups_scanned_pages_into_runs(self):
+        """Test that only pages without a text layer are sent to Gemini, as contiguous runs"""
+        digital = "x" * 80
+        texts = [digital, "", " \n", digital, "page 5", digital, ""]
+        
+        assert scanned_page_runs(texts, min_chars=50) == [(1, 3), (4, 5), (6, 7)]
+        assert scanned_page_runs([digital, digital], min_chars=50) == []
+    
+    @pytest.mark.asyncio
+    async def test_factory_skips_gemini_for_huge_pdf(self, factory):
+        """Test that factory skips Gemini for files that are too large when sharding is off"""
+        factory.config.GEMINI_SHARDING_ENABLED = False
+        pdf_bytes = create_test_pdf(1500)  # 1500 pages
+        
+        result = await factory.process_document(
+            file_bytes=pdf_bytes,
+            filename='test_huge.pdf',
+            mime_type='application/pdf'
+        )
+        
+        # Should use PyMuPDF, not Gemini
+        assert result.processing_method in ['pymupdf', 'pypdf']
+        assert 'gemini' not in result.processing_method
+
+    def test_factory_builds_processors_lazily(self, factory):
+        """Test that processors (and their clients) are only built for methods actually used"""
+        assert factory.processors._built == {}
+        
+        text_processor = factory.processors.get('text')
+        
+        assert factory.processors.get('text') is text_processor
+        assert list(factory.processors._built) == ['text']
+        assert factory.processors.get('unknown') is None
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
\ No newline at end of file
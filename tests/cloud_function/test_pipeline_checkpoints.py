@@ -0,0 +1,157 @@
+# tests/cloud_function/test_pipeline_checkpoints.py
+
+from types import SimpleNamespace
+
+import pytest
+from checkpoint_store import CheckpointStore
+from config import Config
+from document_processors import ProcessedDocument
+from pipeline_processor import PipelineProcessor
+from stage_limiter import StageLimiter
+
+DOCUMENT_ID = '6f1c2b1e-93a4-4c55-9b1d-0c7e5c8d2a10'
+
+
+class FakeCheckpointDatabase:
+    """Keeps checkpoint rows in a dict keyed on (document_id, stage)"""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def execute_query(self, query, params=None):
+        if query.lstrip().startswith('INSERT'):
+            document_id, stage, file_hash, payload = params
+            self.rows[(document_id, stage)] = (file_hash, payload)
+        elif query.lstrip().startswith('DELETE'):
+            self.rows = {key: row for key, row in self.rows.items() if key[0] != params[0]}
+
+    async def fetch_all(self, query, params=None):
+        return [
+            {'stage': stage, 'file_hash': row[0], 'payload': row[1]}
+            for (document_id, stage), row in self.rows.items() if document_id == params[0]
+        ]
+
+
+class FakeStage:
+    """Answers a stage's async calls with a fixed value"""
+
+    def __init__(self, result=None):
+        self.result = result
+
+    async def __call__(self, *args, **kwargs):
+        return self.result
+
+
+class FailingStage:
+    """Stands in for a stage that must not run again, or that dies mid-run"""
+
+    def __init__(self, error="stage should not have run"):
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        raise RuntimeError(self.error)
+
+
+def make_processor(db, is_new):
+    processor = PipelineProcessor.__new__(PipelineProcessor)
+    processor.config = Config()
+    processor.checkpoints = CheckpointStore(db)
+    processor.stages = StageLimiter({'download': 1, 'extraction': 1, 'embedding': 1, 'db': 1})
+    processor.events = SimpleNamespace(flush=FakeStage())
+    processor.doc_processor = SimpleNamespace(process_document=FakeStage(ProcessedDocument(
+        text="Quarterly report", metadata={}, page_count=1, processing_method='text'
+    )))
+    processor.chunking_factory = SimpleNamespace(chunk_text=FakeStage([
+        SimpleNamespace(page_content="Quarterly report", metadata={'chunk_index': 0})
+    ]))
+    processor.vector_manager = SimpleNamespace(
+        add_documents=FakeStage(['chunk-1']), sync_documents=FakeStage(['chunk-1'])
+    )
+
+    processor._start_prewarm = lambda: None
+    processor._remove_local_file = lambda path: None
+    processor._download_file = FakeStage(('/tmp/report.txt', 16, 'a' * 64))
+    processor._create_or_update_document_record = FakeStage((DOCUMENT_ID, is_new, False))
+    processor._clone_duplicate_content = FakeStage(None)
+    processor._log_stage = FakeStage()
+    processor._update_document_status = FakeStage()
+    processor._publish_notification = FakeStage()
+    return processor
+
+
+class TestPipelineCheckpoints:
+    """Test checkpoint lifecycle across a full pipeline run"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('is_new', [True, False])
+    async def test_completed_documents_leave_no_checkpoints(self, is_new):
+        db = FakeCheckpointDatabase()
+        saved = []
+        processor = make_processor(db, is_new)
+        original_save = processor.checkpoints.save
+
+        async def save(document_id, stage, *args):
+            saved.append(stage)
+            await original_save(document_id, stage, *args)
+        processor.checkpoints.save = save
+
+        result = await processor.process_document('gs://bucket/project/report.txt', 'project-1', 'user-1')
+
+        assert result['status'] == 'success'
+        assert saved == ['extraction', 'chunking']
+        assert db.rows == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_run_resumes_from_checkpoints(self):
+        db = FakeCheckpointDatabase()
+        processor = make_processor(db, is_new=False)
+        processor.vector_manager.sync_documents = FailingStage("instance killed mid-embedding")
+
+        with pytest.raises(RuntimeError, match="mid-embedding"):
+            await processor.process_document('gs://bucket/project/report.txt', 'project-1', 'user-1')
+        assert {stage for _, stage in db.rows} == {'extraction', 'chunking'}
+
+        # The retry must not extract or chunk again
+        processor.doc_processor.process_document = FailingStage()
+        processor.chunking_factory.chunk_text = FailingStage()
+        synced = []
+
+        async def sync_documents(documents, document_id, project_id, stats=None):
+            synced.extend((doc.page_content, doc.metadata) for doc in documents)
+            return ['chunk-1']
+        processor.vector_manager.sync_documents = sync_documents
+        statuses = []
+
+        async def update_document_status(document_id, status, **kwargs):
+            statuses.append((status, kwargs))
+        processor._update_document_status = update_document_status
+
+        result = await processor.process_document('gs://bucket/project/report.txt', 'project-1', 'user-1')
+
+        assert result['status'] == 'success'
+        assert result['processing_method'] == 'text'
+        assert processor.doc_processor.process_document.calls == []
+        assert processor.chunking_factory.chunk_text.calls == []
+        assert synced == [("Quarterly report", {'chunk_index': 0})]
+        [(status, kwargs)] = statuses
+        assert status == 'completed'
+        assert kwargs['metadata']['resumed_stages'] == ['chunking', 'extraction']
+        assert db.rows == {}
+
+    @pytest.mark.asyncio
+    async def test_changed_bytes_do_not_resume(self):
+        db = FakeCheckpointDatabase()
+        processor = make_processor(db, is_new=False)
+        processor.vector_manager.sync_documents = FailingStage("instance killed mid-embedding")
+        with pytest.raises(RuntimeError):
+            await processor.process_document('gs://bucket/project/report.txt', 'project-1', 'user-1')
+
+        processor._download_file = FakeStage(('/tmp/report.txt', 20, 'b' * 64))
+        processor.vector_manager.sync_documents = FakeStage(['chunk-1'])
+        processor.chunking_factory.chunk_text = chunk_text = FailingStage("chunked again")
+
+        with pytest.raises(RuntimeError, match="chunked again"):
+            await processor.process_document('gs://bucket/project/report.txt', 'project-1', 'user-1')
+        assert len(chunk_text.calls) == 1
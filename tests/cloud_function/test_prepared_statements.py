@@ -0,0 +1,84 @@
+# tests/cloud_function/test_prepared_statements.py
+
+import asyncio
+
+import pytest
+from database_manager import DatabaseManager, SimpleConnectionPool
+
+
+class FakeStatement:
+    def __init__(self, query):
+        self.query = query
+        self.calls = []
+
+    async def fetch(self, *args):
+        self.calls.append(args)
+        return [{'query': self.query, 'args': args}]
+
+
+class FakeConnection:
+    """Records every prepare() round trip"""
+
+    def __init__(self):
+        self.prepared = []
+
+    def is_closed(self):
+        return False
+
+    async def prepare(self, query):
+        self.prepared.append(query)
+        return FakeStatement(query)
+
+    async def close(self):
+        pass
+
+
+async def make_manager(statements, connections=1):
+    db = DatabaseManager()
+    for name, query in statements.items():
+        db.register_statement(name, query)
+
+    conns = [FakeConnection() for _ in range(connections)]
+    for conn in conns:
+        await db._prepare_statements(conn)
+
+    async def connect():
+        raise AssertionError("the pool should not need new connections")
+
+    db._pool = SimpleConnectionPool(connect, conns)
+    db._connector_loop = asyncio.get_running_loop()
+    return db, conns
+
+
+class TestPreparedStatements:
+    """Test the per-connection prepared statement registry"""
+
+    @pytest.mark.asyncio
+    async def test_registered_queries_are_prepared_once_per_connection(self):
+        db, (conn,) = await make_manager({'search': "SELECT $1"})
+
+        for i in range(3):
+            rows = await db.fetch_all_prepared('search', i)
+            assert rows == [{'query': "SELECT $1", 'args': (i,)}]
+
+        assert conn.prepared == ["SELECT $1"]
+
+    @pytest.mark.asyncio
+    async def test_late_registration_is_prepared_on_first_use(self):
+        db, (conn,) = await make_manager({})
+        db.register_statement('late', "SELECT 2")
+
+        await db.fetch_all_prepared('late')
+        await db.fetch_all_prepared('late')
+
+        assert conn.prepared == ["SELECT 2"]
+
+    @pytest.mark.asyncio
+    async def test_changed_query_text_is_re_prepared(self):
+        db, (conn,) = await make_manager({'search': "SELECT 1"})
+
+        db.register_statement('search', "SELECT 1 + 1")
+        rows = await db.fetch_all_prepared('search')
+
+        assert rows[0]['query'] == "SELECT 1 + 1"
+        assert conn.prepared == ["SELECT 1", "SELECT 1 + 1"]
@@ -0,0 +1,40 @@
+# tests/cloud_function/test_stage_limiter.py
+
+import asyncio
+
+import pytest
+from stage_limiter import StageLimiter
+
+
+class TestStageLimiter:
+    """Test per-stage concurrency limits"""
+
+    @pytest.mark.asyncio
+    async def test_each_stage_is_bounded_independently(self):
+        limiter = StageLimiter({'download': 3, 'extraction': 1})
+        peak = {'download': 0, 'extraction': 0}
+
+        async def document():
+            for stage in ('download', 'extraction'):
+                async with limiter.stage(stage):
+                    peak[stage] = max(peak[stage], limiter.snapshot()[stage]['in_flight'])
+                    await asyncio.sleep(0.005)
+
+        await asyncio.gather(*[document() for _ in range(6)])
+
+        assert peak == {'download': 3, 'extraction': 1}
+        snapshot = limiter.snapshot()
+        assert snapshot['extraction']['completed'] == 6
+        assert snapshot['extraction']['in_flight'] == 0
+        assert snapshot['extraction']['waiting'] == 0
+
+    @pytest.mark.asyncio
+    async def test_slot_is_released_on_error(self):
+        limiter = StageLimiter({'db': 1})
+
+        with pytest.raises(RuntimeError):
+            async with limiter.stage('db'):
+                raise RuntimeError("query failed")
+
+        async with limiter.stage('db'):
+            assert limiter.snapshot()['db']['in_flight'] == 1
@@ -0,0 +1,250 @@
+# tests/cloud_function/test_vector_store_manager.py
+
+import asyncio
+
+import pytest
+from config import Config
+from langchain_core.documents import Document
+from vector_store_manager import VectorStoreManager
+
+DOCUMENT_ID = '6f1c2b1e-93a4-4c55-9b1d-0c7e5c8d2a10'
+PROJECT_ID = '0b7d9a52-1c3e-4f6a-8e2d-5a9c7b3e1f04'
+
+
+class FakeContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeVectorDatabase:
+    """One document's vector and document_chunks rows in memory; also serves as pool and connection"""
+
+    def __init__(self):
+        self.vectors = {}  # id -> {'chunk_index', 'content', 'content_hash'}
+        self.chunks = {}   # chunk_index -> id
+        self.fail_after = None
+
+    async def fetch_all(self, query, params=None):
+        return [
+            {'id': chunk_id, 'chunk_index': row['chunk_index'], 'content_hash': row['content_hash']}
+            for chunk_id, row in sorted(self.vectors.items(), key=lambda item: item[1]['chunk_index'])
+        ]
+
+    async def _get_pool(self):
+        return self
+
+    def acquire(self):
+        return FakeContext(self)
+
+    def transaction(self):
+        return FakeContext()
+
+    async def execute(self, query, *args):
+        query = ' '.join(query.split())
+        if 'document_chunks' in query and query.startswith('DELETE'):
+            self.chunks.clear()
+        elif 'document_chunks' in query:
+            self.chunks[args[3]] = args[0]
+        elif query.startswith('DELETE'):
+            for chunk_id in args[0]:
+                del self.vectors[chunk_id]
+        elif query.startswith('UPDATE'):
+            for chunk_id, chunk_index, _, digest in zip(*args[:4]):
+                self.vectors[chunk_id].update(chunk_index=chunk_index, content_hash=digest)
+        else:
+            raise AssertionError(query)
+
+    async def store(self, documents, ids, document_id, project_id, stats=None):
+        """Stands in for _embed_and_store; with fail_after set, dies after that many chunks"""
+        for count, (chunk_id, doc) in enumerate(zip(ids, documents)):
+            if self.fail_after is not None and count == self.fail_after:
+                raise RuntimeError("instance killed mid-embedding")
+            self.vectors[chunk_id] = {
+                'chunk_index': doc.metadata['chunk_index'],
+                'content': doc.page_content,
+                'content_hash': doc.metadata['content_hash'],
+            }
+            self.chunks[doc.metadata['chunk_index']] = chunk_id
+
+    def contents(self):
+        return [row['content'] for row in sorted(self.vectors.values(), key=lambda row: row['chunk_index'])]
+
+
+def make_manager(db, monkeypatch):
+    monkeypatch.setattr(Config, 'VECTOR_BULK_INSERT', False)
+    manager = VectorStoreManager.__new__(VectorStoreManager)
+    manager.config = Config
+    manager.db_manager = db
+    manager.embedding_cache = None
+    manager._embed_and_store = db.store
+    return manager
+
+
+def chunks(*texts):
+    return [Document(page_content=text, metadata={}) for text in texts]
+
+
+class TestSyncDocuments:
+    """Test incremental re-ingestion by content hash"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_are_kept_added_and_removed_by_content(self, monkeypatch):
+        db = FakeVectorDatabase()
+        manager = make_manager(db, monkeypatch)
+        first = await manager.sync_documents(chunks("alpha", "beta", "gamma"), DOCUMENT_ID, PROJECT_ID)
+
+        stats = {}
+        ids = await manager.sync_documents(
+            chunks("alpha", "gamma revised", "beta", "delta"), DOCUMENT_ID, PROJECT_ID, stats=stats
+        )
+
+        assert (stats['chunks_kept'], stats['chunks_added'], stats['chunks_removed']) == (2, 2, 1)
+        # Kept chunks keep their ids (and embeddings) at their new positions
+        assert (ids[0], ids[2]) == (first[0], first[1])
+        assert first[2] not in db.vectors
+        assert db.contents() == ["alpha", "gamma revised", "beta", "delta"]
+        # document_chunks is rebuilt to match, in the new order
+        assert [db.chunks[index] for index in range(4)] == ids
+
+    @pytest.mark.asyncio
+    async def test_resync_after_a_failed_run_converges(self, monkeypatch):
+        db = FakeVectorDatabase()
+        manager = make_manager(db, monkeypatch)
+        await manager.sync_documents(chunks("alpha", "beta"), DOCUMENT_ID, PROJECT_ID)
+
+        db.fail_after = 1
+        with pytest.raises(RuntimeError):
+            await manager.sync_documents(chunks("alpha", "x", "y", "z"), DOCUMENT_ID, PROJECT_ID)
+        assert db.contents() == ["alpha", "x"]  # partial until the retry
+
+        db.fail_after = None
+        stats = {}
+        ids = await manager.sync_documents(chunks("alpha", "x", "y", "z"), DOCUMENT_ID, PROJECT_ID, stats=stats)
+
+        assert (stats['chunks_kept'], stats['chunks_added'], stats['chunks_removed']) == (2, 2, 0)
+        assert db.contents() == ["alpha", "x", "y", "z"]
+        assert [db.chunks[index] for index in range(4)] == ids
+
+
+class FakeDatabaseManager:
+    async def ensure_project_partition(self, project_id):
+        pass
+
+
+def make_pipeline_manager(monkeypatch, batch_size=1, inflight=2):
+    monkeypatch.setattr(Config, 'EMBEDDING_BATCH_SIZE', batch_size)
+    monkeypatch.setattr(Config, 'EMBEDDING_MAX_INFLIGHT_BATCHES', inflight)
+    manager = VectorStoreManager.__new__(VectorStoreManager)
+    manager.config = Config
+    manager.db_manager = FakeDatabaseManager()
+    manager.embedding_cache = None
+    return manager
+
+
+def indexed_chunks(count):
+    return [
+        Document(page_content=f"chunk {index}", metadata={'chunk_index': index, 'content_hash': str(index)})
+        for index in range(count)
+    ]
+
+
+class TestEmbedPipeline:
+    """Test the bounded embed -> store pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_embedded_batches_waiting_in_memory_are_bounded(self, monkeypatch):
+        manager = make_pipeline_manager(monkeypatch, inflight=2)
+        progress = {'embedded': 0, 'stored': 0, 'peak': 0}
+
+        async def embed_batch(contents, stats=None):
+            progress['embedded'] += 1
+            progress['peak'] = max(progress['peak'], progress['embedded'] - progress['stored'])
+            return [[0.0] for _ in contents]
+
+        async def store_records(vector_records, chunk_records):
+            await asyncio.sleep(0.005)  # writes are slower than embeddings
+            progress['stored'] += 1
+
+        manager._embed_batch = embed_batch
+        manager._store_records = store_records
+        documents = indexed_chunks(10)
+        await manager._embed_and_store(documents, [str(i) for i in range(10)], DOCUMENT_ID, PROJECT_ID)
+
+        assert progress['stored'] == 10
+        # Queued batches, plus one being written and one waiting to be queued
+        assert progress['peak'] <= Config.EMBEDDING_MAX_INFLIGHT_BATCHES + 2
+
+    @pytest.mark.asyncio
+    async def test_embedding_error_cancels_the_writer_and_propagates(self, monkeypatch):
+        manager = make_pipeline_manager(monkeypatch)
+        stored = []
+
+        async def embed_batch(contents, stats=None):
+            if contents == ["chunk 2"]:
+                raise RuntimeError("quota exhausted")
+            return [[0.0] for _ in contents]
+
+        async def store_records(vector_records, chunk_records):
+            stored.append(vector_records[0][0])
+
+        manager._embed_batch = embed_batch
+        manager._store_records = store_records
+        documents = indexed_chunks(5)
+
+        with pytest.raises(RuntimeError, match="quota exhausted"):
+            # Without cancellation the writer would wait on the queue forever
+            await asyncio.wait_for(
+                manager._embed_and_store(documents, [str(i) for i in range(5)], DOCUMENT_ID, PROJECT_ID),
+                timeout=1
+            )
+        assert stored == ['0', '1']
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+
+    @pytest.mark.asyncio
+    async def test_storage_error_stops_embedding(self, monkeypatch):
+        manager = make_pipeline_manager(monkeypatch)
+        embedded = []
+
+        async def embed_batch(contents, stats=None):
+            embedded.extend(contents)
+            return [[0.0] for _ in contents]
+
+        async def store_records(vector_records, chunk_records):
+            raise RuntimeError("connection lost")
+
+        manager._embed_batch = embed_batch
+        manager._store_records = store_records
+        documents = indexed_chunks(20)
+
+        with pytest.raises(RuntimeError, match="connection lost"):
+            await manager._embed_and_store(documents, [str(i) for i in range(20)], DOCUMENT_ID, PROJECT_ID)
+        assert len(embedded) <= Config.EMBEDDING_MAX_INFLIGHT_BATCHES + 2
+
+    @pytest.mark.asyncio
+    async def test_batches_are_committed_in_order(self, monkeypatch):
+        manager = make_pipeline_manager(monkeypatch, batch_size=3, inflight=2)
+        committed = []
+
+        async def embed_batch(contents, stats=None):
+            # Later batches embed faster, which must not reorder the writes
+            await asyncio.sleep(0.001 * (10 - len(committed)))
+            return [[float(len(text))] for text in contents]
+
+        async def store_records(vector_records, chunk_records):
+            committed.append([(record[0], record[3]) for record in vector_records])
+            assert [record[0] for record in chunk_records] == [record[0] for record in vector_records]
+
+        manager._embed_batch = embed_batch
+        manager._store_records = store_records
+        documents = indexed_chunks(10)
+        ids = [f"id-{i}" for i in range(10)]
+        await manager._embed_and_store(documents, ids, DOCUMENT_ID, PROJECT_ID)
+
+        assert [len(batch) for batch in committed] == [3, 3, 3, 1]
+        assert [row for batch in committed for row in batch] == [(ids[i], i) for i in range(10)]
@@ -0,0 +1,97 @@
+# tests/cloud_function/test_vertex_throttle.py
+
+import asyncio
+
+import pytest
+from vertex_throttle import ModelThrottle, TokenBucket, is_rate_limit_error
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+def make_throttle(**overrides):
+    options = dict(
+        rpm=6000, tpm=1_000_000, initial_concurrency=4, min_concurrency=1,
+        max_concurrency=8, max_retries=3, backoff_base=0.001, backoff_cap=0.01
+    )
+    options.update(overrides)
+    return ModelThrottle('test-model', **options)
+
+
+class TestVertexThrottle:
+    """Test the Vertex AI client throttle"""
+
+    def test_rate_limit_errors_are_recognised(self):
+        assert is_rate_limit_error(RateLimited())
+        assert is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED: Quota exceeded"))
+        assert not is_rate_limit_error(ValueError("page 4290 is malformed"))
+
+    @pytest.mark.asyncio
+    async def test_429_is_retried_and_halves_concurrency(self):
+        throttle = make_throttle()
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RateLimited("slow down")
+            return "ok"
+
+        assert await throttle.call(flaky) == "ok"
+        assert len(attempts) == 3
+        assert throttle.counters['rate_limited'] == 2
+        assert throttle.metrics()['concurrency_limit'] == 2  # 4 -> 2 -> 1 on the 429s, +1/1 on success
+
+    @pytest.mark.asyncio
+    async def test_concurrent_429s_halve_concurrency_once(self):
+        throttle = make_throttle(initial_concurrency=8, max_retries=0)
+        started = asyncio.Event()
+        in_flight = []
+
+        async def overloaded():
+            in_flight.append(1)
+            if len(in_flight) == 8:
+                started.set()
+            await started.wait()
+            raise RateLimited("slow down")
+
+        results = await asyncio.gather(*[throttle.call(overloaded) for _ in range(8)], return_exceptions=True)
+        assert all(isinstance(result, RateLimited) for result in results)
+        assert throttle.counters['rate_limited'] == 8
+        assert throttle.metrics()['concurrency_limit'] == 4
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_retried(self):
+        throttle = make_throttle()
+
+        async def broken():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await throttle.call(broken)
+        assert throttle.counters == {'calls': 1, 'rate_limited': 0, 'retries': 0, 'failures': 1}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_caps_in_flight_calls(self):
+        throttle = make_throttle(initial_concurrency=2, max_concurrency=2)
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            peak = max(peak, throttle.in_flight)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[throttle.call(work) for _ in range(6)])
+        assert peak == 2
+        assert throttle.metrics()['queue_depth'] == 0
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate_per_minute=600)  # 10 per second
+        await bucket.acquire(600)                   # drain the burst
+
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        await bucket.acquire(1)
+        assert loop.time() - started >= 0.09
@@ -0,0 +1,48 @@
+"""
+Lets tests/backend and tests/cloud_function run in one pytest session.
+
+Both source trees are flat and share module names (config,
+database_manager, vertex_throttle, ...), and their code imports them
+lazily inside functions. Each test directory's conftest activates its tree
+before its modules are collected and before each of its tests runs: the
+tree goes first on sys.path, and the other tree's modules are swapped out
+of sys.modules (and back in once that tree is active again).
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TREES = {name: os.path.join(ROOT, name) for name in ('backend', 'cloud_function')}
+
+_stashed = {name: {} for name in TREES}
+_active = None
+
+
+def _tree_of(module) -> str:
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    for name, root in TREES.items():
+        if directory == root:
+            return name
+    return None
+
+
+def activate(tree: str) -> None:
+    """Make `tree`'s modules the ones bare imports resolve to"""
+    global _active
+    if tree == _active:
+        return
+    for name, module in list(sys.modules.items()):
+        owner = _tree_of(module)
+        if owner is not None and owner != tree:
+            _stashed[owner][name] = sys.modules.pop(name)
+    sys.modules.update(_stashed[tree])
+    _stashed[tree] = {}
+
+    for root in TREES.values():
+        while root in sys.path:
+            sys.path.remove(root)
+    sys.path.insert(0, TREES[tree])
+    _active = tree
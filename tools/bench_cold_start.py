@@ -0,0 +1,128 @@
+"""
+bench_cold_start.py
+
+Cold-start profile for the Cloud Function in `cloud_function/main.py`.
+
+1. --importtime - runs `python -X importtime -c "import main"` and prints the
+   slowest top-level imports (cumulative), i.e. what an instance pays before
+   it can accept its first event.
+2. default     - time-to-first-event: starts a fresh interpreter per run,
+   imports main and hands it one synthetic GCS finalize CloudEvent for
+   BENCH_GCS_URI, reporting interpreter start -> import done -> event done.
+
+Environment variables expected (time-to-first-event only):
+- BENCH_GCS_URI - existing object, e.g. gs://my-bucket/documents/<project_id>/sample.pdf
+- plus the function's own settings (GCP_PROJECT_ID, DB_INSTANCE, DB_PASSWORD, ...)
+
+Re-uploading the same object is skipped as unchanged after the first run; the
+timings still include every client and connection the first event needs.
+
+Usage example:
+  python tools/bench_cold_start.py --importtime --top 25
+  python tools/bench_cold_start.py --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud_function')
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+from cloudevents.http import CloudEvent
+
+bucket, name = sys.argv[1][len('gs://'):].split('/', 1)
+event = CloudEvent(
+    {'type': 'google.cloud.storage.object.v1.finalized', 'source': f'//storage.googleapis.com/projects/_/buckets/{bucket}'},
+    {'bucket': bucket, 'name': name, 'generation': str(time.time_ns()), 'metadata': {'uploaded_by': 'bench'}}
+)
+result = main.process_document_upload(event)
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_event_ms': (done - imported) * 1000,
+    'status': result.get('status') if isinstance(result, dict) else None,
+}))
+"""
+
+
+def import_profile(top):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=FUNCTION_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else "import main failed")
+        sys.exit(1)
+
+    # "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nesting is shown by indentation after the final '|'
+        depth = len(name) - len(name.lstrip()) - 1
+        entries.append((int(cumulative_us), int(self_us), depth, name.strip()))
+
+    roots = [entry for entry in entries if entry[2] == min(e[2] for e in entries)]
+    total_ms = sum(entry[0] for entry in roots) / 1000
+    print(f"import main: {total_ms:,.0f} ms total")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for cumulative_us, self_us, _, name in sorted(entries, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14,.1f}  {self_us / 1000:>8,.1f}  {name}")
+
+
+def first_event(gcs_uri, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-c', CHILD, gcs_uri],
+            cwd=FUNCTION_DIR, capture_output=True, text=True
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode != 0 or not proc.stdout.strip():
+            print(proc.stderr[-2000:])
+            sys.exit(1)
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run['time_to_first_event_ms'] = wall_ms
+        runs.append(run)
+        print(
+            f"interpreter+import {wall_ms - run['first_event_ms']:8,.0f} ms | "
+            f"first event {run['first_event_ms']:8,.0f} ms | "
+            f"time-to-first-event {wall_ms:8,.0f} ms ({run['status']})"
+        )
+
+    if len(runs) > 1:
+        print(f"median time-to-first-event: {statistics.median(r['time_to_first_event_ms'] for r in runs):,.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Cloud Function cold start")
+    parser.add_argument('--importtime', action='store_true', help="print the -X importtime profile of `import main`")
+    parser.add_argument('--top', type=int, default=20, help="modules to show with --importtime")
+    parser.add_argument('--repeat', type=int, default=1, help="fresh interpreters for time-to-first-event")
+    args = parser.parse_args()
+
+    if args.importtime:
+        import_profile(args.top)
+        return
+
+    gcs_uri = os.getenv('BENCH_GCS_URI')
+    if not gcs_uri:
+        print("BENCH_GCS_URI is required (or pass --importtime)")
+        sys.exit(1)
+    first_event(gcs_uri, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
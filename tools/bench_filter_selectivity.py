@@ -0,0 +1,144 @@
+"""
+bench_filter_selectivity.py
+
+Search latency vs metadata filter selectivity for one project, through
+`VectorSearchEngine.search` in `backend/search_engine.py`:
+
+1. builds filters from the project's own data: no filter, the largest,
+   median and smallest file, the files covering ~half the chunks, and a
+   page-count range
+2. counts the rows each filter matches (selectivity)
+3. runs --runs searches per filter and recall setting, reporting the plan
+   the engine chose (exact/hnsw), p50/p95 latency and results returned
+
+The query vectors are embeddings of stored chunks, so no Vertex AI calls
+are made.
+
+Environment variables expected:
+- BENCH_PROJECT_ID - project UUID with ingested chunks to search
+- plus the backend's own settings (GCP_PROJECT_ID, DB_INSTANCE, DB_PASSWORD, ...)
+
+Usage example:
+  python tools/bench_filter_selectivity.py --runs 20 --k 10
+  python tools/bench_filter_selectivity.py --recall fast balanced exact
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import Config  # noqa: E402
+from database_manager import DatabaseManager  # noqa: E402
+from search_engine import VectorSearchEngine  # noqa: E402
+from search_filters import compile_filters  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def build_scenarios(db, project_id):
+    """(name, filters) pairs spanning broad to narrow, from the project's files"""
+    table = Config.VECTOR_TABLE_NAME
+    files = await db.fetch_all(f"""
+        SELECT metadata->>'filename' AS filename, count(*) AS rows
+        FROM {table} WHERE project_id = $1 AND metadata ? 'filename'
+        GROUP BY 1 ORDER BY rows DESC
+    """, (project_id,))
+
+    scenarios = [('no filter', None)]
+    if files:
+        scenarios.append(('largest file', {'filename': files[0]['filename']}))
+        scenarios.append(('median file', {'filename': files[len(files) // 2]['filename']}))
+        scenarios.append(('smallest file', {'filename': files[-1]['filename']}))
+
+        half, covered, total = [], 0, sum(row['rows'] for row in files)
+        for row in files:
+            if covered >= total / 2:
+                break
+            half.append(row['filename'])
+            covered += row['rows']
+        if len(half) > 1:
+            scenarios.append((f'{len(half)} files (~50%)', {'filename': half}))
+    scenarios.append(('docs <= 10 pages', {'page_count': {'lte': 10}}))
+    return scenarios
+
+
+async def run(args):
+    project_id = os.getenv('BENCH_PROJECT_ID')
+    if not project_id:
+        print("BENCH_PROJECT_ID is required")
+        return 1
+
+    db = DatabaseManager()
+    engine = VectorSearchEngine(db)
+    table = Config.VECTOR_TABLE_NAME
+    try:
+        samples = await db.fetch_all(
+            f"SELECT embedding::text AS embedding FROM {table} WHERE project_id = $1 "
+            f"ORDER BY random() LIMIT $2",
+            (project_id, args.runs)
+        )
+        if not samples:
+            print(f"❌ No chunks for project {project_id}")
+            return 1
+        queries = [json.loads(row['embedding']) for row in samples]
+        project_rows, _ = await engine.project_stats(project_id)
+
+        print(f"{'filter':<22} {'matching':>10} {'select.':>8} {'recall':>9} {'plan':>6} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'rows':>5}")
+        for name, filters in await build_scenarios(db, project_id):
+            compiled = compile_filters(filters)
+            if compiled is None:
+                matching = project_rows
+            else:
+                row = await db.fetch_one(
+                    f"SELECT count(*) AS rows FROM {table} WHERE project_id = $1{compiled.sql(2)}",
+                    (project_id, *compiled.values)
+                )
+                matching = row['rows']
+            for recall in args.recall:
+                plan = await engine.plan(project_id, args.k, recall, compiled)
+                # Warm-up: prepares the statement on the connection outside the timings
+                await engine.search(queries[0], project_id, args.k, recall, filters)
+                fallbacks = engine.counters['filter_fallback']
+
+                timings, returned = [], []
+                for query in queries:
+                    started = time.perf_counter()
+                    rows = await engine.search(query, project_id, args.k, recall, filters)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    returned.append(len(rows))
+
+                method = plan.method
+                if engine.counters['filter_fallback'] > fallbacks:
+                    method += '*'
+                print(
+                    f"{name[:22]:<22} {matching:>10,} {matching / max(project_rows, 1):>8.2%} {recall:>9} "
+                    f"{method:>6} {statistics.median(timings):>8.1f} {percentile(timings, 95):>8.1f} "
+                    f"{min(returned):>5}"
+                )
+        print("* = some HNSW searches returned fewer than k rows and were rescanned exactly")
+        print(f"engine: {engine.counters}")
+        return 0
+    finally:
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search latency vs metadata filter selectivity")
+    parser.add_argument('--runs', type=int, default=20, help="searches per filter and recall setting")
+    parser.add_argument('--k', type=int, default=10, help="results per search")
+    parser.add_argument('--recall', nargs='+', default=['balanced'], help="recall settings to compare")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+bench_pool_contention.py
+
+Measures acquire wait times for `SimpleConnectionPool` in
+`cloud_function/database_manager.py` when many tasks compete for a few
+connections, against the previous busy-wait pool (sleep 0.1s and retry,
+ping on every acquire), reproduced here as `LegacyPool`.
+
+Each task acquires a connection, runs `SELECT pg_sleep(hold)` and releases.
+Reported per pool: throughput, p50/p95/p99/max acquire wait, and for the
+new pool its wait-time histogram.
+
+Environment variables expected:
+- BENCH_DATABASE_URL - asyncpg DSN, e.g. postgresql://postgres:pw@127.0.0.1:5432/vectordb
+  (use the Cloud SQL Auth Proxy to reach a Cloud SQL instance)
+
+Pass --simulated to run without a database: connections are stand-ins
+whose queries just sleep, which isolates the pool's own overhead.
+
+Usage example:
+  python tools/bench_pool_contention.py --tasks 500 --pool-size 10 --hold-ms 5
+  python tools/bench_pool_contention.py --simulated --tasks 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud_function'))
+
+from database_manager import SimpleConnectionPool  # noqa: E402
+
+
+class SimulatedConnection:
+    """Just enough of asyncpg.Connection for the pools"""
+
+    def __init__(self):
+        self._closed = False
+
+    def is_closed(self):
+        return self._closed
+
+    async def fetchval(self, query, *args):
+        if query.startswith('SELECT pg_sleep'):
+            await asyncio.sleep(args[0] if args else 0)
+        else:
+            # Round trip of a ping
+            await asyncio.sleep(0.0005)
+        return 1
+
+    async def close(self):
+        self._closed = True
+
+
+class LegacyPool:
+    """The previous pool: lock-held ping per acquire, 100 ms polling when full"""
+
+    def __init__(self, get_connection_func, initial_connections, max_size=10):
+        self._get_connection_func = get_connection_func
+        self._available = list(initial_connections)
+        self._in_use = set()
+        self._max_size = max_size
+        self._lock = asyncio.Lock()
+
+    async def _acquire(self):
+        async with self._lock:
+            while self._available:
+                conn = self._available.pop()
+                if conn.is_closed():
+                    continue
+                await conn.fetchval("SELECT 1")
+                self._in_use.add(conn)
+                return conn
+            if len(self._available) + len(self._in_use) < self._max_size:
+                conn = await self._get_connection_func()
+                self._in_use.add(conn)
+                return conn
+        await asyncio.sleep(0.1)
+        return await self._acquire()
+
+    async def _release(self, conn):
+        async with self._lock:
+            if conn in self._in_use:
+                self._in_use.remove(conn)
+                self._available.append(conn)
+
+    async def close(self):
+        for conn in self._available + list(self._in_use):
+            await conn.close()
+
+
+def connection_factory(dsn):
+    if dsn is None:
+        async def connect():
+            return SimulatedConnection()
+    else:
+        import asyncpg
+
+        async def connect():
+            return await asyncpg.connect(dsn)
+    return connect
+
+
+async def run(pool, tasks, hold):
+    waits = []
+
+    async def worker():
+        started = time.perf_counter()
+        conn = await pool._acquire()
+        waits.append((time.perf_counter() - started) * 1000)
+        try:
+            await conn.fetchval("SELECT pg_sleep($1)", hold)
+        finally:
+            await pool._release(conn)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(tasks)])
+    return time.perf_counter() - started, waits
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark connection pool contention")
+    parser.add_argument('--tasks', type=int, default=500, help="concurrent acquire/query/release tasks")
+    parser.add_argument('--pool-size', type=int, default=10, help="max connections")
+    parser.add_argument('--hold-ms', type=float, default=5.0, help="time each task holds its connection")
+    parser.add_argument('--simulated', action='store_true', help="use stand-in connections instead of a database")
+    args = parser.parse_args()
+
+    dsn = None
+    if not args.simulated:
+        dsn = os.getenv('BENCH_DATABASE_URL')
+        if not dsn:
+            print("BENCH_DATABASE_URL is required (or pass --simulated)")
+            sys.exit(1)
+
+    connect = connection_factory(dsn)
+    hold = args.hold_ms / 1000
+    results = {}
+    for name in ('legacy', 'fifo'):
+        initial = [await connect() for _ in range(2)]
+        if name == 'legacy':
+            pool = LegacyPool(connect, initial, max_size=args.pool_size)
+        else:
+            pool = SimpleConnectionPool(connect, initial, max_size=args.pool_size, acquire_timeout=600)
+        try:
+            elapsed, waits = await run(pool, args.tasks, hold)
+        finally:
+            await pool.close()
+        results[name] = elapsed
+        print(
+            f"{name:>6}: {args.tasks / elapsed:,.0f} acquires/sec | wait ms "
+            f"p50 {statistics.median(waits):.1f}  p95 {percentile(waits, 95):.1f}  "
+            f"p99 {percentile(waits, 99):.1f}  max {max(waits):.1f}"
+        )
+        if name == 'fifo':
+            histogram = {bucket: count for bucket, count in pool.stats()['wait_histogram'].items() if count}
+            print(f"        histogram: {histogram}")
+
+    print(f"speedup: {results['legacy'] / results['fifo']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
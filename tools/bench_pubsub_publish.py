@@ -0,0 +1,111 @@
+"""
+bench_pubsub_publish.py
+
+Measures the per-document cost of the completion notification published by
+`PipelineProcessor._publish_notification` in `cloud_function/pipeline_processor.py`:
+
+1. per-call - new PublisherClient per message, block on future.result()
+              (the previous implementation)
+2. reused   - one long-lived publisher with batch settings, wait for the ack
+3. fire     - one long-lived publisher, fire-and-forget (done callback);
+              time until publish() returns control to the pipeline
+
+Environment variables expected:
+- BENCH_PROJECT_ID   - GCP project
+- BENCH_PUBSUB_TOPIC - existing topic to publish to
+- PUBSUB_EMULATOR_HOST (optional) - e.g. localhost:8085 to run against the emulator
+
+Usage example:
+  python tools/bench_pubsub_publish.py --messages 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from google.cloud import pubsub_v1
+
+
+def make_message(i):
+    return json.dumps({
+        'document_id': f'bench-{i}',
+        'project_id': 'bench',
+        'status': 'completed',
+        'metadata': {'chunks_count': 42, 'processing_method': 'gemini'}
+    }).encode('utf-8')
+
+
+def per_call(project_id, topic, count):
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        publisher = pubsub_v1.PublisherClient()
+        future = publisher.publish(publisher.topic_path(project_id, topic), make_message(i), status='completed')
+        future.result(timeout=30)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def reused(project_id, topic, count, wait_for_ack):
+    publisher = pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(max_messages=100, max_bytes=1024 * 1024, max_latency=0.05)
+    )
+    topic_path = publisher.topic_path(project_id, topic)
+    done = threading.Semaphore(0)
+    failures = []
+
+    def on_done(future):
+        try:
+            future.result()
+        except Exception as e:
+            failures.append(e)
+        done.release()
+
+    # Warm the channel so the one-off connection cost is not counted per message
+    publisher.publish(topic_path, make_message(-1)).result(timeout=30)
+
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        future = publisher.publish(topic_path, make_message(i), status='completed')
+        future.add_done_callback(on_done)
+        if wait_for_ack:
+            future.result(timeout=30)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    for _ in range(count):
+        done.acquire(timeout=30)
+    publisher.stop()
+    if failures:
+        print(f"  {len(failures)} publishes failed: {failures[0]}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pub/Sub notification publishing")
+    parser.add_argument('--messages', type=int, default=50, help="notifications (documents) per mode")
+    args = parser.parse_args()
+
+    project_id = os.getenv('BENCH_PROJECT_ID')
+    topic = os.getenv('BENCH_PUBSUB_TOPIC')
+    if not project_id or not topic:
+        print("BENCH_PROJECT_ID and BENCH_PUBSUB_TOPIC are required")
+        sys.exit(1)
+
+    results = {
+        'per-call': per_call(project_id, topic, args.messages),
+        'reused': reused(project_id, topic, args.messages, wait_for_ack=True),
+        'fire': reused(project_id, topic, args.messages, wait_for_ack=False),
+    }
+    for mode, timings in results.items():
+        print(f"{mode:>8}: p50 {statistics.median(timings):8.2f} ms   max {max(timings):8.2f} ms per document")
+
+    saved = statistics.median(results['per-call']) - statistics.median(results['fire'])
+    print(f"latency saved per document (p50, per-call -> fire): {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+bench_pymupdf_extraction.py
+
+Compares PyMuPDF extraction time for a large PDF in the two modes of
+`PyMuPDFProcessor` in `cloud_function/document_processors.py`:
+
+1. serial   - every page in one worker thread
+2. parallel - page ranges split across a process pool of
+              MAX_CONCURRENT_PYMUPDF_CALLS workers (capped at the CPU count)
+
+Without a PDF argument a synthetic 1,000-page document (text plus a small
+ruled table on every page) is generated into a temp file first.
+
+Environment variables (optional):
+- MAX_CONCURRENT_PYMUPDF_CALLS is read from Config; override with --workers
+
+Usage example:
+  python tools/bench_pymupdf_extraction.py
+  python tools/bench_pymupdf_extraction.py ./test_files/big.pdf --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import fitz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud_function'))
+
+from config import Config  # noqa: E402
+from document_processors import PyMuPDFProcessor  # noqa: E402
+
+LOREM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. "
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 400), f"Page {page_num + 1}\n" + LOREM * 12)
+        # 3x3 ruled grid so find_tables has something to detect
+        for i in range(4):
+            page.draw_line((50, 450 + i * 30), (350, 450 + i * 30))
+            page.draw_line((50 + i * 100, 450), (50 + i * 100, 540))
+        for row in range(3):
+            for col in range(3):
+                page.insert_text((60 + col * 100, 470 + row * 30), f"r{row}c{col}")
+    doc.save(path)
+    doc.close()
+
+
+async def run_once(path, min_pages):
+    Config.PYMUPDF_PARALLEL_MIN_PAGES = min_pages
+    start = time.perf_counter()
+    result = await PyMuPDFProcessor().process(file_bytes=None, filename=os.path.basename(path), file_path=path)
+    elapsed = time.perf_counter() - start
+    if result.error:
+        raise RuntimeError(result.error)
+    return elapsed, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs process-pool PyMuPDF extraction")
+    parser.add_argument('pdf', nargs='?', help="PDF to extract (default: generated)")
+    parser.add_argument('--pages', type=int, default=1000, help="pages in the generated PDF")
+    parser.add_argument('--workers', type=int, default=None, help="override MAX_CONCURRENT_PYMUPDF_CALLS")
+    args = parser.parse_args()
+
+    if args.workers:
+        Config.MAX_CONCURRENT_PYMUPDF_CALLS = args.workers
+
+    tmp_path = None
+    path = args.pdf
+    if not path:
+        fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        print(f"Generating {args.pages}-page PDF...")
+        make_pdf(tmp_path, args.pages)
+        path = tmp_path
+
+    try:
+        serial_time, serial = await run_once(path, min_pages=sys.maxsize)
+        # Warm the process pool so worker start-up is not billed to the first document
+        await run_once(path, min_pages=1)
+        parallel_time, parallel = await run_once(path, min_pages=1)
+
+        assert serial.text == parallel.text, "parallel extraction changed the text or page order"
+        assert len(serial.tables) == len(parallel.tables)
+
+        workers = parallel.metadata.get('parallel_workers', 1)
+        pages = serial.page_count
+        print(f"  serial: {pages} pages in {serial_time:.2f}s -> {pages / serial_time:,.0f} pages/sec")
+        print(f"parallel: {pages} pages in {parallel_time:.2f}s -> {pages / parallel_time:,.0f} pages/sec ({workers} workers)")
+        print(f"speedup: {serial_time / parallel_time:.1f}x")
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
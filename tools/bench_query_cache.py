@@ -0,0 +1,135 @@
+"""
+bench_query_cache.py
+
+Cold vs warm latency of `VectorStoreManager.search_similar` in
+`backend/vector_store_manager.py` with the query embedding cache:
+
+1. cold      - every query text seen for the first time (Vertex AI call + search)
+2. warm      - the same queries again, embeddings served from the cache
+3. coalesced - N concurrent identical new queries; reports how many Vertex
+               calls were actually made
+
+Environment variables expected:
+- BENCH_PROJECT_ID - project UUID with ingested chunks to search
+- plus the backend's own settings (GCP_PROJECT_ID, DB_INSTANCE, DB_PASSWORD, ...)
+
+Pass --simulated to run without GCP: the embedding call is a stand-in that
+sleeps --embed-ms and only the cache path is timed (no database search).
+
+Usage example:
+  python tools/bench_query_cache.py --queries 20 --concurrency 16
+  python tools/bench_query_cache.py --simulated --embed-ms 120
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from query_embedding_cache import QueryEmbeddingCache  # noqa: E402
+
+QUERIES = [
+    "What is the refund policy?",
+    "Summarize the quarterly revenue figures",
+    "Who signed the service agreement?",
+    "List the safety requirements for the warehouse",
+    "When does the contract expire?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, timings):
+    print(
+        f"{name:>9}: p50 {statistics.median(timings):8.1f} ms   "
+        f"p95 {percentile(timings, 95):8.1f} ms   max {max(timings):8.1f} ms"
+    )
+
+
+async def timed(search, query):
+    started = time.perf_counter()
+    await search(query)
+    return (time.perf_counter() - started) * 1000
+
+
+async def run(search, cache, queries, concurrency):
+    # Unique suffix so "cold" is cold even against a long-running cache
+    run_id = uuid.uuid4().hex[:8]
+    queries = [f"{query} ({run_id})" for query in queries]
+
+    cold = [await timed(search, query) for query in queries]
+    warm = [await timed(search, query) for query in queries]
+
+    misses_before = cache.counters['misses']
+    burst = f"{QUERIES[0]} ({run_id}-burst)"
+    coalesced = await asyncio.gather(*[timed(search, burst) for _ in range(concurrency)])
+    vertex_calls = cache.counters['misses'] - misses_before
+
+    report('cold', cold)
+    report('warm', warm)
+    report('coalesced', coalesced)
+    print(f"coalesced burst: {concurrency} concurrent searches -> {vertex_calls} embedding call(s)")
+    print(f"saved per repeated query (p50): {statistics.median(cold) - statistics.median(warm):.1f} ms")
+    print(f"cache: {cache.stats()}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the query embedding cache")
+    parser.add_argument('--queries', type=int, default=len(QUERIES), help="distinct queries per phase")
+    parser.add_argument('--concurrency', type=int, default=16, help="identical searches in the coalescing burst")
+    parser.add_argument('--k', type=int, default=5, help="results per search")
+    parser.add_argument('--simulated', action='store_true', help="stand-in embedding call, no GCP or database")
+    parser.add_argument('--embed-ms', type=float, default=120.0, help="stand-in embedding latency with --simulated")
+    args = parser.parse_args()
+
+    queries = [QUERIES[i % len(QUERIES)] + f" #{i}" for i in range(args.queries)]
+
+    if args.simulated:
+        cache = QueryEmbeddingCache()
+
+        async def embed(text):
+            await asyncio.sleep(args.embed_ms / 1000)
+            return [0.0] * 768
+
+        async def search(query):
+            return await cache.get_or_compute('simulated', query, embed)
+
+        await run(search, cache, queries, args.concurrency)
+        return
+
+    project_id = os.getenv('BENCH_PROJECT_ID')
+    if not project_id:
+        print("BENCH_PROJECT_ID is required (or pass --simulated)")
+        sys.exit(1)
+
+    from database_manager import DatabaseManager
+    from vector_store_manager import VectorStoreManager
+
+    db_manager = DatabaseManager()
+    vector_manager = VectorStoreManager(db_manager)
+    if vector_manager.query_cache is None:
+        print("QUERY_EMBEDDING_CACHE_ENABLED is false; nothing to compare")
+        sys.exit(1)
+
+    try:
+        await vector_manager.initialize()
+        # Open pooled connections and prepare statements outside the timings
+        await vector_manager.search_similar(QUERIES[0], project_id, k=args.k)
+
+        async def search(query):
+            return await vector_manager.search_similar(query, project_id, k=args.k)
+
+        await run(search, vector_manager.query_cache, queries, args.concurrency)
+    finally:
+        await db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+"""
+bench_vector_inserts.py
+
+Compares rows/sec for the two vector write paths in
+`cloud_function/vector_store_manager.py`:
+
+1. rows - one INSERT per chunk into document_vectors and document_chunks
+2. copy - COPY into staging tables, merged with one INSERT ... SELECT each
+
+Both paths write the two tables inside one transaction, exactly like
+`VectorStoreManager._store_records`. The benchmark runs in a scratch schema
+(`bench_vectors`) that is dropped at the end, so it is safe to point at a dev
+database. The database needs the pgvector extension.
+
+Environment variables expected:
+- BENCH_DATABASE_URL - asyncpg DSN, e.g. postgresql://postgres:pw@127.0.0.1:5432/vectordb
+  (use the Cloud SQL Auth Proxy to reach a Cloud SQL instance)
+
+Usage example:
+  python tools/bench_vector_inserts.py 5000
+  python tools/bench_vector_inserts.py 5000 --repeat 3
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+import asyncpg
+from pgvector.asyncpg import register_vector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud_function'))
+
+from vector_store_manager import (  # noqa: E402
+    copy_chunk_records,
+    copy_vector_records,
+    insert_chunk_records,
+    insert_vector_records,
+)
+
+SCHEMA = 'bench_vectors'
+DIMENSION = 768
+
+
+async def _init_connection(conn):
+    await register_vector(conn)
+    await conn.execute(f"SET search_path TO {SCHEMA}, public")
+
+
+async def setup_schema(dsn):
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+        await conn.execute(f"""
+            CREATE TABLE {SCHEMA}.document_vectors (
+                id UUID PRIMARY KEY,
+                document_id UUID NOT NULL,
+                project_id UUID NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                embedding vector({DIMENSION}),
+                metadata JSONB DEFAULT '{{}}',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                content_hash TEXT
+            )
+        """)
+        await conn.execute(f"""
+            CREATE INDEX ON {SCHEMA}.document_vectors
+            USING hnsw (embedding vector_cosine_ops)
+        """)
+        await conn.execute(f"""
+            CREATE TABLE {SCHEMA}.document_chunks (
+                id UUID PRIMARY KEY,
+                document_id UUID NOT NULL,
+                project_id UUID NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_method TEXT,
+                content_preview TEXT,
+                token_count INTEGER,
+                metadata JSONB DEFAULT '{{}}'::jsonb,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(document_id, chunk_index)
+            )
+        """)
+    finally:
+        await conn.close()
+
+
+async def drop_schema(dsn):
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    finally:
+        await conn.close()
+
+
+def make_records(rows):
+    document_id = str(uuid.uuid4())
+    project_id = str(uuid.uuid4())
+    vector_records = []
+    chunk_records = []
+    for idx in range(rows):
+        chunk_id = str(uuid.uuid4())
+        content = f"chunk {idx} " + "lorem ipsum dolor sit amet " * 35
+        metadata = json.dumps({'chunk_index': idx, 'chunk_method': 'recursive', 'filename': 'bench.pdf'})
+        embedding = [random.random() for _ in range(DIMENSION)]
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        vector_records.append((chunk_id, document_id, project_id, idx, content, embedding, metadata, digest))
+        chunk_records.append((chunk_id, document_id, project_id, idx, 'recursive', content[:500], len(content) // 4, metadata))
+    return vector_records, chunk_records
+
+
+async def run_once(pool, mode, rows):
+    vector_records, chunk_records = make_records(rows)
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if mode == 'copy':
+                await copy_vector_records(conn, 'document_vectors', vector_records)
+                await copy_chunk_records(conn, chunk_records)
+            else:
+                await insert_vector_records(conn, 'document_vectors', vector_records)
+                await insert_chunk_records(conn, chunk_records)
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector insert paths")
+    parser.add_argument('rows', type=int, nargs='?', default=5000, help="chunks per simulated document")
+    parser.add_argument('--repeat', type=int, default=1, help="documents written per mode")
+    args = parser.parse_args()
+
+    dsn = os.getenv('BENCH_DATABASE_URL')
+    if not dsn:
+        print("BENCH_DATABASE_URL is required")
+        sys.exit(1)
+
+    await setup_schema(dsn)
+    pool = await asyncpg.create_pool(dsn, min_size=1, max_size=1, init=_init_connection)
+    try:
+        results = {}
+        for mode in ('rows', 'copy'):
+            timings = [await run_once(pool, mode, args.rows) for _ in range(args.repeat)]
+            best = min(timings)
+            results[mode] = best
+            # Two tables are written per chunk
+            print(f"{mode:>5}: {args.rows} chunks in {best:.2f}s -> {2 * args.rows / best:,.0f} rows/sec")
+
+        print(f"speedup: {results['rows'] / results['copy']:.1f}x")
+    finally:
+        await pool.close()
+        await drop_schema(dsn)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
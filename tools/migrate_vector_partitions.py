@@ -0,0 +1,235 @@
+"""
+migrate_vector_partitions.py
+
+Moves an existing, unpartitioned vector table (VECTOR_TABLE_NAME, default
+document_vectors) to per-project LIST partitions, each with its own HNSW
+index, while the table keeps serving searches and ingestion:
+
+1. creates the partitioned table beside it as <name>_next
+   (DatabaseManager.init_vector_table)
+2. per project, largest first: fills a new partition of <name>_next from
+   the live rows and attaches it, so each HNSW graph is built once, in bulk
+3. catches <name>_next up with rows added, changed or deleted meanwhile
+4. cuts over in one transaction: blocks writes to the live table (searches
+   go on), repeats the catch-up for the last changes, then renames the live
+   table and its indexes to *_legacy and <name>_next, its partitions and
+   indexes to the live names
+5. compares row counts; with --drop-legacy the old table is dropped when
+   they match
+
+Searches read the live table until step 4, which holds writes only for the
+final catch-up and takes ACCESS EXCLUSIVE only for the renames.
+
+Running services cache whether the table is partitioned; restart them after
+the cut-over so new projects get their own partitions. Until then their
+rows land in the default partition, and re-running this tool moves them.
+
+Safe to re-run. An existing <name>_next is resumed: projects that already
+have a partition there are skipped and brought up to date by the catch-up.
+If the table is already partitioned, rows parked in the default partition
+are moved into their projects' partitions.
+
+Environment variables expected:
+- the Cloud Function's own database settings (GCP_PROJECT_ID, DB_INSTANCE,
+  DB_PASSWORD, DB_NAME, VECTOR_TABLE_NAME, ...)
+
+Usage example:
+  python tools/migrate_vector_partitions.py --dry-run
+  python tools/migrate_vector_partitions.py --maintenance-work-mem 2GB
+  python tools/migrate_vector_partitions.py --drop-legacy
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud_function'))
+# The table this tool creates is always the partitioned layout
+os.environ['VECTOR_PARTITION_BY_PROJECT'] = 'true'
+
+from config import Config  # noqa: E402
+from database_manager import DatabaseManager, partition_name  # noqa: E402
+
+
+COLUMNS_SQL = """
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+    FROM pg_attribute
+    WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+      AND attgenerated = ''
+"""
+
+
+def row_count(status: str) -> int:
+    """Rows affected, from a command status like 'INSERT 0 12'"""
+    return int(status.split()[-1])
+
+
+async def catch_up(conn, source: str, target: str, columns: str) -> tuple:
+    """Apply rows added, changed or deleted in `source` since they were copied to `target`"""
+    added = await conn.execute(f"""
+        INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} s
+        WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE t.id = s.id AND t.project_id = s.project_id)
+    """)
+    # Re-ingestion refreshes these on kept chunks (VectorStoreManager.sync_documents)
+    updated = await conn.execute(f"""
+        UPDATE {target} t
+        SET chunk_index = s.chunk_index, metadata = s.metadata, content_hash = s.content_hash
+        FROM {source} s
+        WHERE t.id = s.id AND t.project_id = s.project_id
+          AND (t.chunk_index, t.metadata, t.content_hash) IS DISTINCT FROM (s.chunk_index, s.metadata, s.content_hash)
+    """)
+    removed = await conn.execute(f"""
+        DELETE FROM {target} t
+        WHERE NOT EXISTS (SELECT 1 FROM {source} s WHERE s.id = t.id AND s.project_id = t.project_id)
+    """)
+    return row_count(added), row_count(updated), row_count(removed)
+
+
+async def rename_to_legacy(conn, table: str, legacy: str):
+    """Rename the table and its indexes so the partitioned table can take their names"""
+    indexes = await conn.fetch("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = $1::regclass
+    """, table)
+    await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    for row in indexes:
+        await conn.execute(f"ALTER INDEX {row['relname']} RENAME TO {row['relname']}_legacy")
+
+
+async def promote(conn, side: str, table: str):
+    """Give the side table, its partitions and its indexes the live table's names"""
+    partitions = await conn.fetch("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = $1::regclass
+    """, side)
+    indexes = await conn.fetch("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = $1::regclass
+    """, side)
+    await conn.execute(f"ALTER TABLE {side} RENAME TO {table}")
+    for row in indexes:
+        if row['relname'].startswith(side):
+            await conn.execute(f"ALTER INDEX {row['relname']} RENAME TO {table}{row['relname'][len(side):]}")
+    # <side>_default and <side>_p_<project> -> the names the services look up
+    for row in partitions:
+        if row['relname'].startswith(side):
+            await conn.execute(f"ALTER TABLE {row['relname']} RENAME TO {table}{row['relname'][len(side):]}")
+    return len(partitions)
+
+
+async def migrate(args):
+    table = Config.VECTOR_TABLE_NAME
+    side = f"{table}_next"
+    legacy = f"{table}_legacy"
+    db = DatabaseManager()
+    settings = {'maintenance_work_mem': args.maintenance_work_mem, 'lock_timeout': '60s'}
+
+    try:
+        pool = await db._get_pool()
+        async with pool.acquire() as conn:
+            partitioned = await conn.fetchval(
+                "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass($1)", table
+            )
+            has_legacy = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", legacy)
+            if partitioned is None:
+                print(f"❌ {table} does not exist; it is created partitioned on first start")
+                return 1
+            if not partitioned and has_legacy:
+                print(f"❌ {legacy} already exists; rename or drop it first")
+                return 1
+
+            source = f"{table}_default" if partitioned else table
+            projects = await conn.fetch(
+                f"SELECT project_id, count(*) AS rows FROM {source} GROUP BY project_id ORDER BY rows DESC"
+            )
+            total = sum(row['rows'] for row in projects)
+            print(f"⏳ {total:,} rows across {len(projects)} projects in {source}")
+            if args.dry_run:
+                for row in projects[:20]:
+                    print(f"   {partition_name(table, row['project_id'])}: {row['rows']:,} rows")
+                return 0
+
+            if not partitioned:
+                has_hash = await conn.fetchval(
+                    "SELECT count(*) > 0 FROM pg_attribute WHERE attrelid = $1::regclass AND attname = 'content_hash'",
+                    table
+                )
+                if not has_hash:
+                    # Older tables may predate content_hash; the partitioned table has it
+                    await conn.execute(f"ALTER TABLE {table} ADD COLUMN content_hash TEXT")
+
+        if partitioned:
+            # Rows parked in the default partition move to their projects' partitions
+            for done, row in enumerate(projects, 1):
+                started = time.perf_counter()
+                await db.ensure_project_partition(str(row['project_id']), settings=settings)
+                print(
+                    f"✅ [{done}/{len(projects)}] {partition_name(table, row['project_id'])}: "
+                    f"{row['rows']:,} rows in {time.perf_counter() - started:.1f}s"
+                )
+        else:
+            # DatabaseManager builds tables and partitions under Config.VECTOR_TABLE_NAME
+            Config.VECTOR_TABLE_NAME = side
+            await db.init_vector_table()
+            for done, row in enumerate(projects, 1):
+                project_id, started = str(row['project_id']), time.perf_counter()
+                name = partition_name(side, project_id)
+                async with pool.acquire() as conn:
+                    exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name)
+                if not exists:
+                    await db.ensure_project_partition(project_id, source_table=table, settings=settings)
+                print(
+                    f"✅ [{done}/{len(projects)}] {name}: {row['rows']:,} rows "
+                    f"in {time.perf_counter() - started:.1f}s{' (built by an earlier run)' if exists else ''}"
+                )
+            Config.VECTOR_TABLE_NAME = table
+
+            async with pool.acquire() as conn:
+                columns = await conn.fetchval(COLUMNS_SQL, side)
+                added, updated, removed = await catch_up(conn, table, side, columns)
+                print(f"✅ Caught up: {added:,} added, {updated:,} updated, {removed:,} removed")
+
+                async with conn.transaction():
+                    await conn.execute("SET LOCAL lock_timeout = '60s'")
+                    # Writes wait from here to commit; searches keep reading the live table
+                    await conn.execute(f"LOCK TABLE {table} IN SHARE MODE")
+                    added, updated, removed = await catch_up(conn, table, side, columns)
+                    await rename_to_legacy(conn, table, legacy)
+                    renamed = await promote(conn, side, table)
+                print(
+                    f"✅ Cut over to the partitioned {table} ({renamed} partitions; last changes: "
+                    f"{added:,} added, {updated:,} updated, {removed:,} removed); restart the services"
+                )
+            has_legacy = True
+
+        if has_legacy:
+            async with pool.acquire() as conn:
+                migrated = await conn.fetchval(
+                    f"SELECT count(*) FROM {legacy} l WHERE EXISTS "
+                    f"(SELECT 1 FROM {table} t WHERE t.id = l.id AND t.project_id = l.project_id)"
+                )
+                remaining = await conn.fetchval(f"SELECT count(*) FROM {legacy}")
+                print(f"📊 {migrated:,} of {remaining:,} legacy rows present in {table}")
+                if args.drop_legacy:
+                    if migrated == remaining:
+                        await conn.execute(f"DROP TABLE {legacy}")
+                        print(f"🧹 Dropped {legacy}")
+                    else:
+                        print(f"⚠️ Keeping {legacy}: {remaining - migrated:,} rows were not migrated")
+        return 0
+    finally:
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition the vector table by project")
+    parser.add_argument('--dry-run', action='store_true', help="only report projects and row counts")
+    parser.add_argument('--maintenance-work-mem', default='1GB', help="memory for each partition's HNSW build")
+    parser.add_argument('--drop-legacy', action='store_true', help="drop <table>_legacy once every row is migrated")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(migrate(args)))
+
+
+if __name__ == "__main__":
+    main()